@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Cache admission for AIStor
+TinyLFU-style admission filter: a doorkeeper Bloom filter in front of a
+Count-Min sketch estimates how often each key has been requested lately.
+
+A key seen for the first time only sets doorkeeper bits, so the one-hit
+wonders of an exploration scan never reach the sketch. A miss is admitted
+into a full cache once the key has been requested min_frequency times, or
+when it is estimated to be more popular than the entry it would evict.
+Both structures are reset together periodically, so popularity is recent.
+"""
+
+import sys
+from typing import Dict, Optional
+
+from sketches import BloomFilter, CountMinSketch
+
+
+class AdmissionFilter:
+    """Decides whether a missed key is worth a place in a full cache"""
+
+    def __init__(self, expected_keys: int, min_frequency: int = 2, sample_size: int = 0):
+        self.min_frequency = min_frequency
+        self.sample_size = sample_size or 10 * expected_keys
+        # Every request of a period may be a distinct key (a scan): size the doorkeeper for that,
+        # or false positives would wave scan keys through as already seen
+        self.doorkeeper = BloomFilter(self.sample_size)
+        # Aged here, in step with the doorkeeper, rather than by the sketch itself
+        self.sketch = CountMinSketch(width=expected_keys, sample_size=sys.maxsize)
+        self.requests = 0
+        self.admitted = 0
+        self.rejected = 0
+
+    def record(self, key: str) -> None:
+        """Count one request for key, hit or miss"""
+        if self.doorkeeper.add(key):
+            self.sketch.add(key)
+        self.requests += 1
+        if self.requests >= self.sample_size:
+            self.sketch.reset()
+            self.doorkeeper.clear()
+            self.requests = 0
+
+    def estimate(self, key: str) -> int:
+        """Recent request count of key"""
+        return self.sketch.estimate(key) + (key in self.doorkeeper)
+
+    def admit(self, key: str, victim: Optional[str]) -> bool:
+        """Whether key may displace victim, the entry the eviction policy would drop next"""
+        frequency = self.estimate(key)
+        if frequency >= self.min_frequency or victim is None or frequency > self.estimate(victim):
+            self.admitted += 1
+            return True
+        self.rejected += 1
+        return False
+
+    def stats(self) -> Dict:
+        decisions = self.admitted + self.rejected
+        return {
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "rejection_ratio": round(self.rejected / decisions, 4) if decisions else 0.0,
+            "min_frequency": self.min_frequency,
+        }
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+MinIO backend for AIStor
+Fetches objects from the MinIO cluster on cache misses, spreading requests
+over the nodes listed in MINIO_ENDPOINTS and failing over between them.
+Objects come back with their ETag and Last-Modified, and a cached copy
+can be revalidated with a conditional GET that transfers no body when it
+is still current. Byte ranges of large objects are fetched the same way.
+Objects under a prefix are listed (and sized) for warming the cache up.
+SingleFlight collapses concurrent misses for one key into a single fetch.
+"""
+
+import itertools
+import threading
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import urllib3
+from minio import Minio
+from minio.error import S3Error, ServerError
+
+# S3 error codes that mean "no such object" rather than "node unhealthy"
+MISSING_OBJECT_CODES = {"NoSuchKey", "NoSuchBucket", "NoSuchObject"}
+# A range starting past the end of the object
+INVALID_RANGE_CODE = "InvalidRange"
+
+
+class BackendUnavailable(Exception):
+    """Raised when no MinIO node could serve a request"""
+
+
+@dataclass
+class SourceObject:
+    """An object (or a byte range of it) as read from MinIO
+
+    data is None when a conditional GET found the object unchanged; size
+    is the whole object's size, also for a range.
+    """
+    data: Optional[bytes]
+    etag: str = ""
+    last_modified: float = 0.0
+    size: int = 0
+
+    @property
+    def not_modified(self) -> bool:
+        return self.data is None
+
+
+def parse_http_date(value: Optional[str]) -> float:
+    """Epoch seconds of an HTTP date header, 0.0 if absent or malformed"""
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def split_path(file_path: str) -> Tuple[str, str]:
+    """Split an AIStor cache path 'bucket/object/key' into (bucket, key)"""
+    bucket, _, key = file_path.lstrip("/").partition("/")
+    if not bucket or not key:
+        raise ValueError(f"Expected 'bucket/key', got '{file_path}'")
+    return bucket, key
+
+
+class _Flight:
+    """One in-progress call that late arrivals wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Run at most one call per key at a time; concurrent callers share its outcome"""
+
+    def __init__(self):
+        self._flights: Dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Return (result, shared): shared is True when another caller's fn produced it"""
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result, True
+
+        try:
+            flight.result = fn()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+        return flight.result, False
+
+    def __len__(self) -> int:
+        return len(self._flights)
+
+
+class MinIOBackend:
+    """Round-robin client over the MinIO nodes backing the cache"""
+
+    def __init__(self, endpoints: List[str], access_key: str, secret_key: str, secure: bool = False,
+                 connect_timeout: float = 2.0, read_timeout: float = 60.0, pool_size: int = 32):
+        if not endpoints:
+            raise ValueError("At least one MinIO endpoint is required")
+        # Fail fast and let the next node take over, instead of minio-py's long default retries
+        http_client = urllib3.PoolManager(
+            timeout=urllib3.Timeout(connect=connect_timeout, read=read_timeout),
+            maxsize=pool_size,
+            retries=urllib3.Retry(total=1, backoff_factor=0.1, status_forcelist=[500, 502, 503, 504])
+        )
+        self.nodes = [
+            (endpoint, Minio(endpoint, access_key=access_key, secret_key=secret_key,
+                             secure=secure, http_client=http_client))
+            for endpoint in endpoints
+        ]
+        self._next = itertools.count()
+        self._lock = threading.Lock()
+
+    def _rotation(self) -> List[Tuple[str, Minio]]:
+        """Nodes in the order to try them, starting at the next node in turn"""
+        with self._lock:
+            start = next(self._next) % len(self.nodes)
+        return self.nodes[start:] + self.nodes[:start]
+
+    def fetch(self, file_path: str) -> Optional[bytes]:
+        """Read a whole object; None if it does not exist"""
+        source = self.fetch_object(file_path)
+        return source.data if source is not None else None
+
+    def fetch_object(self, file_path: str, if_none_match: str = "") -> Optional[SourceObject]:
+        """Read a whole object with its ETag and Last-Modified; None if it does not exist
+
+        With if_none_match, an object whose ETag still matches costs one round
+        trip and comes back as a SourceObject without data.
+        """
+        return self._get(file_path, if_none_match=if_none_match)
+
+    def fetch_range(self, file_path: str, offset: int, length: int,
+                    if_none_match: str = "") -> Optional[SourceObject]:
+        """Read up to length bytes at offset; None if the object does not exist or is shorter than offset"""
+        return self._get(file_path, offset, length, if_none_match)
+
+    def object_size(self, file_path: str) -> Optional[int]:
+        """Size of an object from a HEAD request; None if it does not exist"""
+        bucket, key = split_path(file_path)
+        errors = []
+        for endpoint, client in self._rotation():
+            try:
+                return client.stat_object(bucket, key).size
+            except S3Error as e:
+                if e.code in MISSING_OBJECT_CODES:
+                    return None
+                errors.append(f"{endpoint}: {e}")
+            except Exception as e:
+                errors.append(f"{endpoint}: {e}")
+        raise BackendUnavailable(f"All MinIO nodes failed for {file_path}: {'; '.join(errors)}")
+
+    def list_objects(self, prefix: str) -> List[Tuple[str, int]]:
+        """(cache path, size) of every object under a 'bucket/key prefix', in key order"""
+        bucket, _, key_prefix = prefix.lstrip("/").partition("/")
+        errors = []
+        for endpoint, client in self._rotation():
+            try:
+                # Collected whole, so a node failing halfway hands over to the next from the start
+                return [
+                    (f"{bucket}/{obj.object_name}", obj.size)
+                    for obj in client.list_objects(bucket, prefix=key_prefix, recursive=True)
+                ]
+            except S3Error as e:
+                if e.code == "NoSuchBucket":
+                    return []
+                errors.append(f"{endpoint}: {e}")
+            except Exception as e:
+                errors.append(f"{endpoint}: {e}")
+        raise BackendUnavailable(f"All MinIO nodes failed to list {prefix}: {'; '.join(errors)}")
+
+    def _get(self, file_path: str, offset: int = 0, length: int = 0,
+             if_none_match: str = "") -> Optional[SourceObject]:
+        bucket, key = split_path(file_path)
+        headers = {"If-None-Match": if_none_match} if if_none_match else None
+        errors = []
+
+        for endpoint, client in self._rotation():
+            response = None
+            try:
+                response = client.get_object(bucket, key, offset=offset, length=length, request_headers=headers)
+                data = response.read()
+                # 'bytes 0-1048575/3000000' on a ranged read
+                content_range = response.headers.get("Content-Range", "")
+                return SourceObject(
+                    data,
+                    etag=response.headers.get("ETag", ""),
+                    last_modified=parse_http_date(response.headers.get("Last-Modified")),
+                    size=int(content_range.rpartition("/")[2]) if content_range else len(data)
+                )
+            except ServerError as e:
+                if e.status_code == 304:
+                    return SourceObject(None, etag=if_none_match)
+                errors.append(f"{endpoint}: {e}")
+            except S3Error as e:
+                if e.code in MISSING_OBJECT_CODES or e.code == INVALID_RANGE_CODE:
+                    return None
+                errors.append(f"{endpoint}: {e}")
+            except Exception as e:
+                errors.append(f"{endpoint}: {e}")
+            finally:
+                if response is not None:
+                    response.close()
+                    response.release_conn()
+
+        raise BackendUnavailable(f"All MinIO nodes failed for {file_path}: {'; '.join(errors)}")
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Belady eviction for AIStor
+A training job knows its upcoming reads: each epoch is a shuffled
+permutation of pose and video keys its dataloader fixed in advance. With
+that sequence uploaded, eviction can approximate Belady's OPT and evict
+the entry whose next use is farthest away, instead of guessing from the
+past like LRU does, which on shuffled epochs larger than the cache is
+close to the worst choice.
+
+The schedule is matched against reads as they happen. Dataloader workers
+read slightly out of order, so a read counts as the key's next scheduled
+one when it falls within SCHEDULE_WINDOW positions of the furthest read
+so far; anything else is an unmatched read and moves nothing. Blocks of a
+large object share the object's schedule.
+
+Keys the job will not read again go first. Keys the sequence does not
+mention at all, e.g. other clients' metadata reads, are ordered by the
+normal policy (the fallback); its victim is evicted instead of a scheduled
+key unless that key's next read is so far ahead that it would not stay
+cached until then anyway.
+"""
+
+import heapq
+import math
+import time
+from bisect import bisect_right
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple
+
+from policies import EvictionPolicy
+
+# Next use of a key the job will not read again
+NEVER = math.inf
+
+
+class AccessSchedule:
+    """A job's upcoming reads, in order, and how far it has got through them"""
+
+    def __init__(self, keys: Iterable[Hashable], window: int = 256, ttl: float = 0.0):
+        self.positions: Dict[Hashable, List[int]] = {}
+        length = 0
+        for length, key in enumerate(keys, 1):
+            self.positions.setdefault(key, []).append(length - 1)
+        self.length = length
+        self.window = window
+        self.expires_at = time.time() + ttl if ttl > 0 else 0.0
+        # Last scheduled read matched per key, and the furthest matched over all keys
+        self.consumed: Dict[Hashable, int] = {}
+        self.cursor = -1
+        self.matched = 0
+        self.unmatched = 0
+
+    def scheduled(self, key: Hashable) -> bool:
+        """Whether the sequence mentions a key at all"""
+        return self._key(key) is not None
+
+    def _key(self, key: Hashable) -> Optional[Hashable]:
+        if key in self.positions:
+            return key
+        # Blocks of a large object are cached as 'bucket/key#size:index'
+        if isinstance(key, str) and "#" in key:
+            base = key.rpartition("#")[0]
+            if base in self.positions:
+                return base
+        return None
+
+    def _next(self, key: Hashable) -> Optional[int]:
+        positions = self.positions[key]
+        i = bisect_right(positions, max(self.consumed.get(key, -1), self.cursor - self.window))
+        return positions[i] if i < len(positions) else None
+
+    def next_use(self, key: Hashable) -> Optional[int]:
+        """Position of a key's next scheduled read; None if the schedule has no more reads of it"""
+        key = self._key(key)
+        return None if key is None else self._next(key)
+
+    def advance(self, key: Hashable) -> Optional[int]:
+        """Match a read against the schedule and return the key's next use after it"""
+        scheduled = self._key(key)
+        if scheduled is None:
+            return None
+        position = self._next(scheduled)
+        if position is not None and position <= self.cursor + self.window:
+            self.consumed[scheduled] = position
+            self.cursor = max(self.cursor, position)
+            self.matched += 1
+            return self._next(scheduled)
+        # Read again right after its scheduled read (another block, another worker): the same read
+        if self.consumed.get(scheduled, -1) < self.cursor - self.window:
+            self.unmatched += 1
+        return position
+
+    @property
+    def finished(self) -> bool:
+        return self.cursor >= self.length - 1
+
+    def expired(self, now: float) -> bool:
+        return bool(self.expires_at) and now >= self.expires_at
+
+    def stats(self) -> Dict:
+        return {
+            "length": self.length,
+            "keys": len(self.positions),
+            "position": self.cursor + 1,
+            "progress": round((self.cursor + 1) / self.length, 4) if self.length else 1.0,
+            "matched_reads": self.matched,
+            "unmatched_reads": self.unmatched,
+            "expires_in": round(max(0.0, self.expires_at - time.time()), 1) if self.expires_at else None,
+        }
+
+
+class BeladyPolicy(EvictionPolicy):
+    """Evicts the scheduled key read farthest in the future, and keys not scheduled in fallback order"""
+
+    name = "belady"
+
+    def __init__(self, fallback: EvictionPolicy, schedule: AccessSchedule):
+        super().__init__(fallback.capacity)
+        self.fallback = fallback
+        self.schedule = schedule
+        self.stats = fallback.stats
+        self.name = f"belady+{fallback.name}"
+        # Scheduled resident keys -> next use, and a max-heap over it with stale entries skipped
+        self.next_use: Dict[str, int] = {}
+        self.heap: List[Tuple[int, str]] = []
+        self.scheduled_evictions = 0
+        self._evictions_before = fallback.stats.evictions
+        # Resident keys the job will read again leave the fallback
+        for key, size in list(fallback.sizes.items()):
+            self._track(key, size)
+            position = schedule.next_use(key)
+            if position is not None:
+                fallback.on_remove(key)
+                self._schedule(key, position)
+        self._rebuild()
+
+    @property
+    def fallback_evictions(self) -> int:
+        return self.stats.evictions - self._evictions_before - self.scheduled_evictions
+
+    def _schedule(self, key: str, position: int) -> None:
+        self.next_use[key] = position
+        heapq.heappush(self.heap, (-position, key))
+        if len(self.heap) > 2 * len(self.next_use) + 64:
+            self._rebuild()
+
+    def _rebuild(self) -> None:
+        """Drop stale heap entries and catch up with scheduled reads that were skipped"""
+        for key in self.next_use:
+            position = self.schedule.next_use(key)
+            self.next_use[key] = NEVER if position is None else position
+        self.heap = [(-position, key) for key, position in self.next_use.items()]
+        heapq.heapify(self.heap)
+
+    def on_insert(self, key: str, size: int) -> None:
+        self._track(key, size)
+        if self.schedule.scheduled(key):
+            position = self.schedule.advance(key)
+            self._schedule(key, NEVER if position is None else position)
+        else:
+            self.fallback.on_insert(key, size)
+
+    def on_hit(self, key: str, size: int) -> None:
+        self._track(key, size)
+        if key in self.next_use:
+            position = self.schedule.advance(key)
+            self._schedule(key, NEVER if position is None else position)
+        else:
+            self.fallback.on_hit(key, size)
+
+    def on_remove(self, key: str) -> None:
+        if key in self.sizes:
+            self._untrack(key)
+            self.next_use.pop(key, None)
+            self.fallback.on_remove(key)
+
+    def _top(self) -> Optional[str]:
+        heap = self.heap
+        while heap:
+            position, key = heap[0]
+            if self.next_use.get(key) == -position:
+                return key
+            heapq.heappop(heap)
+        return None
+
+    def peek(self) -> Optional[str]:
+        return self.fallback.peek() if len(self.fallback) else self._top()
+
+    def evict(self) -> Optional[str]:
+        key = self._top()
+        # A key the job reads again only after as many reads as the cache has entries would
+        # not survive until then anyway; closer ones are worth more than the fallback's victim
+        if key is None or (len(self.fallback) and self.next_use[key] - self.schedule.cursor <= len(self.sizes)):
+            key = self.fallback.evict()
+            if key is not None:
+                self._untrack(key)
+            return key
+        heapq.heappop(self.heap)
+        del self.next_use[key]
+        self._untrack(key)
+        self.stats.evictions += 1
+        self.scheduled_evictions += 1
+        return key
+
+    def detach(self) -> EvictionPolicy:
+        """Hand every key back to the fallback, farthest next use first in line for eviction"""
+        for key, _ in sorted(self.next_use.items(), key=lambda item: -item[1]):
+            self.fallback.on_insert(key, self.sizes[key])
+        self.next_use.clear()
+        self.heap.clear()
+        return self.fallback
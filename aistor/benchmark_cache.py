@@ -0,0 +1,1699 @@
+#!/usr/bin/env python3
+"""
+AIStor Cache Microbenchmarks
+
+Measures the in-process cost of AIStor cache operations, independent of
+MinIO and the network:
+- Eviction: per-operation cost of hits and evictions from 1k to 1M entries
+- Policies: hit ratio and byte hit ratio of each eviction policy on a
+  robotics-style trace (hot metadata reads mixed with pose batch scans)
+- Admission: hit ratio of each policy with and without the frequency admission
+  filter, on the same trace with exploration scans
+- Belady: hit ratio of multi-epoch shuffled training reads with the job's access
+  sequence loaded vs. LRU and W-TinyLFU, for caches smaller than the working set
+- Watermarks: write latency with inline eviction vs. the background eviction
+  worker, on the one-file-per-object layout
+- Hotness: cost and accuracy of the Space-Saving top files and demos vs. sorting
+  every entry by access count
+- Simulate: miss-ratio curves from a recorded access trace, exact vs. SHARDS-sampled
+  at 10% and 1%, with recording cost and trace size
+- Prefixes: prefix stats and invalidation of one demo from the prefix trie vs.
+  scanning every cached key
+- Metrics: hot-path cost of the Prometheus counters and histograms
+- Layout: one-file-per-object vs packed segments on a many-small-objects workload
+- Metadata: full JSON snapshot vs batched SQLite flush of the changed entries
+- Startup: time to restore a large cache after a crash and after a clean shutdown
+- Memory: bytes held per cached entry after a restart, and per metadata record
+  with and without slots and the per-entry location string
+- Concurrency: mixed read/write throughput vs. thread count, with accounting checks
+- Compression: capacity multiplier and read/write cost of each codec on UMI
+  pose and gripper JSON
+- Freshness: hit latency and MinIO traffic with TTL expiry, revalidating inline
+  vs. stale-while-revalidate, against a simulated MinIO
+- Prefetch: demand hit ratio and epoch time of sequential and random readers, with
+  and without prefetching, against a simulated MinIO with fixed latency
+- Views: hit latency of get_cached_file (a copy) vs. get_cached_view (mapped)
+  and sendfile, by entry size
+- Blocks: MinIO traffic and read time of repeated clip reads from large video
+  chunks, forwarded as ranged GETs vs. served from cached blocks
+- Pinning: first-epoch time of a training run on a cold cache vs. one pinned and
+  warmed up beforehand, and whether the warmed demos survive an exploration scan
+"""
+
+import gc
+import os
+import sys
+import math
+import json
+import time
+import hashlib
+import random
+import socket
+import argparse
+import itertools
+import tempfile
+import threading
+import contextlib
+import tracemalloc
+from pathlib import Path
+from dataclasses import asdict, fields, make_dataclass
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Tuple
+
+from optimizer import AIStor, FileMetadata
+from policies import POLICIES, access, create_policy, replay
+from metrics import Counter, Histogram
+from storage import FileStore, SegmentStore
+from metadata_store import MetadataStore
+from admission import AdmissionFilter
+from compression import available_codecs
+from backend import SourceObject
+from prefetch import Prefetcher
+from pinning import Warmer
+from belady import AccessSchedule, BeladyPolicy
+from tracing import OP_HIT, OP_MISS, OP_PUT, TraceRecorder
+from cachesim import load_trace, lru_curve, simulate
+
+
+def make_aistor(cache_dir: str, cache_size: int) -> AIStor:
+    """Create an AIStor rooted in a scratch directory"""
+    os.environ["CACHE_DIR"] = cache_dir
+    os.environ["CACHE_SIZE"] = str(cache_size)
+    os.environ["READ_THROUGH"] = "false"
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        return AIStor()
+
+
+def seed_entries(aistor: AIStor, num_entries: int, entry_size: int) -> List[str]:
+    """Populate AIStor with synthetic entries, coldest first
+
+    Each entry is charged entry_size bytes against the budget but stores a
+    tiny blob, so a million entries fit on any scratch disk.
+    """
+    now = time.time()
+    keys = []
+    for i in range(num_entries):
+        key = f"demonstrations/pick_cube/demo_{i // 30:04d}/poses/poses_{i:06d}.json"
+        file_hash = f"{i:032x}"
+        aistor.store.put(file_hash, b"{}", file_hash)
+        aistor.blob_paths[file_hash] = (key,)
+        aistor.metadata_cache[key] = FileMetadata(
+            file_path=key,
+            size=entry_size,
+            hash=file_hash,
+            access_count=1,
+            last_access=now + i * 1e-6
+        )
+        aistor.prefixes.add(key, entry_size)
+        aistor.policy.on_insert(key, entry_size)
+        keys.append(key)
+    aistor.current_cache_size = aistor.uncompressed_cache_size = num_entries * entry_size
+    aistor.logical_cache_size = num_entries * entry_size
+    return keys
+
+
+def benchmark_eviction(sizes: List[int], num_ops: int, entry_size: int = 4096) -> Dict[int, Dict[str, float]]:
+    """Per-operation cost of cache hits and evictions as the cache grows"""
+    results = {}
+    devnull = open(os.devnull, "w")
+    os.environ["EVICTION_WORKER"] = "false"  # Evictions are timed inline below
+
+    for num_entries in sizes:
+        print(f"🔄 Testing {num_entries:,} entries...")
+        with tempfile.TemporaryDirectory() as scratch:
+            aistor = make_aistor(scratch, num_entries * entry_size)
+
+            keys = seed_entries(aistor, num_entries, entry_size)
+
+            sample = [random.choice(keys) for _ in range(num_ops)]
+            with contextlib.redirect_stdout(devnull):
+                start = time.perf_counter()
+                for key in sample:
+                    aistor.get_cached_file(key)
+                hit_ns = (time.perf_counter() - start) / num_ops * 1e9
+
+            evicted_before = len(aistor.metadata_cache)
+            aistor.current_cache_size = aistor.cache_size_limit + 1
+            with contextlib.redirect_stdout(devnull):
+                start = time.perf_counter()
+                aistor._evict_until(aistor.cache_size_limit * aistor.low_watermark)
+                elapsed = time.perf_counter() - start
+            evicted = evicted_before - len(aistor.metadata_cache)
+            evict_ns = elapsed / max(evicted, 1) * 1e9
+
+            # What the previous implementation paid before its first eviction
+            start = time.perf_counter()
+            sorted(aistor.metadata_cache.items(), key=lambda x: x[1].last_access)
+            legacy_sort_ms = (time.perf_counter() - start) * 1000
+            aistor.store.close()
+
+        results[num_entries] = {
+            "hit_ns_per_op": hit_ns,
+            "evict_ns_per_entry": evict_ns,
+            "evicted_entries": evicted,
+            "legacy_sort_ms_per_crossing": legacy_sort_ms
+        }
+
+    devnull.close()
+    os.environ.pop("EVICTION_WORKER")
+    return results
+
+
+def report_eviction(results: Dict[int, Dict[str, float]]) -> str:
+    """Format eviction benchmark results as a table"""
+    lines = [
+        "=" * 72,
+        "📊 AIStor Eviction Benchmark",
+        "=" * 72,
+        f"{'entries':>10} {'hit ns/op':>12} {'evict ns/entry':>16} {'legacy sort ms/crossing':>26}",
+    ]
+    for num_entries, stats in results.items():
+        lines.append(
+            f"{num_entries:>10,} {stats['hit_ns_per_op']:>12.0f} "
+            f"{stats['evict_ns_per_entry']:>16.0f} {stats['legacy_sort_ms_per_crossing']:>26.2f}"
+        )
+    lines.append("=" * 72)
+    return "\n".join(lines)
+
+
+def robotics_trace(num_requests: int, num_demos: int = 400, scan_every: int = 5000,
+                   seed: int = 42) -> Iterator[Tuple[str, int]]:
+    """Synthetic training traffic: Zipf-popular metadata reads plus one-pass pose scans"""
+    rng = random.Random(seed)
+    tasks = ["pick_cube", "stack_blocks", "pour_water", "fold_cloth"]
+    hot_keys = [
+        (f"demonstrations/{tasks[d % len(tasks)]}/demo_{d:04d}/metadata.json", 2048)
+        for d in range(num_demos)
+    ]
+    # Cumulative once: passing plain weights makes every draw O(num_demos)
+    cum_weights = list(itertools.accumulate(1.0 / (rank + 1) for rank in range(len(hot_keys))))
+    scan_id = 0
+
+    emitted = 0
+    while emitted < num_requests:
+        if emitted and emitted % scan_every == 0:
+            # An exploration pass touches every pose batch of a fresh demo range once
+            for batch in range(scan_every // 2):
+                yield (f"demonstrations/scan/demo_{scan_id:04d}/poses/"
+                       f"poses_{batch * 60:06d}_{batch * 60 + 59:06d}.json", 12288)
+            scan_id += 1
+        yield rng.choices(hot_keys, cum_weights=cum_weights)[0]
+        emitted += 1
+
+
+def benchmark_policies(capacity: int, num_requests: int) -> Dict[str, Dict]:
+    """Replay the same trace through every eviction policy"""
+    trace = list(robotics_trace(num_requests))
+    results = {}
+    for name in POLICIES:
+        print(f"🔄 Replaying {len(trace):,} requests through {name}...")
+        start = time.perf_counter()
+        stats = replay(create_policy(name, capacity), trace)
+        results[name] = dict(stats.as_dict(), elapsed_s=time.perf_counter() - start)
+    return results
+
+
+def report_policies(results: Dict[str, Dict], capacity: int) -> str:
+    """Format policy comparison results as a table"""
+    lines = [
+        "=" * 72,
+        f"📊 AIStor Policy Comparison ({capacity / 1024 / 1024:.1f}MB cache)",
+        "=" * 72,
+        f"{'policy':>10} {'hit ratio':>12} {'byte hit ratio':>16} {'evictions':>12} {'time s':>10}",
+    ]
+    for name, stats in results.items():
+        lines.append(
+            f"{name:>10} {stats['hit_ratio']:>12.3f} {stats['byte_hit_ratio']:>16.3f} "
+            f"{stats['evictions']:>12,} {stats['elapsed_s']:>10.2f}"
+        )
+    lines.append("=" * 72)
+    return "\n".join(lines)
+
+
+def benchmark_admission(capacity: int, num_requests: int, scan_every: int) -> Dict[str, Dict]:
+    """Replay one scan-heavy trace through every policy, with and without admission"""
+    trace = list(robotics_trace(num_requests, scan_every=scan_every))
+    results = {}
+    for name in POLICIES:
+        print(f"🔄 Replaying {len(trace):,} requests through {name}, with and without admission...")
+        plain = replay(create_policy(name, capacity), trace)
+        start = time.perf_counter()
+        admission = AdmissionFilter(max(1024, capacity // 4096))
+        filtered = replay(create_policy(name, capacity), trace, admission)
+        results[name] = {
+            "hit_ratio": plain.hit_ratio,
+            "admitted_hit_ratio": filtered.hit_ratio,
+            "byte_hit_ratio": plain.byte_hit_ratio,
+            "admitted_byte_hit_ratio": filtered.byte_hit_ratio,
+            "rejected": admission.rejected,
+            "elapsed_s": time.perf_counter() - start,
+        }
+    return results
+
+
+def report_admission(results: Dict[str, Dict], capacity: int) -> str:
+    """Format admission results as a table"""
+    lines = [
+        "=" * 72,
+        f"📊 AIStor Admission Filter ({capacity / 1024 / 1024:.1f}MB cache, trace with exploration scans)",
+        "=" * 72,
+        f"{'policy':>10} {'hit ratio':>10} {'+admission':>11} {'gain':>8} {'byte hit':>9} {'+admission':>11} {'rejected':>9}",
+    ]
+    for name, stats in results.items():
+        lines.append(
+            f"{name:>10} {stats['hit_ratio']:>10.3f} {stats['admitted_hit_ratio']:>11.3f} "
+            f"{stats['admitted_hit_ratio'] - stats['hit_ratio']:>+8.3f} {stats['byte_hit_ratio']:>9.3f} "
+            f"{stats['admitted_byte_hit_ratio']:>11.3f} {stats['rejected']:>9,}"
+        )
+    lines.append("=" * 72)
+    return "\n".join(lines)
+
+
+def benchmark_belady(num_demos: int, batches_per_demo: int, epochs: int, fractions: List[float],
+                     window: int = 256) -> Dict[str, Dict[float, Dict[str, float]]]:
+    """Shuffled training epochs replayed with and without the job's access sequence, per cache size"""
+    rng = random.Random(0)
+    dataset = [
+        (f"demonstrations/pick_cube/demo_{d:04d}/poses/poses_{b * 60:06d}_{b * 60 + 59:06d}.json",
+         rng.randrange(4096, 16384))
+        for d in range(num_demos) for b in range(batches_per_demo)
+    ]
+    working_set = sum(size for _, size in dataset)
+    sequence = []
+    for epoch in range(epochs):
+        order = list(dataset)
+        random.Random(epoch).shuffle(order)
+        sequence.extend(order)
+    schedule_keys = [key for key, _ in sequence]
+
+    # Dataloader workers finish batches out of order: shuffled within runs of 16
+    reordered = []
+    for start in range(0, len(sequence), 16):
+        run = sequence[start:start + 16]
+        rng.shuffle(run)
+        reordered.extend(run)
+    # Other clients' metadata reads, not in the job's sequence, between 1 in 5 of its reads
+    hot = list(robotics_trace(len(sequence) // 4))
+    mixed = []
+    for i, request in enumerate(reordered):
+        mixed.append(request)
+        if i % 4 == 3:
+            mixed.append(hot[i // 4])
+
+    readers = {"in order": sequence, "8 workers": reordered, "8 workers + other": mixed}
+    results: Dict[str, Dict[float, Dict[str, float]]] = {}
+    for reader, trace in readers.items():
+        results[reader] = {}
+        for fraction in fractions:
+            capacity = int(working_set * fraction)
+            print(f"🔄 {reader}: {len(trace):,} reads, cache {fraction:.0%} of the working set...")
+            ratios = {}
+            for name in ("lru", "wtinylfu", "belady"):
+                if name == "belady":
+                    policy = BeladyPolicy(create_policy("lru", capacity), AccessSchedule(schedule_keys, window))
+                else:
+                    policy = create_policy(name, capacity)
+                for key, size in trace:
+                    access(policy, key, size)
+                ratios[name] = policy.stats.hit_ratio
+            results[reader][fraction] = ratios
+    return results
+
+
+def report_belady(results: Dict[str, Dict[float, Dict[str, float]]], epochs: int) -> str:
+    """Format Belady results as a table"""
+    lines = [
+        "=" * 72,
+        f"📊 AIStor Belady Eviction ({epochs} shuffled epochs, hit ratio)",
+        "=" * 72,
+        f"{'reader':<20} {'cache/WS':>9} {'lru':>8} {'wtinylfu':>9} {'belady':>8} {'gain vs lru':>12}",
+    ]
+    for reader, by_fraction in results.items():
+        for fraction, ratios in by_fraction.items():
+            lines.append(
+                f"{reader:<20} {fraction:>9.0%} {ratios['lru']:>8.3f} {ratios['wtinylfu']:>9.3f} "
+                f"{ratios['belady']:>8.3f} {ratios['belady'] - ratios['lru']:>+12.3f}"
+            )
+    lines.append("-" * 72)
+    lines.append("belady: the job's access sequence loaded, LRU for keys not in it")
+    lines.append("=" * 72)
+    return "\n".join(lines)
+
+
+def benchmark_watermarks(num_writes: int, threads: int, entry_size: int, capacity: int) -> Dict[str, Dict]:
+    """Concurrent writers filling a cache well past its budget, with and without the eviction worker"""
+    os.environ["CACHE_LAYOUT"] = "files"  # Eviction unlinks a file per entry
+    os.environ["CACHE_ADMISSION"] = "false"
+    results = {}
+    for label, worker in (("inline", "false"), ("background worker", "true")):
+        print(f"🔄 {label}: {num_writes:,} writes of {entry_size / 1024:.0f}KB from {threads} threads...")
+        os.environ["EVICTION_WORKER"] = worker
+        with tempfile.TemporaryDirectory() as scratch:
+            aistor = make_aistor(scratch, capacity)
+            payloads = [os.urandom(entry_size) for _ in range(64)]
+            latencies: List[float] = []
+
+            def writer(thread: int):
+                own = []
+                for i in range(thread, num_writes, threads):
+                    # A distinct blob per write: the payload is salted with its index
+                    data = i.to_bytes(8, "little") + payloads[i % len(payloads)]
+                    start = time.perf_counter()
+                    aistor.cache_file(f"umi-data/demonstrations/pick_cube/demo_{i // 1000:04d}/poses/{i:08d}.json", data)
+                    own.append(time.perf_counter() - start)
+                latencies.extend(own)
+
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                start = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=threads) as pool:
+                    list(pool.map(writer, range(threads)))
+                elapsed = time.perf_counter() - start
+                stats = aistor.get_cache_stats()
+                aistor.close()
+
+        latencies.sort()
+        results[label] = {
+            "writes_per_s": num_writes / elapsed,
+            "p50_us": latencies[len(latencies) // 2] * 1e6,
+            "p99_us": latencies[int(len(latencies) * 0.99)] * 1e6,
+            "p999_ms": latencies[int(len(latencies) * 0.999)] * 1000,
+            # Writes that paid for a drain: every one of them under inline eviction
+            "slow_writes": sum(latency > 0.005 for latency in latencies),
+            "slow_ms": sum(latency for latency in latencies if latency > 0.005) * 1000,
+            "stalls": stats["eviction"]["writer_stalls"]["count"],
+            "evictions": int(aistor.metrics.evictions.value),
+        }
+    for name in ("CACHE_LAYOUT", "CACHE_ADMISSION", "EVICTION_WORKER"):
+        os.environ.pop(name)
+    return results
+
+
+def report_watermarks(results: Dict[str, Dict]) -> str:
+    """Format eviction worker results as a table"""
+    lines = [
+        "=" * 72,
+        "📊 AIStor Eviction: inline vs. background worker",
+        "=" * 72,
+        f"{'mode':<18} {'writes/s':>8} {'p50 us':>7} {'p99 us':>7} {'p99.9 ms':>8} {'>5ms':>5} {'>5ms total':>10} {'stalls':>6}",
+    ]
+    for label, stats in results.items():
+        lines.append(
+            f"{label:<18} {stats['writes_per_s']:>8,.0f} {stats['p50_us']:>7.0f} {stats['p99_us']:>7.0f} "
+            f"{stats['p999_ms']:>8.2f} {stats['slow_writes']:>5,} {stats['slow_ms']:>8.0f}ms {stats['stalls']:>6,}"
+        )
+    lines.append("=" * 72)
+    return "\n".join(lines)
+
+
+def benchmark_hotness(sizes: List[int], num_requests: int, reports: int = 20) -> Dict[int, Dict[str, float]]:
+    """Top-5 files by sorting the cache vs. from the heavy-hitter summaries, on a Zipf request stream"""
+    results = {}
+    devnull = open(os.devnull, "w")
+    os.environ["EVICTION_WORKER"] = "false"
+    for num_entries in sizes:
+        print(f"🔄 Testing {num_entries:,} entries...")
+        with tempfile.TemporaryDirectory() as scratch:
+            aistor = make_aistor(scratch, 1 << 50)
+            keys = seed_entries(aistor, num_entries, 4096)
+            rng = random.Random(0)
+            rng.shuffle(keys)
+            weights = [1 / (rank + 1) for rank in range(num_entries)]
+            requests = rng.choices(keys, weights=weights, k=num_requests)
+
+            with contextlib.redirect_stdout(devnull):
+                start = time.perf_counter()
+                for key in requests:
+                    aistor.heavy_hitters.record(key)
+                record_ns = (time.perf_counter() - start) / num_requests * 1e9
+            for key in requests:
+                aistor.metadata_cache[key].access_count += 1
+
+            start = time.perf_counter()
+            for _ in range(reports):
+                exact = sorted(aistor.metadata_cache.items(), key=lambda x: x[1].access_count, reverse=True)[:5]
+            sort_ms = (time.perf_counter() - start) / reports * 1000
+            start = time.perf_counter()
+            for _ in range(reports):
+                approximate = aistor.heavy_hitters.files.top(5)
+                aistor.heavy_hitters.stats()
+            summary_ms = (time.perf_counter() - start) / reports * 1000
+
+            exact_keys = {path for path, _ in exact}
+            results[num_entries] = {
+                "record_ns": record_ns,
+                "sort_ms": sort_ms,
+                "summary_ms": summary_ms,
+                "recall": len(exact_keys & {path for path, _ in approximate}) / len(exact_keys),
+                # Requests are sampled, so reported counts are estimates
+                "count_error": max(abs(count / (aistor.metadata_cache[path].access_count - 1) - 1)
+                                   for path, count in approximate),
+            }
+            aistor.close()
+    os.environ.pop("EVICTION_WORKER")
+    devnull.close()
+    return results
+
+
+def report_hotness(results: Dict[int, Dict[str, float]], num_requests: int) -> str:
+    """Format heavy-hitter results as a table"""
+    lines = [
+        "=" * 72,
+        f"📊 AIStor Top Files: full sort vs. Space-Saving ({num_requests:,} Zipf requests)",
+        "=" * 72,
+        f"{'entries':>10} {'sort ms':>9} {'summary ms':>11} {'speedup':>9} {'record ns':>10} {'top-5 recall':>13} {'count error':>12}",
+    ]
+    for num_entries, stats in results.items():
+        lines.append(
+            f"{num_entries:>10,} {stats['sort_ms']:>9.2f} {stats['summary_ms']:>11.3f} "
+            f"{stats['sort_ms'] / stats['summary_ms']:>8,.0f}x {stats['record_ns']:>10,.0f} "
+            f"{stats['recall']:>13.2f} {stats['count_error']:>12.1%}"
+        )
+    lines.append("=" * 72)
+    return "\n".join(lines)
+
+
+def benchmark_simulate(num_requests: int, num_demos: int, cache_sizes: List[int],
+                       rates: Tuple[float, ...] = (1.0, 0.1, 0.01)) -> Dict:
+    """Record a robotics trace, then compute its LRU miss-ratio curve exactly and SHARDS-sampled"""
+    requests = list(robotics_trace(num_requests, num_demos=num_demos))
+    results = {"requests": len(requests), "rates": {}}
+    with tempfile.TemporaryDirectory() as scratch:
+        path = os.path.join(scratch, "access.trace")
+        recorder = TraceRecorder(path)
+        seen = set()
+        start = time.perf_counter()
+        for key, size in requests:
+            if key in seen:
+                recorder.record(key, size, OP_HIT)
+            else:
+                # What AIStor logs for a read-through miss: the miss, then the put that fills it
+                recorder.record(key, 0, OP_MISS)
+                recorder.record(key, size, OP_PUT)
+                seen.add(key)
+        recorder.close()
+        results["record_ns"] = (time.perf_counter() - start) / len(requests) * 1e9
+        results["trace_bytes"] = os.path.getsize(path)
+
+        print(f"🔄 Replaying {len(requests):,} requests through lru at every size...")
+        start = time.perf_counter()
+        replayed = simulate(load_trace(path), ["lru"], cache_sizes, [1 << 20])
+        results["replay_s"] = time.perf_counter() - start
+
+        exact = None
+        for rate in rates:
+            print(f"🔄 Miss-ratio curve sampled at {rate:g}...")
+            start = time.perf_counter()
+            trace = load_trace(path, rate)
+            curve = lru_curve(trace, cache_sizes, 1 << 20)
+            elapsed = time.perf_counter() - start
+            if exact is None:
+                exact = curve
+                assert all(abs(curve[i] - replayed[("lru", size, 1 << 20)]) < 1e-9
+                           for i, size in enumerate(cache_sizes)), "stack distances disagree with replay"
+            errors = [abs(a - b) for a, b in zip(curve, exact)]
+            results["rates"][rate] = {
+                "requests": len(trace.requests),
+                "elapsed_s": elapsed,
+                "mean_error": sum(errors) / len(errors),
+                "max_error": max(errors),
+                "curve": curve,
+            }
+    return results
+
+
+def report_simulate(results: Dict, cache_sizes: List[int]) -> str:
+    """Format simulator results as a table"""
+    lines = [
+        "=" * 72,
+        f"📊 AIStor Miss-Ratio Curves ({results['requests']:,} requests, {len(cache_sizes)} cache sizes)",
+        "=" * 72,
+        f"{'sampling':>9} {'simulated':>11} {'time s':>8} {'speedup':>8} {'mean error':>11} {'max error':>10}",
+    ]
+    for rate, stats in results["rates"].items():
+        lines.append(
+            f"{rate:>9g} {stats['requests']:>11,} {stats['elapsed_s']:>8.2f} "
+            f"{results['replay_s'] / stats['elapsed_s']:>7,.0f}x "
+            f"{stats['mean_error']:>11.4f} {stats['max_error']:>10.4f}"
+        )
+    lines.append("-" * 72)
+    lines.append("miss ratio  " + "".join(f"{size // 1024 // 1024:>7}MB" for size in cache_sizes))
+    for rate, stats in results["rates"].items():
+        lines.append(f"{rate:>10g}  " + "".join(f"{ratio:>9.3f}" for ratio in stats["curve"]))
+    lines.append("-" * 72)
+    lines.append(
+        f"speedup vs. replaying lru at each size ({results['replay_s']:.2f}s); "
+        f"recording {results['record_ns']:,.0f} ns/request, "
+        f"{results['trace_bytes'] / results['requests']:.1f} trace bytes/request"
+    )
+    lines.append("=" * 72)
+    return "\n".join(lines)
+
+
+def benchmark_prefixes(sizes: List[int], demos: int = 20) -> Dict[int, Dict[str, float]]:
+    """Stats and invalidation of single demos: scanning metadata_cache vs. the prefix trie"""
+    results = {}
+    devnull = open(os.devnull, "w")
+    os.environ["EVICTION_WORKER"] = "false"
+    for num_entries in sizes:
+        print(f"🔄 Testing {num_entries:,} entries...")
+        with tempfile.TemporaryDirectory() as scratch:
+            aistor = make_aistor(scratch, 1 << 50)
+            seed_entries(aistor, num_entries, 4096)
+            # seed_entries puts 30 pose batches in each demo
+            picked = random.Random(0).sample(range(num_entries // 30), 2 * demos)
+            prefixes = [f"demonstrations/pick_cube/demo_{d:04d}/" for d in picked]
+
+            start = time.perf_counter()
+            for prefix in prefixes[:demos]:
+                scanned = sum(m.size for k, m in aistor.metadata_cache.items() if k.startswith(prefix))
+            scan_stats_ms = (time.perf_counter() - start) / demos * 1000
+            start = time.perf_counter()
+            for prefix in prefixes[:demos]:
+                stats = aistor.prefixes.stats(prefix)
+            trie_stats_ms = (time.perf_counter() - start) / demos * 1000
+            assert stats[1] == scanned
+
+            with contextlib.redirect_stdout(devnull):
+                start = time.perf_counter()
+                for prefix in prefixes[:demos]:
+                    for key in [k for k in aistor.metadata_cache if k.startswith(prefix)]:
+                        aistor._drop_entry(key)
+                scan_invalidate_ms = (time.perf_counter() - start) / demos * 1000
+                start = time.perf_counter()
+                for prefix in prefixes[demos:]:
+                    dropped = aistor.invalidate_prefix(prefix)
+                trie_invalidate_ms = (time.perf_counter() - start) / demos * 1000
+            assert dropped == 30 and len(aistor.metadata_cache) == num_entries - 60 * demos
+
+            results[num_entries] = {
+                "scan_stats_ms": scan_stats_ms,
+                "trie_stats_ms": trie_stats_ms,
+                "scan_invalidate_ms": scan_invalidate_ms,
+                "trie_invalidate_ms": trie_invalidate_ms,
+            }
+            aistor.close()
+    os.environ.pop("EVICTION_WORKER")
+    devnull.close()
+    return results
+
+
+def report_prefixes(results: Dict[int, Dict[str, float]]) -> str:
+    """Format prefix index results as a table"""
+    lines = [
+        "=" * 72,
+        "📊 AIStor Prefix Operations on One Demo (30 entries): scan vs. trie",
+        "=" * 72,
+        f"{'entries':>10} {'stats: scan ms':>15} {'trie ms':>9} {'invalidate: scan ms':>20} {'trie ms':>9}",
+    ]
+    for num_entries, stats in results.items():
+        lines.append(
+            f"{num_entries:>10,} {stats['scan_stats_ms']:>15.2f} {stats['trie_stats_ms']:>9.4f} "
+            f"{stats['scan_invalidate_ms']:>20.2f} {stats['trie_invalidate_ms']:>9.2f}"
+        )
+    lines.append("=" * 72)
+    return "\n".join(lines)
+
+
+def benchmark_metrics(thread_counts: List[int], ops_per_thread: int) -> Dict[int, Dict[str, float]]:
+    """Cost per metric update as threads are added, against a plain locked counter"""
+    results = {}
+    for num_threads in thread_counts:
+        counter = Counter("bench_total", "benchmark counter")
+        histogram = Histogram("bench_seconds", "benchmark histogram")
+        lock = threading.Lock()
+        locked_total = [0]
+
+        def locked_inc():
+            for _ in range(ops_per_thread):
+                with lock:
+                    locked_total[0] += 1
+
+        def counter_inc():
+            for _ in range(ops_per_thread):
+                counter.inc()
+
+        def histogram_observe():
+            for i in range(ops_per_thread):
+                histogram.observe(i * 1e-7)
+
+        timings = {}
+        for label, target in (("locked", locked_inc), ("counter", counter_inc), ("histogram", histogram_observe)):
+            threads = [threading.Thread(target=target) for _ in range(num_threads)]
+            start = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            timings[f"{label}_ns_per_op"] = (time.perf_counter() - start) / (num_threads * ops_per_thread) * 1e9
+
+        assert counter.value == num_threads * ops_per_thread
+        results[num_threads] = timings
+    return results
+
+
+def report_metrics(results: Dict[int, Dict[str, float]]) -> str:
+    """Format metrics overhead results as a table"""
+    lines = [
+        "=" * 72,
+        "📊 AIStor Metrics Overhead",
+        "=" * 72,
+        f"{'threads':>10} {'locked ns/op':>16} {'counter ns/op':>16} {'histogram ns/op':>18}",
+    ]
+    for num_threads, stats in results.items():
+        lines.append(
+            f"{num_threads:>10} {stats['locked_ns_per_op']:>16.0f} "
+            f"{stats['counter_ns_per_op']:>16.0f} {stats['histogram_ns_per_op']:>18.0f}"
+        )
+    lines.append("=" * 72)
+    return "\n".join(lines)
+
+
+def _disk_usage(root: Path) -> Tuple[int, int]:
+    """(files, allocated bytes) under a directory"""
+    files = allocated = 0
+    for entry in os.scandir(root):
+        if entry.is_file():
+            files += 1
+            allocated += entry.stat().st_blocks * 512
+    return files, allocated
+
+
+def benchmark_layout(num_objects: int, min_size: int, max_size: int, num_reads: int) -> Dict[str, Dict]:
+    """Write, read and disk footprint of both cache layouts on the same objects"""
+    rng = random.Random(7)
+    sizes = [rng.randint(min_size, max_size) for _ in range(num_objects)]
+    payload = os.urandom(max_size)
+    keys = [
+        f"demonstrations/pick_cube/demo_{i // 30:04d}/poses/poses_{i * 60:06d}_{i * 60 + 59:06d}.json"
+        for i in range(num_objects)
+    ]
+    read_order = [rng.randrange(num_objects) for _ in range(num_reads)]
+    results = {}
+
+    for layout in ("files", "segments"):
+        print(f"🔄 Writing {num_objects:,} objects with the {layout} layout...")
+        with tempfile.TemporaryDirectory() as scratch:
+            root = Path(scratch) / layout
+            store = FileStore(root) if layout == "files" else SegmentStore(root)
+
+            start = time.perf_counter()
+            for i, key in enumerate(keys):
+                store.put(key, payload[:sizes[i]], f"{i:016x}")
+            write_s = time.perf_counter() - start
+
+            start = time.perf_counter()
+            for i in read_order:
+                store.read(keys[i])
+            read_s = time.perf_counter() - start
+
+            files, allocated = _disk_usage(root)
+            store.close()
+
+        results[layout] = {
+            "writes_per_s": num_objects / write_s,
+            "reads_per_s": num_reads / read_s,
+            "files": files,
+            "allocated_mb": allocated / 1024 / 1024,
+            "logical_mb": sum(sizes) / 1024 / 1024,
+        }
+    return results
+
+
+def report_layout(results: Dict[str, Dict]) -> str:
+    """Format layout comparison results as a table"""
+    lines = [
+        "=" * 72,
+        "📊 AIStor Cache Layout Comparison",
+        "=" * 72,
+        f"{'layout':>10} {'writes/s':>12} {'reads/s':>12} {'files':>10} {'disk MB':>10} {'data MB':>10}",
+    ]
+    for layout, stats in results.items():
+        lines.append(
+            f"{layout:>10} {stats['writes_per_s']:>12,.0f} {stats['reads_per_s']:>12,.0f} "
+            f"{stats['files']:>10,} {stats['allocated_mb']:>10.1f} {stats['logical_mb']:>10.1f}"
+        )
+    lines.append("=" * 72)
+    return "\n".join(lines)
+
+
+def benchmark_metadata(sizes: List[int], changes: int) -> Dict[int, Dict[str, float]]:
+    """Cost of persisting metadata once `changes` entries were accessed, vs. cache size"""
+    results = {}
+    for num_entries in sizes:
+        print(f"🔄 Persisting metadata for {num_entries:,} entries...")
+        now = time.time()
+        entries = {
+            f"demonstrations/pick_cube/demo_{i // 30:04d}/poses/poses_{i:06d}.json": FileMetadata(
+                file_path=f"demonstrations/pick_cube/demo_{i // 30:04d}/poses/poses_{i:06d}.json",
+                size=4096, hash=f"{i:016x}", access_count=1, last_access=now
+            )
+            for i in range(num_entries)
+        }
+        locations = {f"{i:016x}": f"segment-{i // 10000 + 1:06d}.dat:{i % 10000 * 4200}:4096"
+                     for i in range(num_entries)}
+        touched = random.Random(3).sample(list(entries.values()), min(changes, num_entries))
+
+        with tempfile.TemporaryDirectory() as scratch:
+            # Legacy monitor_loop: rewrite every entry whatever changed
+            json_path = Path(scratch) / "cache_metadata.json"
+            start = time.perf_counter()
+            with open(json_path, 'w') as f:
+                json.dump({k: dict(asdict(v), cache_location=locations[v.hash]) for k, v in entries.items()}, f, indent=2)
+            json_s = time.perf_counter() - start
+            json_mb = json_path.stat().st_size / 1024 / 1024
+
+            store = MetadataStore(Path(scratch) / "cache_metadata.db", locate=locations.get)
+            for metadata in entries.values():
+                store.put(metadata)
+            store.flush()
+
+            # One flush interval's worth of hits
+            start = time.perf_counter()
+            for metadata in touched:
+                metadata.access_count += 1
+                metadata.last_access = time.time()
+                store.touch(metadata)
+            store.flush()
+            flush_s = time.perf_counter() - start
+            store.close()
+            db_mb = sum(p.stat().st_size for p in Path(scratch).glob("cache_metadata.db*")) / 1024 / 1024
+
+        results[num_entries] = {
+            "json_ms": json_s * 1000,
+            "json_mb": json_mb,
+            "flush_ms": flush_s * 1000,
+            "db_mb": db_mb,
+        }
+    return results
+
+
+def report_metadata(results: Dict[int, Dict[str, float]], changes: int) -> str:
+    """Format metadata persistence results as a table"""
+    lines = [
+        "=" * 72,
+        f"📊 AIStor Metadata Persistence ({changes:,} changed entries per interval)",
+        "=" * 72,
+        f"{'entries':>10} {'JSON dump ms':>14} {'JSON MB':>10} {'SQLite flush ms':>16} {'DB MB':>10}",
+    ]
+    for num_entries, stats in results.items():
+        lines.append(
+            f"{num_entries:>10,} {stats['json_ms']:>14.1f} {stats['json_mb']:>10.1f} "
+            f"{stats['flush_ms']:>16.1f} {stats['db_mb']:>10.1f}"
+        )
+    lines.append("=" * 72)
+    return "\n".join(lines)
+
+
+def build_cache(cache_dir: Path, num_entries: int, entry_size: int = 4096) -> None:
+    """Lay down segments and SQLite metadata for a cache of num_entries tiny blobs"""
+    (cache_dir / "metadata").mkdir(parents=True, exist_ok=True)
+    store = SegmentStore(cache_dir / "segments")
+    metadata_store = MetadataStore(cache_dir / "metadata" / "cache_metadata.db", locate=store.location)
+    now = time.time()
+    for i in range(num_entries):
+        key = f"umi-data/demonstrations/pick_cube/demo_{i // 30:04d}/poses/poses_{i:06d}.json"
+        file_hash = f"{i:016x}"
+        store.put(file_hash, b"{}")
+        metadata_store.put(FileMetadata(
+            file_path=key, size=entry_size, hash=file_hash, access_count=1, last_access=now + i * 1e-6
+        ))
+        if i % 100000 == 99999:
+            metadata_store.flush()
+    metadata_store.close()
+    store.close()
+
+
+def benchmark_startup(num_entries: int) -> Dict[str, Dict[str, float]]:
+    """Restart a num_entries cache from SQLite (after a crash) and from the index (after close)"""
+    results = {}
+    with tempfile.TemporaryDirectory() as scratch:
+        print(f"🔄 Building a {num_entries:,}-entry cache...")
+        build_cache(Path(scratch), num_entries)
+        # A segment no entry points at, as left behind by a crash mid-compaction
+        (Path(scratch) / "segments" / "segment-999999.dat").write_bytes(b"\0" * 4096)
+
+        for source in ("sqlite", "index"):
+            start = time.perf_counter()
+            aistor = make_aistor(scratch, 1 << 50)
+            ready_s = time.perf_counter() - start
+            aistor.reconciled.wait()
+            reconciled_s = time.perf_counter() - start
+
+            results[source] = {
+                "entries": len(aistor.metadata_cache),
+                "size_mb": aistor.current_cache_size / 1024 / 1024,
+                "ready_s": ready_s,
+                "reconciled_s": reconciled_s,
+                "orphans": aistor.startup_stats["orphaned_files"],
+            }
+            # A clean shutdown leaves the index snapshot the second start loads from
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                aistor.close()
+    return results
+
+
+def report_startup(results: Dict[str, Dict[str, float]]) -> str:
+    """Format startup results as a table"""
+    lines = [
+        "=" * 72,
+        "📊 AIStor Startup",
+        "=" * 72,
+        f"{'loaded from':>12} {'entries':>10} {'size MB':>10} {'serving s':>10} {'reconciled s':>13} {'orphans':>8}",
+    ]
+    for source, stats in results.items():
+        lines.append(
+            f"{source:>12} {stats['entries']:>10,} {stats['size_mb']:>10.0f} {stats['ready_s']:>10.2f} "
+            f"{stats['reconciled_s']:>13.2f} {stats['orphans']:>8}"
+        )
+    lines.append("=" * 72)
+    return "\n".join(lines)
+
+
+def benchmark_memory(sizes: List[int]) -> Dict[int, Dict[str, float]]:
+    """Bytes per entry of a restored cache's in-memory index, and of its metadata records"""
+    # FileMetadata as it was: a __dict__ per instance and the blob location kept on every entry
+    LegacyMetadata = make_dataclass("LegacyMetadata", [f.name for f in fields(FileMetadata)] + ["cache_location"])
+    results = {}
+    for num_entries in sizes:
+        with tempfile.TemporaryDirectory() as scratch:
+            print(f"🔄 Building a {num_entries:,}-entry cache...")
+            build_cache(Path(scratch), num_entries)
+            print("🔄 Restoring it with allocations traced...")
+            gc.collect()
+            tracemalloc.start()
+            before = tracemalloc.take_snapshot()
+            start = time.perf_counter()
+            aistor = make_aistor(scratch, 1 << 50)
+            restore_s = time.perf_counter() - start
+            aistor.reconciled.wait()
+            gc.collect()
+            after = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+            # Sketches have a fixed size whatever the entry count; only the per-entry index is counted
+            index_bytes = sum(
+                stat.size_diff for stat in after.compare_to(before, "filename")
+                if not stat.traceback[0].filename.endswith("sketches.py")
+            )
+
+            entries = list(aistor.metadata_cache.values())
+            legacy = [
+                LegacyMetadata(*(getattr(m, f.name) for f in fields(FileMetadata)), aistor.store.location(m.hash))
+                for m in entries
+            ]
+            results[num_entries] = {
+                "index_bytes": index_bytes / num_entries,
+                "legacy_record_bytes": sum(
+                    sys.getsizeof(m) + sys.getsizeof(m.__dict__) + sys.getsizeof(m.cache_location) for m in legacy
+                ) / num_entries,
+                "record_bytes": sum(sys.getsizeof(m) for m in entries) / num_entries,
+                "restore_s": restore_s,
+            }
+            del legacy, entries
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                aistor.close()
+    return results
+
+
+def report_memory(results: Dict[int, Dict[str, float]]) -> str:
+    """Format memory results as a table"""
+    lines = [
+        "=" * 72,
+        "📊 AIStor Memory per Cached Entry",
+        "=" * 72,
+        f"{'entries':>10} {'index B/entry':>14} {'record B (dict)':>16} {'record B (slots)':>17} {'restore s':>10}",
+    ]
+    for num_entries, stats in results.items():
+        lines.append(
+            f"{num_entries:>10,} {stats['index_bytes']:>14.0f} {stats['legacy_record_bytes']:>16.0f} "
+            f"{stats['record_bytes']:>17.0f} {stats['restore_s']:>10.2f}"
+        )
+    lines.append("-" * 72)
+    lines.append("index: metadata, policy, blob and store indexes after a restart, sketches excluded")
+    lines.append("record (dict): a FileMetadata with a __dict__ and its own location string")
+    lines.append("=" * 72)
+    return "\n".join(lines)
+
+
+def check_accounting(aistor: AIStor) -> List[str]:
+    """Invariants a race in the cache core would break"""
+    problems = []
+    entries = list(aistor.metadata_cache.values())
+    blob_sizes = {m.hash: m.disk_size for m in entries}
+    if aistor.logical_cache_size != sum(m.size for m in entries):
+        problems.append("logical size drifted")
+    if aistor.current_cache_size != sum(blob_sizes.values()):
+        problems.append("physical size drifted")
+    if aistor.uncompressed_cache_size != sum({m.hash: m.size for m in entries}.values()):
+        problems.append("uncompressed size drifted")
+    referenced = {p for paths in aistor.blob_paths.values() for p in paths}
+    if referenced != set(aistor.metadata_cache) or set(aistor.blob_paths) != set(blob_sizes):
+        problems.append("blob references out of sync")
+    if set(aistor.metadata_cache) - set(aistor.policy.sizes):
+        problems.append("entries unknown to the eviction policy")
+    return problems
+
+
+def benchmark_concurrency(thread_counts: List[int], ops_per_thread: int, layout: str,
+                          num_keys: int = 20000, write_ratio: float = 0.1) -> Dict[int, Dict]:
+    """Throughput of concurrent get_cached_file/cache_file calls on an over-subscribed cache"""
+    os.environ["CACHE_LAYOUT"] = layout
+    chunks = [os.urandom(random.Random(i).randint(1024, 4096)) for i in range(500)]
+
+    def payload(rng: random.Random, key: str) -> bytes:
+        # Mostly unique bodies, some shared ones for the dedup paths; a trailing digest lets
+        # readers detect torn or mixed-up reads
+        body = rng.choice(chunks) if rng.random() < 0.1 else key.encode() + rng.choice(chunks)
+        return body + hashlib.sha256(body).digest()
+
+    def intact(data: bytes) -> bool:
+        return hashlib.sha256(data[:-32]).digest() == data[-32:]
+
+    keys = [f"umi-data/demonstrations/pick_cube/demo_{i // 30:04d}/poses/poses_{i:06d}.json"
+            for i in range(num_keys)]
+    results = {}
+
+    for num_threads in thread_counts:
+        print(f"🔄 {num_threads} threads, {layout} layout...")
+        with tempfile.TemporaryDirectory() as scratch:
+            # Room for about a third of the keys, so writers keep evicting under readers
+            aistor = make_aistor(scratch, num_keys * 2560 // 3)
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                seed_rng = random.Random(0)
+                for key in keys:
+                    aistor.cache_file(key, payload(seed_rng, key))
+
+                corrupt = []
+                def worker(seed: int):
+                    rng = random.Random(seed)
+                    for _ in range(ops_per_thread):
+                        if rng.random() < write_ratio:
+                            # Refills land anywhere, including on evicted keys, so eviction keeps running
+                            key = rng.choice(keys)
+                            aistor.cache_file(key, payload(rng, key))
+                        else:
+                            key = keys[min(int(rng.paretovariate(1.2)) - 1, num_keys - 1) * 7919 % num_keys]
+                            data = aistor.get_cached_file(key)
+                            if data is None:
+                                # Cache-aside fill, as the gateway does after proxying a miss
+                                aistor.cache_file(key, payload(rng, key))
+                            elif not intact(data):
+                                corrupt.append(key)
+
+                threads = [threading.Thread(target=worker, args=(t,)) for t in range(num_threads)]
+                evictions_before = aistor.get_cache_stats()["evictions"]
+                start = time.perf_counter()
+                for t in threads:
+                    t.start()
+                for t in threads:
+                    t.join()
+                elapsed = time.perf_counter() - start
+                stats = aistor.get_cache_stats()
+                aistor.close()
+
+        results[num_threads] = {
+            "ops_per_s": num_threads * ops_per_thread / elapsed,
+            "hit_ratio": stats["hit_ratio"],
+            "evictions": stats["evictions"] - evictions_before,
+            "problems": check_accounting(aistor) + (["corrupt reads"] if corrupt else []),
+        }
+    return results
+
+
+def report_concurrency(results: Dict[int, Dict], layout: str) -> str:
+    """Format concurrency results as a table"""
+    base = results[min(results)]["ops_per_s"]
+    lines = [
+        "=" * 72,
+        f"📊 AIStor Concurrency Stress ({layout} layout, 90% reads / 10% writes)",
+        "=" * 72,
+        f"{'threads':>8} {'ops/s':>12} {'speedup':>8} {'hit ratio':>10} {'evictions':>10}  accounting",
+    ]
+    for num_threads, stats in results.items():
+        lines.append(
+            f"{num_threads:>8} {stats['ops_per_s']:>12,.0f} {stats['ops_per_s'] / base:>7.2f}x "
+            f"{stats['hit_ratio']:>10.3f} {stats['evictions']:>10,}  {', '.join(stats['problems']) or 'ok'}"
+        )
+    lines.append("=" * 72)
+    return "\n".join(lines)
+
+
+def umi_sensor_batches(num_batches: int, frames: int = 60, seed: int = 0) -> Iterator[Tuple[str, bytes]]:
+    """Pose and gripper batches shaped like generate_umi_data.py output (indent=2 JSON)"""
+    rng = random.Random(seed)
+    for b in range(num_batches):
+        start = b * frames
+        prefix = f"umi-data/demonstrations/pick_cube/demo_{b // 10:04d}"
+        poses, gripper = [], []
+        for frame_id in range(start, start + frames):
+            t = frame_id / 60
+            poses.append({
+                "timestamp": t, "demo_id": b // 10, "frame_id": frame_id,
+                "end_effector_pose": {
+                    "position": [0.5 + 0.1 * math.sin(t), 0.3 + 0.1 * math.cos(t), 0.2 + 0.05 * math.sin(2 * t)],
+                    "orientation": [0.0, 0.0, 0.0, 1.0],
+                },
+                "joint_angles": [rng.gauss(0, 0.1) for _ in range(7)],
+                "joint_velocities": [rng.gauss(0, 0.01) for _ in range(7)],
+            })
+            gripper.append({
+                "timestamp": t, "demo_id": b // 10, "frame_id": frame_id,
+                "gripper_state": rng.choice(["open", "closed", "moving"]),
+                "gripper_position": rng.uniform(0, 1),
+                "gripper_force": rng.uniform(0, 10),
+                "contact_detected": rng.choice([True, False]),
+            })
+        span = f"{start:06d}_{start + frames - 1:06d}"
+        yield f"{prefix}/poses/poses_{span}.json", json.dumps(poses, indent=2).encode()
+        yield f"{prefix}/gripper/gripper_{span}.json", json.dumps(gripper, indent=2).encode()
+
+
+def benchmark_compression(num_batches: int) -> Dict[str, Dict]:
+    """Write and read back the same sensor batches under every available codec"""
+    objects = list(umi_sensor_batches(num_batches))
+    raw_bytes = sum(len(data) for _, data in objects)
+    results = {}
+    os.environ["MEMORY_CACHE_SIZE"] = "0"  # Every read goes to disk and is decompressed
+    for mode in ["none"] + list(available_codecs()):
+        print(f"🔄 {len(objects):,} sensor batches ({raw_bytes / 1024 / 1024:.1f}MB), compression={mode}...")
+        os.environ["CACHE_COMPRESSION"] = mode
+        with tempfile.TemporaryDirectory() as scratch:
+            aistor = make_aistor(scratch, raw_bytes * 2)
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                start = time.perf_counter()
+                for key, data in objects:
+                    aistor.cache_file(key, data)
+                write_s = time.perf_counter() - start
+
+                start = time.perf_counter()
+                for key, data in objects:
+                    assert aistor.get_cached_file(key) == data
+                read_s = time.perf_counter() - start
+                stats = aistor.get_cache_stats()["compression"]
+                aistor.close()
+
+        results[mode] = {
+            "disk_mb": aistor.current_cache_size / 1024 / 1024,
+            "multiplier": stats["effective_capacity_multiplier"],
+            "write_us": write_s / len(objects) * 1e6,
+            "read_us": read_s / len(objects) * 1e6,
+        }
+    os.environ.pop("CACHE_COMPRESSION")
+    os.environ.pop("MEMORY_CACHE_SIZE")
+    return results
+
+
+def report_compression(results: Dict[str, Dict]) -> str:
+    """Format compression results as a table"""
+    lines = [
+        "=" * 72,
+        "📊 AIStor Compression (UMI pose/gripper JSON batches, disk reads)",
+        "=" * 72,
+        f"{'codec':>8} {'disk MB':>10} {'capacity x':>11} {'write us/obj':>13} {'read us/obj':>12}",
+    ]
+    for mode, stats in results.items():
+        lines.append(
+            f"{mode:>8} {stats['disk_mb']:>10.2f} {stats['multiplier']:>10.2f}x "
+            f"{stats['write_us']:>13.1f} {stats['read_us']:>12.1f}"
+        )
+    lines.append("=" * 72)
+    return "\n".join(lines)
+
+
+class SimulatedBackend:
+    """In-memory stand-in for MinIO with a fixed per-request latency, ETags and byte ranges"""
+
+    def __init__(self, objects: Dict[str, bytes], latency: float, bandwidth: float = 0.0):
+        self.objects = objects
+        self.latency = latency
+        self.bandwidth = bandwidth  # Bytes per second, 0 = transfers take no time
+        self.requests = 0
+        self.body_bytes = 0
+        self._etags: Dict[str, Tuple[bytes, str]] = {}
+
+    def _etag(self, file_path: str, data: bytes) -> str:
+        # Hashed once per object version; large objects would otherwise dominate the timings
+        cached = self._etags.get(file_path)
+        if cached is None or cached[0] is not data:
+            cached = self._etags[file_path] = (data, f'"{hashlib.md5(data).hexdigest()}"')
+        return cached[1]
+
+    def fetch_object(self, file_path: str, if_none_match: str = ""):
+        self.requests += 1
+        time.sleep(self.latency)
+        data = self.objects.get(file_path)
+        if data is None:
+            return None
+        etag = self._etag(file_path, data)
+        if etag == if_none_match:
+            return SourceObject(None, etag)
+        self.body_bytes += len(data)
+        return SourceObject(data, etag, size=len(data))
+
+    def fetch_range(self, file_path: str, offset: int, length: int, if_none_match: str = ""):
+        self.requests += 1
+        data = self.objects.get(file_path)
+        if data is None or offset >= len(data):
+            time.sleep(self.latency)
+            return None
+        etag = self._etag(file_path, data)
+        if etag == if_none_match:
+            time.sleep(self.latency)
+            return SourceObject(None, etag)
+        chunk = data[offset:offset + length]
+        time.sleep(self.latency + (len(chunk) / self.bandwidth if self.bandwidth else 0))
+        self.body_bytes += len(chunk)
+        return SourceObject(chunk, etag, size=len(data))
+
+    def object_size(self, file_path: str):
+        self.requests += 1
+        time.sleep(self.latency)
+        data = self.objects.get(file_path)
+        return None if data is None else len(data)
+
+    def list_objects(self, prefix: str):
+        self.requests += 1
+        time.sleep(self.latency)
+        return sorted((key, len(data)) for key, data in self.objects.items() if key.startswith(prefix))
+
+
+def benchmark_freshness(num_objects: int, duration: float, ttl: float, latency: float,
+                        object_size: int = 8192) -> Dict[str, Dict]:
+    """Random hits on entries that keep expiring, under each freshness mode"""
+    keys = [f"umi-data/demonstrations/pick_cube/demo_{i // 30:04d}/poses/poses_{i:06d}.json"
+            for i in range(num_objects)]
+    modes = [
+        ("no TTL", "0", "false"),
+        ("revalidate inline", str(ttl), "false"),
+        ("stale-while-revalidate", str(ttl), "true"),
+    ]
+    results = {}
+    for label, cache_ttl, swr in modes:
+        print(f"🔄 {label}: {num_objects:,} objects, TTL {ttl:g}s, {duration:g}s of reads...")
+        os.environ["CACHE_TTL"] = cache_ttl
+        os.environ["STALE_WHILE_REVALIDATE"] = swr
+        objects = {key: os.urandom(object_size) for key in keys}
+        with tempfile.TemporaryDirectory() as scratch:
+            aistor = make_aistor(scratch, num_objects * object_size * 2)
+            backend = aistor.backend = SimulatedBackend(objects, latency)
+            aistor.read_through = True
+            if float(cache_ttl) > 0:
+                aistor._revalidator = ThreadPoolExecutor(max_workers=4)
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                for key in keys:
+                    aistor.get_cached_file(key)
+                backend.requests = backend.body_bytes = 0
+
+                rng = random.Random(0)
+                latencies = []
+                stale = 0
+                deadline = time.perf_counter() + duration
+                while time.perf_counter() < deadline:
+                    key = rng.choice(keys)
+                    if rng.random() < 0.001:
+                        # Regenerated upstream; a reader should see it within one TTL
+                        objects[key] = os.urandom(object_size)
+                    start = time.perf_counter()
+                    data = aistor.get_cached_file(key)
+                    latencies.append(time.perf_counter() - start)
+                    stale += data != objects[key]
+                stats = aistor.get_cache_stats()["freshness"]
+                aistor.close()
+
+        latencies.sort()
+        results[label] = {
+            "reads_per_s": len(latencies) / duration,
+            "p50_us": latencies[len(latencies) // 2] * 1e6,
+            "p99_us": latencies[int(len(latencies) * 0.99)] * 1e6,
+            "stale_reads": stale / len(latencies),
+            "minio_requests": backend.requests,
+            "body_mb": backend.body_bytes / 1024 / 1024,
+            "not_modified": stats["revalidations"]["not_modified"],
+        }
+    os.environ.pop("CACHE_TTL")
+    os.environ.pop("STALE_WHILE_REVALIDATE")
+    return results
+
+
+def report_freshness(results: Dict[str, Dict], ttl: float, latency: float) -> str:
+    """Format freshness results as a table"""
+    lines = [
+        "=" * 72,
+        f"📊 AIStor Freshness (TTL {ttl:g}s, MinIO latency {latency * 1000:.0f}ms)",
+        "=" * 72,
+        f"{'mode':<23} {'reads/s':>8} {'p50 us':>7} {'p99 us':>8} {'stale':>7} {'GETs':>6} {'304s':>6} {'body MB':>7}",
+    ]
+    for label, stats in results.items():
+        lines.append(
+            f"{label:<23} {stats['reads_per_s']:>8,.0f} {stats['p50_us']:>7.1f} {stats['p99_us']:>8.1f} "
+            f"{stats['stale_reads']:>7.2%} {stats['minio_requests']:>6,} {stats['not_modified']:>6,} {stats['body_mb']:>7.2f}"
+        )
+    lines.append("=" * 72)
+    return "\n".join(lines)
+
+
+def benchmark_prefetch(num_demos: int, batches_per_demo: int, latency: float,
+                       compute: float, batch_size: int = 8192) -> Dict[str, Dict]:
+    """One epoch over pose batches per reader pattern, with and without prefetching"""
+    objects = {}
+    demos = []
+    for d in range(num_demos):
+        prefix = f"umi-data/demonstrations/pick_cube/demo_{d:04d}"
+        batches = [f"{prefix}/poses/poses_{i * 60:06d}_{i * 60 + 59:06d}.json"
+                   for i in range(batches_per_demo)]
+        objects[f"{prefix}/metadata.json"] = b"{}"
+        for key in batches:
+            objects[key] = os.urandom(batch_size)
+        demos.append((f"{prefix}/metadata.json", batches))
+
+    def sequential() -> Iterator[str]:
+        for metadata, batches in demos:
+            yield metadata
+            yield from batches
+
+    def shuffled() -> Iterator[str]:
+        keys = [key for _, batches in demos for key in batches]
+        random.Random(0).shuffle(keys)
+        yield from keys
+
+    results = {}
+    for pattern, reader in (("sequential", sequential), ("random", shuffled)):
+        for prefetch in (False, True):
+            label = f"{pattern}, {'prefetch' if prefetch else 'no prefetch'}"
+            print(f"🔄 {label}...")
+            with tempfile.TemporaryDirectory() as scratch:
+                aistor = make_aistor(scratch, len(objects) * batch_size * 2)
+                aistor.backend = SimulatedBackend(objects, latency)
+                aistor.read_through = True
+                if prefetch:
+                    aistor.prefetcher = Prefetcher(aistor)
+
+                with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                    start = time.perf_counter()
+                    for key in reader():
+                        aistor.get_cached_file(key)
+                        time.sleep(compute)  # Training step between batches
+                    elapsed = time.perf_counter() - start
+                    stats = aistor.get_cache_stats()
+                    aistor.close()
+
+            prefetched = stats["prefetch"] or {}
+            results[label] = {
+                "elapsed_s": elapsed,
+                "hit_ratio": stats["hit_ratio"],
+                "backend_requests": aistor.backend.requests,
+                "accuracy": prefetched.get("accuracy"),
+                "wasted_mb": prefetched.get("wasted_mb"),
+            }
+    return results
+
+
+def report_prefetch(results: Dict[str, Dict], latency: float, compute: float) -> str:
+    """Format prefetch results as a table"""
+    lines = [
+        "=" * 72,
+        f"📊 AIStor Prefetch (MinIO latency {latency * 1000:.0f}ms, {compute * 1000:.0f}ms per step)",
+        "=" * 72,
+        f"{'reader':<26} {'epoch s':>8} {'hit ratio':>10} {'MinIO GETs':>11} {'accuracy':>9} {'wasted MB':>10}",
+    ]
+    for label, stats in results.items():
+        accuracy = "-" if stats["accuracy"] is None else f"{stats['accuracy']:.3f}"
+        wasted = "-" if stats["wasted_mb"] is None else f"{stats['wasted_mb']:.2f}"
+        lines.append(
+            f"{label:<26} {stats['elapsed_s']:>8.2f} {stats['hit_ratio']:>10.3f} "
+            f"{stats['backend_requests']:>11,} {accuracy:>9} {wasted:>10}"
+        )
+    lines.append("=" * 72)
+    return "\n".join(lines)
+
+
+def benchmark_views(sizes: List[int], num_reads: int) -> Dict[int, Dict[str, float]]:
+    """Hit latency per read API for entries of each size, on the segment layout"""
+    os.environ["MEMORY_PROMOTE_AFTER"] = str(2 ** 31)  # Disk hits only: the RAM tier would hide the copy
+    results = {}
+    for size in sizes:
+        print(f"🔄 {size / 1024:,.0f}KB entries...")
+        keys = [f"umi-data/demonstrations/pick_cube/demo_0000/video/chunk_{i:06d}.npz" for i in range(8)]
+        with tempfile.TemporaryDirectory() as scratch:
+            aistor = make_aistor(scratch, len(keys) * size * 4)
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                for key in keys:
+                    aistor.cache_file(key, os.urandom(size))
+                reader, writer = socket.socketpair()
+                drain = threading.Thread(target=lambda: [None for _ in iter(lambda: reader.recv(1 << 20), b"")])
+                drain.start()
+
+                timings = {}
+                for label, read in (
+                    ("copy", lambda key: aistor.get_cached_file(key, False)),
+                    ("view", lambda key: aistor.get_cached_view(key, False)),
+                    ("copy+send", lambda key: writer.sendall(aistor.get_cached_file(key, False))),
+                    ("sendfile", lambda key: aistor.sendfile(key, writer)),
+                ):
+                    start = time.perf_counter()
+                    for i in range(num_reads):
+                        read(keys[i % len(keys)])
+                    timings[label] = (time.perf_counter() - start) / num_reads * 1e6
+                writer.close()
+                drain.join()
+                reader.close()
+                aistor.close()
+        results[size] = timings
+    os.environ.pop("MEMORY_PROMOTE_AFTER")
+    return results
+
+
+def report_views(results: Dict[int, Dict[str, float]]) -> str:
+    """Format read API results as a table"""
+    lines = [
+        "=" * 72,
+        "📊 AIStor Read APIs (us per disk hit, segment layout)",
+        "=" * 72,
+        f"{'entry size':>12} {'copy':>10} {'view':>10} {'copy+send':>12} {'sendfile':>10}",
+    ]
+    for size, timings in results.items():
+        lines.append(
+            f"{size / 1024:>10,.0f}KB {timings['copy']:>10.1f} {timings['view']:>10.1f} "
+            f"{timings['copy+send']:>12.1f} {timings['sendfile']:>10.1f}"
+        )
+    lines.append("=" * 72)
+    return "\n".join(lines)
+
+
+def benchmark_blocks(num_chunks: int, chunk_size: int, clips: int, clip_size: int, epochs: int,
+                     latency: float, bandwidth: float) -> Dict[str, Dict]:
+    """Clip reads at random offsets of large video chunks, repeated every epoch"""
+    rng = random.Random(0)
+    objects = {
+        f"umi-data/demonstrations/pick_cube/demo_{i:04d}/video/chunk_000000_000300.npz": os.urandom(chunk_size)
+        for i in range(num_chunks)
+    }
+    keys = sorted(objects)
+    windows = [(rng.choice(keys), rng.randrange(chunk_size - clip_size)) for _ in range(clips)]
+
+    results = {}
+    for mode in ("forwarded ranges", "block cache"):
+        print(f"🔄 {mode}: {clips} clips of {clip_size / 1024 / 1024:g}MB x {epochs} epochs...")
+        os.environ["BLOCK_CACHE"] = "true"
+        with tempfile.TemporaryDirectory() as scratch:
+            aistor = make_aistor(scratch, num_chunks * chunk_size * 2)
+            backend = aistor.backend = SimulatedBackend(objects, latency, bandwidth)
+            aistor.block_cache_enabled = True
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                start = time.perf_counter()
+                for epoch in range(epochs):
+                    order = list(windows)
+                    random.Random(epoch).shuffle(order)
+                    for key, offset in order:
+                        if mode == "block cache":
+                            data, _ = aistor.get_range(key, offset, offset + clip_size - 1)
+                        else:
+                            data = backend.fetch_range(key, offset, clip_size).data
+                        assert data == objects[key][offset:offset + clip_size]
+                elapsed = time.perf_counter() - start
+                stats = aistor.get_cache_stats()["blocks"]
+                aistor.close()
+
+        results[mode] = {
+            "elapsed_s": elapsed,
+            "minio_requests": backend.requests,
+            "body_mb": backend.body_bytes / 1024 / 1024,
+            "block_hit_ratio": stats["hit_ratio"] if mode == "block cache" else None,
+        }
+    os.environ.pop("BLOCK_CACHE")
+    return results
+
+
+def report_blocks(results: Dict[str, Dict], latency: float, bandwidth: float) -> str:
+    """Format block cache results as a table"""
+    lines = [
+        "=" * 72,
+        f"📊 AIStor Block Cache (MinIO latency {latency * 1000:.0f}ms, {bandwidth / 1024 / 1024:.0f}MB/s)",
+        "=" * 72,
+        f"{'mode':<20} {'elapsed s':>10} {'MinIO GETs':>11} {'MB from MinIO':>14} {'block hit ratio':>16}",
+    ]
+    for label, stats in results.items():
+        hit_ratio = "-" if stats["block_hit_ratio"] is None else f"{stats['block_hit_ratio']:.3f}"
+        lines.append(
+            f"{label:<20} {stats['elapsed_s']:>10.2f} {stats['minio_requests']:>11,} "
+            f"{stats['body_mb']:>14.1f} {hit_ratio:>16}"
+        )
+    lines.append("=" * 72)
+    return "\n".join(lines)
+
+
+def benchmark_pinning(num_demos: int, batches_per_demo: int, video_size: int, latency: float,
+                      bandwidth: float, workers: int, batch_size: int = 8192) -> Dict[str, Dict]:
+    """First epoch over a task's demos: cold, after a warm-up, and after a warm-up and a scan"""
+    objects = {}
+    for d in range(num_demos):
+        prefix = f"umi-data/demonstrations/pick_cube/demo_{d:04d}"
+        objects[f"{prefix}/metadata.json"] = b"{}"
+        for i in range(batches_per_demo):
+            objects[f"{prefix}/poses/poses_{i * 60:06d}_{i * 60 + 59:06d}.json"] = os.urandom(batch_size)
+        objects[f"{prefix}/video/chunk_000000_000300.npz"] = os.urandom(video_size)
+    dataset = sum(len(data) for data in objects.values())
+    cache_size = dataset * 2
+    epoch = sorted(objects)
+    random.Random(0).shuffle(epoch)
+    # Exploration of other data, twice the cache size, between the warm-up and the epoch
+    scan_size = 256 * 1024
+    scan = [f"umi-data/exploration/scan_{i:06d}.json" for i in range(2 * cache_size // scan_size)]
+
+    os.environ["EVICTION_WORKER"] = "false"
+    os.environ["BLOCK_CACHE"] = "true"
+    os.environ["PIN_MAX_FRACTION"] = "0.75"
+    results = {}
+    for mode in ("cold", "warmed", "warmed, unpinned + scan", "warmed, pinned + scan"):
+        print(f"🔄 {mode}: {len(objects):,} objects, {dataset / 1024 / 1024:.0f}MB...")
+        with tempfile.TemporaryDirectory() as scratch:
+            aistor = make_aistor(scratch, cache_size)
+            backend = aistor.backend = SimulatedBackend(objects, latency, bandwidth)
+            aistor.read_through = aistor.block_cache_enabled = True
+            aistor.warmer = Warmer(aistor, workers)
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                warmup = 0.0
+                if mode != "cold":
+                    start = time.perf_counter()
+                    pin = aistor.pin(prefixes=["umi-data/demonstrations/pick_cube/"], priority=1, ttl=3600)
+                    while aistor.pin_status(pin["pin_id"])["warmup"]["state"] in ("listing", "running"):
+                        time.sleep(0.005)
+                    warmup = time.perf_counter() - start
+                if mode.endswith("scan"):
+                    if "unpinned" in mode:
+                        aistor.unpin(pin["pin_id"])
+                    for key in scan:
+                        aistor.cache_file(key, os.urandom(scan_size))
+                pinned_mb = aistor.pinned_bytes / 1024 / 1024
+
+                backend.requests = 0
+                start = time.perf_counter()
+                for key in epoch:
+                    if len(objects[key]) > aistor.small_file_threshold:
+                        data, _ = aistor.get_range(key, 0)
+                    else:
+                        data = aistor.get_cached_file(key)
+                    assert data == objects[key]
+                elapsed = time.perf_counter() - start
+                aistor.close()
+
+        results[mode] = {
+            "warmup_s": warmup,
+            "epoch_s": elapsed,
+            "minio_requests": backend.requests,
+            "pinned_mb": pinned_mb,
+        }
+    for name in ("EVICTION_WORKER", "BLOCK_CACHE", "PIN_MAX_FRACTION"):
+        os.environ.pop(name)
+    return results
+
+
+def report_pinning(results: Dict[str, Dict], latency: float, workers: int) -> str:
+    """Format pinning results as a table"""
+    lines = [
+        "=" * 72,
+        f"📊 AIStor Pinning and Warm-up (MinIO latency {latency * 1000:.0f}ms, {workers} warm-up workers)",
+        "=" * 72,
+        f"{'mode':<26} {'warm-up s':>10} {'epoch s':>8} {'MinIO GETs in epoch':>20} {'pinned MB':>10}",
+    ]
+    for label, stats in results.items():
+        lines.append(
+            f"{label:<26} {stats['warmup_s']:>10.2f} {stats['epoch_s']:>8.2f} "
+            f"{stats['minio_requests']:>20,} {stats['pinned_mb']:>10.1f}"
+        )
+    lines.append("=" * 72)
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Microbenchmark AIStor cache internals')
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    eviction = subparsers.add_parser('eviction', help='Hit and eviction cost vs. cache entry count')
+    eviction.add_argument('--sizes', default='1000,10000,100000,1000000',
+                          help='Comma-separated entry counts')
+    eviction.add_argument('--ops', type=int, default=20000, help='Cache hits timed per size')
+
+    policies = subparsers.add_parser('policies', help='Compare eviction policies on a robotics trace')
+    policies.add_argument('--cache-size', default='8MB', help='Cache capacity, e.g. 8MB')
+    policies.add_argument('--requests', type=int, default=200000, help='Hot-set requests in the trace')
+
+    admission = subparsers.add_parser('admission', help='Hit ratio gain of the frequency admission filter')
+    admission.add_argument('--cache-size', default='8MB', help='Cache capacity, e.g. 8MB')
+    admission.add_argument('--requests', type=int, default=200000, help='Hot-set requests in the trace')
+    admission.add_argument('--scan-every', type=int, default=5000,
+                           help='Hot-set requests between exploration scans')
+
+    belady = subparsers.add_parser('belady', help='Hit ratio of shuffled epochs with the access sequence loaded')
+    belady.add_argument('--demos', type=int, default=40, help='Demos in the training set')
+    belady.add_argument('--batches', type=int, default=100, help='Pose batches per demo')
+    belady.add_argument('--epochs', type=int, default=4, help='Shuffled passes over the training set')
+    belady.add_argument('--fractions', default='0.25,0.5,0.75', help='Cache sizes as fractions of the working set')
+
+    watermarks = subparsers.add_parser('watermarks', help='Write latency: inline eviction vs. the eviction worker')
+    watermarks.add_argument('--writes', type=int, default=40000, help='Entries written in total')
+    watermarks.add_argument('--threads', type=int, default=4, help='Concurrent writers')
+    watermarks.add_argument('--entry-size', default='16KB', help='Size of each entry')
+    watermarks.add_argument('--cache-size', default='64MB', help='Cache capacity, e.g. 64MB')
+
+    hotness = subparsers.add_parser('hotness', help='Top files: full sort vs. heavy-hitter summaries')
+    hotness.add_argument('--sizes', default='10000,100000,1000000', help='Comma-separated entry counts')
+    hotness.add_argument('--requests', type=int, default=500000, help='Zipf-distributed requests recorded')
+
+    simulate_ = subparsers.add_parser('simulate', help='Miss-ratio curves from a trace: exact vs. SHARDS-sampled')
+    simulate_.add_argument('--requests', type=int, default=500000, help='Hot-set requests in the trace')
+    simulate_.add_argument('--demos', type=int, default=20000, help='Distinct demos read by the hot set')
+    simulate_.add_argument('--sizes', default='8MB,16MB,32MB,64MB,128MB,256MB,512MB',
+                           help='Comma-separated cache sizes')
+
+    prefixes = subparsers.add_parser('prefixes', help='Prefix stats and invalidation: scan vs. prefix trie')
+    prefixes.add_argument('--sizes', default='10000,100000,1000000', help='Comma-separated entry counts')
+
+    metrics = subparsers.add_parser('metrics', help='Cost of metric updates on the hot path')
+    metrics.add_argument('--threads', default='1,4,16', help='Comma-separated thread counts')
+    metrics.add_argument('--ops', type=int, default=200000, help='Updates per thread')
+
+    layout = subparsers.add_parser('layout', help='Compare one-file-per-object with packed segments')
+    layout.add_argument('--objects', type=int, default=1000000, help='Objects to write')
+    layout.add_argument('--min-size', type=int, default=2048, help='Smallest object in bytes')
+    layout.add_argument('--max-size', type=int, default=20480, help='Largest object in bytes')
+    layout.add_argument('--reads', type=int, default=200000, help='Random reads timed')
+
+    metadata = subparsers.add_parser('metadata', help='Full JSON snapshot vs. batched SQLite flush')
+    metadata.add_argument('--sizes', default='10000,100000,1000000', help='Comma-separated entry counts')
+    metadata.add_argument('--changes', type=int, default=1000, help='Entries accessed per flush interval')
+
+    startup = subparsers.add_parser('startup', help='Restart time of a large cache')
+    startup.add_argument('--entries', type=int, default=1000000, help='Cached entries to restore')
+
+    memory = subparsers.add_parser('memory', help='Bytes per cached entry after a restart')
+    memory.add_argument('--sizes', default='100000,1000000', help='Comma-separated entry counts')
+
+    concurrency = subparsers.add_parser('concurrency', help='Multithreaded stress test of the cache core')
+    concurrency.add_argument('--threads', default='1,2,4,8,16', help='Comma-separated thread counts')
+    concurrency.add_argument('--ops', type=int, default=20000, help='Operations per thread')
+    concurrency.add_argument('--layout', default='segments', choices=['segments', 'files'],
+                             help='Cache layout to stress')
+
+    compression = subparsers.add_parser('compression', help='Capacity gain and cost of each compression codec')
+    compression.add_argument('--batches', type=int, default=2000, help='Pose/gripper batch pairs to cache')
+
+    freshness = subparsers.add_parser('freshness', help='TTL revalidation: inline vs. stale-while-revalidate')
+    freshness.add_argument('--objects', type=int, default=500, help='Cached objects read at random')
+    freshness.add_argument('--duration', type=float, default=5.0, help='Seconds of reads per mode')
+    freshness.add_argument('--ttl', type=float, default=2.0, help='CACHE_TTL in seconds')
+    freshness.add_argument('--latency', type=float, default=0.005, help='Simulated MinIO latency in seconds')
+
+    prefetch = subparsers.add_parser('prefetch', help='Sequential and random readers with and without prefetching')
+    prefetch.add_argument('--demos', type=int, default=20, help='Demonstrations read per epoch')
+    prefetch.add_argument('--batches', type=int, default=30, help='Pose batches per demonstration')
+    prefetch.add_argument('--latency', type=float, default=0.005, help='Simulated MinIO latency in seconds')
+    prefetch.add_argument('--compute', type=float, default=0.002, help='Reader time per batch in seconds')
+
+    views = subparsers.add_parser('views', help='Copying reads vs. mapped views and sendfile')
+    views.add_argument('--sizes', default='4KB,64KB,1MB,8MB', help='Comma-separated entry sizes')
+    views.add_argument('--reads', type=int, default=2000, help='Hits timed per API and size')
+
+    blocks = subparsers.add_parser('blocks', help='Clip reads from large objects: forwarded ranges vs. cached blocks')
+    blocks.add_argument('--chunks', type=int, default=8, help='Video chunks to read clips from')
+    blocks.add_argument('--chunk-size', default='32MB', help='Size of each video chunk')
+    blocks.add_argument('--clips', type=int, default=100, help='Distinct clips read per epoch')
+    blocks.add_argument('--clip-size', default='2MB', help='Bytes per clip read')
+    blocks.add_argument('--epochs', type=int, default=3, help='Passes over the clips')
+    blocks.add_argument('--latency', type=float, default=0.005, help='Simulated MinIO latency in seconds')
+    blocks.add_argument('--bandwidth', default='500MB', help='Simulated MinIO bandwidth per second')
+
+    pinning = subparsers.add_parser('pinning', help='First epoch cold vs. pinned and warmed up')
+    pinning.add_argument('--demos', type=int, default=16, help='Demos of the task pinned')
+    pinning.add_argument('--batches', type=int, default=30, help='Pose batches per demo')
+    pinning.add_argument('--video-size', default='2MB', help='Size of each demo\'s video chunk')
+    pinning.add_argument('--latency', type=float, default=0.005, help='Simulated MinIO latency in seconds')
+    pinning.add_argument('--bandwidth', default='500MB', help='Simulated MinIO bandwidth per second')
+    pinning.add_argument('--workers', type=int, default=8, help='Warm-up workers')
+
+    args = parser.parse_args()
+
+    if args.benchmark == 'eviction':
+        sizes = [int(s) for s in args.sizes.split(',')]
+        print(report_eviction(benchmark_eviction(sizes, args.ops)))
+    elif args.benchmark == 'policies':
+        capacity = AIStor._parse_size(args.cache_size)
+        print(report_policies(benchmark_policies(capacity, args.requests), capacity))
+    elif args.benchmark == 'admission':
+        capacity = AIStor._parse_size(args.cache_size)
+        print(report_admission(benchmark_admission(capacity, args.requests, args.scan_every), capacity))
+    elif args.benchmark == 'belady':
+        fractions = [float(f) for f in args.fractions.split(',')]
+        print(report_belady(benchmark_belady(args.demos, args.batches, args.epochs, fractions), args.epochs))
+    elif args.benchmark == 'watermarks':
+        results = benchmark_watermarks(args.writes, args.threads, AIStor._parse_size(args.entry_size),
+                                       AIStor._parse_size(args.cache_size))
+        print(report_watermarks(results))
+    elif args.benchmark == 'hotness':
+        sizes = [int(s) for s in args.sizes.split(',')]
+        print(report_hotness(benchmark_hotness(sizes, args.requests), args.requests))
+    elif args.benchmark == 'simulate':
+        sizes = [AIStor._parse_size(s) for s in args.sizes.split(',')]
+        print(report_simulate(benchmark_simulate(args.requests, args.demos, sizes), sizes))
+    elif args.benchmark == 'prefixes':
+        sizes = [int(s) for s in args.sizes.split(',')]
+        print(report_prefixes(benchmark_prefixes(sizes)))
+    elif args.benchmark == 'metrics':
+        thread_counts = [int(t) for t in args.threads.split(',')]
+        print(report_metrics(benchmark_metrics(thread_counts, args.ops)))
+    elif args.benchmark == 'layout':
+        print(report_layout(benchmark_layout(args.objects, args.min_size, args.max_size, args.reads)))
+    elif args.benchmark == 'metadata':
+        sizes = [int(s) for s in args.sizes.split(',')]
+        print(report_metadata(benchmark_metadata(sizes, args.changes), args.changes))
+    elif args.benchmark == 'startup':
+        print(report_startup(benchmark_startup(args.entries)))
+    elif args.benchmark == 'memory':
+        sizes = [int(s) for s in args.sizes.split(',')]
+        print(report_memory(benchmark_memory(sizes)))
+    elif args.benchmark == 'concurrency':
+        thread_counts = [int(t) for t in args.threads.split(',')]
+        print(report_concurrency(benchmark_concurrency(thread_counts, args.ops, args.layout), args.layout))
+    elif args.benchmark == 'compression':
+        print(report_compression(benchmark_compression(args.batches)))
+    elif args.benchmark == 'freshness':
+        results = benchmark_freshness(args.objects, args.duration, args.ttl, args.latency)
+        print(report_freshness(results, args.ttl, args.latency))
+    elif args.benchmark == 'prefetch':
+        results = benchmark_prefetch(args.demos, args.batches, args.latency, args.compute)
+        print(report_prefetch(results, args.latency, args.compute))
+    elif args.benchmark == 'views':
+        sizes = [AIStor._parse_size(s) for s in args.sizes.split(',')]
+        print(report_views(benchmark_views(sizes, args.reads)))
+    elif args.benchmark == 'blocks':
+        bandwidth = AIStor._parse_size(args.bandwidth)
+        results = benchmark_blocks(args.chunks, AIStor._parse_size(args.chunk_size), args.clips,
+                                   AIStor._parse_size(args.clip_size), args.epochs, args.latency, bandwidth)
+        print(report_blocks(results, args.latency, bandwidth))
+    elif args.benchmark == 'pinning':
+        results = benchmark_pinning(args.demos, args.batches, AIStor._parse_size(args.video_size), args.latency,
+                                    AIStor._parse_size(args.bandwidth), args.workers)
+        print(report_pinning(results, args.latency, args.workers))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Offline cache simulator for AIStor
+Replays an access trace recorded with TRACE_FILE against many cache sizes,
+SMALL_FILE_THRESHOLD values and eviction policies, and prints miss-ratio
+curves to size the sidecar from real traffic instead of guessing.
+
+LRU curves come from byte stack distances: one pass over the trace gives
+the miss ratio at every cache size at once. Other policies are replayed
+request by request, every (policy, size, threshold) cache fed in the same
+single pass. Traces can be SHARDS-sampled further here: a sampled trace
+is simulated against caches scaled down by the sampling rate, so a 1%
+sample answers for full-size caches at a hundredth of the cost.
+
+Keys are hashed in a trace, so SMALL_FILE_THRESHOLD is the only caching
+rule applied; the file-type check of should_cache is not simulated.
+"""
+
+import argparse
+import json
+import sys
+import time
+from bisect import bisect_right
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from admission import AdmissionFilter
+from policies import POLICIES, access, create_policy
+from tracing import OP_HIT, OP_MISS, OP_PUT, read_trace, sampled, sampling_threshold
+
+MIN_CURVE_SIZE = 1024 * 1024
+
+
+@dataclass
+class Trace:
+    """Requests of a trace, ready to replay"""
+    sampling: float
+    requests: List[Tuple[int, int]]    # (key hash, size)
+    missing: int = 0                    # misses on keys never filled, e.g. not found in MinIO
+    expected: float = 0.0               # requests a sample at this rate should hold, see load_trace
+
+    @property
+    def total(self) -> float:
+        return self.expected or len(self.requests) + self.missing
+
+
+def load_trace(path: str, sampling: Optional[float] = None) -> Trace:
+    """Hits and misses of a trace file with their object sizes, optionally sampled further"""
+    recorded_rate, records = read_trace(path)
+    rate = recorded_rate if sampling is None else sampling
+    if not 0 < rate <= recorded_rate:
+        raise ValueError(f"Sampling must be in (0, {recorded_rate}] for a trace recorded at {recorded_rate}")
+    threshold = sampling_threshold(rate)
+
+    records = list(records)
+    # SHARDS_adj: a few hot keys falling in or out of the sample skew it, so miss ratios
+    # are taken over the requests the sample should hold rather than the ones it got
+    expected = sum(1 for r in records if r[3] != OP_PUT) * rate / recorded_rate
+    records = [r for r in records if sampled(r[1], threshold)]
+    # Misses are recorded before the object size is known; take it from the puts and hits
+    sizes: Dict[int, int] = {}
+    for _, key, size, _ in records:
+        if size:
+            sizes[key] = size
+    requests = []
+    missing = 0
+    for _, key, _, op in records:
+        if op != OP_HIT and op != OP_MISS:
+            continue
+        size = sizes.get(key)
+        if size is None:
+            missing += 1
+        else:
+            requests.append((key, size))
+    return Trace(rate, requests, missing, expected)
+
+
+class _Fenwick:
+    """Prefix sums over request positions"""
+
+    def __init__(self, n: int):
+        self.tree = [0] * (n + 1)
+
+    def add(self, i: int, value: int) -> None:
+        i += 1
+        tree = self.tree
+        while i < len(tree):
+            tree[i] += value
+            i += i & -i
+
+    def prefix(self, i: int) -> int:
+        """Sum of positions 0..i-1"""
+        total = 0
+        tree = self.tree
+        while i:
+            total += tree[i]
+            i &= i - 1
+        return total
+
+
+def stack_distances(requests: Sequence[Tuple[int, int]], max_object_size: int) -> Tuple[List[int], int, int]:
+    """(sorted byte stack distances of reuses, cold misses, uncacheable requests)
+
+    The byte stack distance of a reuse is the size of the key plus that of every
+    distinct key requested since its last request: LRU hits on it exactly when
+    the cache holds at least that many bytes.
+    """
+    positions = _Fenwick(len(requests))
+    last_seen: Dict[int, int] = {}
+    resident = 0
+    distances = []
+    cold = 0
+    uncacheable = 0
+    for t, (key, size) in enumerate(requests):
+        if size > max_object_size:
+            uncacheable += 1
+            continue
+        previous = last_seen.get(key)
+        if previous is None:
+            cold += 1
+            resident += size
+        else:
+            distances.append(resident - positions.prefix(previous + 1) + size)
+            positions.add(previous, -size)
+        positions.add(t, size)
+        last_seen[key] = t
+    distances.sort()
+    return distances, cold, uncacheable
+
+
+def lru_curve(trace: Trace, cache_sizes: Sequence[int], max_object_size: int) -> List[float]:
+    """LRU miss ratio at each cache size, in bytes of the full (unsampled) cache"""
+    distances, cold, uncacheable = stack_distances(trace.requests, max_object_size)
+    if not trace.total:
+        return [0.0] * len(cache_sizes)
+    misses = cold + uncacheable + trace.missing
+    return [
+        min(1.0, (misses + len(distances) - bisect_right(distances, size * trace.sampling)) / trace.total)
+        for size in cache_sizes
+    ]
+
+
+def simulate(trace: Trace, policies: Sequence[str], cache_sizes: Sequence[int],
+             thresholds: Sequence[int], admission: bool = False) -> Dict[Tuple[str, int, int], float]:
+    """Miss ratio of every (policy, cache size, threshold) cache, all fed in one pass over the trace"""
+    caches = []
+    for name in policies:
+        for size in cache_sizes:
+            capacity = max(1, int(size * trace.sampling))
+            for threshold in thresholds:
+                # Sized like AIStor's own filter for the scaled-down cache
+                admission_filter = AdmissionFilter(max(1024, min(capacity // 4096, 1 << 20))) if admission else None
+                caches.append(((name, size, threshold), create_policy(name, capacity), admission_filter, threshold))
+
+    for key, size in trace.requests:
+        for _, policy, admission_filter, threshold in caches:
+            access(policy, key, size, admission_filter, threshold)
+
+    return {
+        cell: min(1.0, (policy.stats.misses + trace.missing) / trace.total) if trace.total else 0.0
+        for cell, policy, _, _ in caches
+    }
+
+
+def miss_ratio_curves(trace: Trace, policies: Sequence[str], cache_sizes: Sequence[int],
+                      thresholds: Sequence[int], admission: bool = False) -> Dict[Tuple[str, int, int], float]:
+    """Miss ratio per (policy, cache size, threshold); LRU without admission from stack distances"""
+    results = {}
+    replayed = list(policies)
+    if "lru" in replayed and not admission:
+        replayed.remove("lru")
+        for threshold in thresholds:
+            for size, ratio in zip(cache_sizes, lru_curve(trace, cache_sizes, threshold)):
+                results[("lru", size, threshold)] = ratio
+    if replayed:
+        results.update(simulate(trace, replayed, cache_sizes, thresholds, admission))
+    return results
+
+
+def default_sizes(trace: Trace, max_object_size: int) -> List[int]:
+    """Powers of two from 1MB up to the first size that holds the whole working set"""
+    working_set = sum(
+        size for size in dict(trace.requests).values() if size <= max_object_size
+    ) / trace.sampling
+    sizes = [MIN_CURVE_SIZE]
+    while sizes[-1] < working_set:
+        sizes.append(sizes[-1] * 2)
+    return sizes
+
+
+def report(results: Dict[Tuple[str, int, int], float], trace: Trace, elapsed: float) -> str:
+    """Format miss ratios as one column per cache size and a row per policy and threshold"""
+    sizes = sorted({size for _, size, _ in results})
+    rows = sorted({(name, threshold) for name, _, threshold in results},
+                  key=lambda row: (list(POLICIES).index(row[0]), row[1]))
+    width = 22 + 9 * len(sizes)
+    lines = [
+        "=" * width,
+        f"📊 Miss-ratio curves: {trace.total:,.0f} requests "
+        f"sampled at {trace.sampling:g}, simulated in {elapsed:.2f}s",
+        "=" * width,
+        f"{'policy':>8} {'threshold':>12} " + "".join(f"{_format_size(size):>9}" for size in sizes),
+    ]
+    for name, threshold in rows:
+        lines.append(
+            f"{name:>8} {_format_size(threshold):>12} "
+            + "".join(f"{results[(name, size, threshold)]:>9.3f}" for size in sizes)
+        )
+    lines.append("=" * width)
+    return "\n".join(lines)
+
+
+def _format_size(size: int) -> str:
+    for suffix, multiplier in (("GB", 1024 ** 3), ("MB", 1024 ** 2), ("KB", 1024)):
+        if size >= multiplier and size % multiplier == 0:
+            return f"{size // multiplier}{suffix}"
+    return f"{size}B"
+
+
+def main():
+    from optimizer import AIStor
+
+    parser = argparse.ArgumentParser(description="Miss-ratio curves from an AIStor access trace")
+    parser.add_argument('trace', help='Trace file recorded with TRACE_FILE')
+    parser.add_argument('--policies', default='lru', help=f"Comma-separated policies from: {', '.join(POLICIES)}")
+    parser.add_argument('--sizes', default='',
+                        help='Comma-separated cache sizes, e.g. 256MB,1GB (default: powers of two up to the working set)')
+    parser.add_argument('--thresholds', default='1MB', help='Comma-separated SMALL_FILE_THRESHOLD values')
+    parser.add_argument('--sampling', type=float, default=None,
+                        help='SHARDS sampling rate to simulate at, at most the recorded rate')
+    parser.add_argument('--admission', action='store_true', help='Put the frequency admission filter in front')
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+    args = parser.parse_args()
+
+    policies = [p.strip() for p in args.policies.split(',') if p.strip()]
+    unknown = [p for p in policies if p not in POLICIES]
+    if unknown:
+        parser.error(f"Unknown policies {', '.join(unknown)}, expected some of: {', '.join(POLICIES)}")
+    thresholds = [AIStor._parse_size(t) for t in args.thresholds.split(',')]
+
+    start = time.perf_counter()
+    trace = load_trace(args.trace, args.sampling)
+    sizes = ([AIStor._parse_size(s) for s in args.sizes.split(',')] if args.sizes
+             else default_sizes(trace, max(thresholds)))
+    results = miss_ratio_curves(trace, policies, sizes, thresholds, args.admission)
+    elapsed = time.perf_counter() - start
+
+    if args.json:
+        json.dump({
+            "sampling": trace.sampling,
+            "requests": round(trace.total),
+            "elapsed_s": round(elapsed, 3),
+            "miss_ratios": [
+                {"policy": name, "cache_size": size, "threshold": threshold, "miss_ratio": round(ratio, 5)}
+                for (name, size, threshold), ratio in sorted(results.items())
+            ],
+        }, sys.stdout, indent=2)
+        print()
+    else:
+        print(report(results, trace, elapsed))
+
+
+if __name__ == "__main__":
+    main()
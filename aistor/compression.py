@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Transparent compression for AIStor cache entries
+Pose and gripper JSON from generate_umi_data.py is indented text that
+shrinks 5-10x, so text entries are stored compressed and inflated again
+on read. The codec is chosen by content type: zstd (or zlib when zstd is
+not installed) for text, lz4 for binary pickles, nothing for formats that
+are already compressed. An entry is stored raw when compressing it does
+not save enough to pay for the decompression on every read.
+"""
+
+import threading
+import zlib
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import lz4.frame
+except ImportError:
+    lz4 = None
+
+# Codec preference per content type; the first one installed is used
+TEXT_SUFFIXES = {'.json', '.yaml', '.yml', '.csv', '.txt'}
+BINARY_SUFFIXES = {'.pkl', '.npy'}
+TEXT_CODECS = ("zstd", "zlib", "lz4")
+BINARY_CODECS = ("lz4", "zstd", "zlib")
+
+
+class Codec:
+    """A named compress/decompress pair"""
+
+    def __init__(self, name: str, compress: Callable[[bytes], bytes], decompress: Callable[[bytes], bytes]):
+        self.name = name
+        self.compress = compress
+        self.decompress = decompress
+
+
+def _zstd_codec(level: int = 3) -> Codec:
+    # zstd contexts are not thread-safe; each thread keeps its own pair
+    local = threading.local()
+
+    def compress(data: bytes) -> bytes:
+        try:
+            compressor = local.compressor
+        except AttributeError:
+            compressor = local.compressor = zstandard.ZstdCompressor(level=level)
+        return compressor.compress(data)
+
+    def decompress(data: bytes) -> bytes:
+        try:
+            decompressor = local.decompressor
+        except AttributeError:
+            decompressor = local.decompressor = zstandard.ZstdDecompressor()
+        return decompressor.decompress(data)
+
+    return Codec("zstd", compress, decompress)
+
+
+def available_codecs() -> Dict[str, Codec]:
+    """Codecs usable in this environment; zlib is always there"""
+    codecs = {"zlib": Codec("zlib", lambda data: zlib.compress(data, 6), zlib.decompress)}
+    if zstandard is not None:
+        codecs["zstd"] = _zstd_codec()
+    if lz4 is not None:
+        codecs["lz4"] = Codec("lz4", lz4.frame.compress, lz4.frame.decompress)
+    return codecs
+
+
+class Compressor:
+    """Picks a codec per entry, compresses it when that pays off, and decodes stored entries"""
+
+    def __init__(self, mode: str = "auto", min_size: int = 512, min_saving: float = 0.1):
+        self.codecs = available_codecs()
+        mode = mode.lower()
+        if mode not in ("auto", "none") and mode not in self.codecs:
+            raise ValueError(
+                f"Unknown or unavailable compression '{mode}', expected auto, none or one of: "
+                f"{', '.join(self.codecs)}"
+            )
+        self.mode = mode
+        self.min_size = min_size
+        self.min_saving = min_saving
+        self.text_codec = self._first(TEXT_CODECS)
+        self.binary_codec = self._first(BINARY_CODECS)
+        self.compressed = 0
+        self.skipped = 0
+
+    def _first(self, preference: Tuple[str, ...]) -> Codec:
+        if self.mode not in ("auto", "none"):
+            return self.codecs[self.mode]
+        return next(self.codecs[name] for name in preference if name in self.codecs)
+
+    def codec_for(self, file_path: str) -> Optional[Codec]:
+        """Codec for a key's content type, None for formats not worth compressing"""
+        if self.mode == "none":
+            return None
+        suffix = Path(file_path).suffix.lower()
+        if suffix in TEXT_SUFFIXES:
+            return self.text_codec
+        if suffix in BINARY_SUFFIXES:
+            return self.binary_codec
+        return None
+
+    def encode(self, file_path: str, data: bytes) -> Tuple[str, bytes]:
+        """(codec name, payload) to store; the name is empty when the payload is the raw data"""
+        codec = self.codec_for(file_path)
+        if codec is None or len(data) < self.min_size:
+            return "", data
+        payload = codec.compress(data)
+        if len(payload) > len(data) * (1 - self.min_saving):
+            self.skipped += 1
+            return "", data
+        self.compressed += 1
+        return codec.name, payload
+
+    def decode(self, codec: str, payload: bytes) -> bytes:
+        """Raw data from a stored payload"""
+        if not codec:
+            return payload
+        return self.codecs[codec].decompress(payload)
+
+    def stats(self) -> Dict:
+        return {
+            "mode": self.mode,
+            "text_codec": self.text_codec.name,
+            "binary_codec": self.binary_codec.name,
+            "compressed_writes": self.compressed,
+            "skipped_writes": self.skipped,
+        }
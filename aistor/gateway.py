@@ -0,0 +1,626 @@
+#!/usr/bin/env python3
+"""
+AIStor S3 Gateway
+S3-compatible HTTP front end for AIStor on port 8080. Object GET/HEAD
+requests for cached files are answered from the local cache; everything
+else is proxied to the MinIO nodes, streaming bodies through untouched.
+
+Requests are forwarded with the client's own signed headers (Host
+included), the same way nginx.conf fronts the cluster, so unmodified
+boto3 clients authenticate against MinIO as usual. Cache hits never reach
+MinIO, so the gateway checks them first: requests signed with its own
+MINIO_ACCESS_KEY are verified locally (sigv4.py), any other goes to MinIO
+as a conditional GET under the caller's signature and is served from the
+cache on a 304. Hits are sent from read-only views of the cache's own
+mappings, not copies.
+
+Concurrent GET misses for the same key are coalesced: the first one goes
+upstream and fills the cache, the rest wait for it and are answered from
+the cache. Cached objects keep MinIO's ETag and Last-Modified, and expired
+ones are revalidated by AIStor before (or while) they are served.
+
+Objects too large to cache whole, up to BLOCK_CACHE_MAX_OBJECT, are served
+from byte-range blocks: a Range GET (or a full GET of such an object) only
+fetches the blocks that are not cached yet, and long spans are streamed a
+run of blocks at a time. Ranges of larger objects, and of small ones not
+cached yet, are forwarded to MinIO.
+
+ListObjectsV2 responses are kept for LIST_CACHE_TTL seconds, so dataloader
+workers listing the same demos at every start don't all reach MinIO. A
+write or delete through the gateway, multi-object deletes included, drops
+the cached copies of the keys and every listing it could change.
+
+Cache administration is kept off the S3 port: the admin API listens on
+ADMIN_HOST:ADMIN_PORT (127.0.0.1:8081 by default) and, when ADMIN_TOKEN
+is set, requires it as a Bearer token. /_cache/prefix reports and
+invalidates what is cached under a prefix, /_cache/pins pins prefixes
+or key manifests against eviction for a lease and warms them up from
+MinIO; GET reports progress, DELETE releases. /_cache/schedule takes a
+job's upcoming reads, one key per line, and evicts by them (Belady)
+until they are done or the lease runs out.
+"""
+
+import asyncio
+import hmac
+import itertools
+import mimetypes
+import time
+import xml.etree.ElementTree as ElementTree
+from contextlib import asynccontextmanager
+from email.utils import formatdate
+from typing import TYPE_CHECKING, AsyncIterator, Dict, List, Optional, Tuple
+
+import httpx
+import uvicorn
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.background import BackgroundTask
+
+from backend import parse_http_date
+from sigv4 import SigV4Verifier
+
+if TYPE_CHECKING:
+    from optimizer import AIStor
+
+# Headers that describe a single connection and must not be forwarded
+HOP_BY_HOP_HEADERS = {
+    "connection", "keep-alive", "proxy-authenticate", "proxy-authorization",
+    "te", "trailers", "transfer-encoding", "upgrade",
+}
+
+# Client conditions that a conditional request of the gateway's own would conflict with
+CONDITIONAL_HEADERS = {"if-match", "if-none-match", "if-modified-since", "if-unmodified-since"}
+
+# Object-level query parameters that make a GET something other than a plain read
+NON_CACHEABLE_PARAMS = {"versionId", "partNumber", "uploadId", "acl", "tagging", "retention", "legal-hold"}
+
+# ListObjectsV2 parameters; a bucket GET with any other one is some other request
+LIST_PARAMS = {
+    "list-type", "prefix", "delimiter", "max-keys", "continuation-token", "start-after",
+    "encoding-type", "fetch-owner",
+}
+
+
+def parse_delete_keys(body: bytes) -> Optional[List[str]]:
+    """Keys of a multi-object delete request (<Delete><Object><Key>), or None if the body is not one"""
+    try:
+        root = ElementTree.fromstring(body)
+    except ElementTree.ParseError:
+        return None
+    # Tags carry the S3 namespace when the client sends one
+    return [
+        child.text or "" for obj in root if obj.tag.rpartition("}")[2] == "Object"
+        for child in obj if child.tag.rpartition("}")[2] == "Key"
+    ]
+
+
+def parse_range(header: str) -> Optional[Tuple[int, Optional[int]]]:
+    """(start, inclusive end or None) of a single 'bytes=a-b' or 'bytes=a-' range, else None"""
+    unit, _, spec = header.partition("=")
+    first, dash, last = spec.strip().partition("-")
+    if unit.strip().lower() != "bytes" or not dash or "," in spec or not first.strip().isdigit():
+        # Multiple ranges and suffix ranges ('bytes=-500') go to MinIO as they are
+        return None
+    start = int(first)
+    if not last.strip():
+        return start, None
+    if not last.strip().isdigit() or int(last) < start:
+        return None
+    return start, int(last)
+
+
+def _forward_headers(headers) -> List[Tuple[str, str]]:
+    return [(k, v) for k, v in headers.items() if k.lower() not in HOP_BY_HOP_HEADERS]
+
+
+class MinIOProxy:
+    """Async streaming proxy over the MinIO nodes, with round-robin and failover"""
+
+    def __init__(self, endpoints: List[str], secure: bool = False, timeout: float = 60.0):
+        scheme = "https" if secure else "http"
+        self.base_urls = [f"{scheme}://{endpoint}" for endpoint in endpoints]
+        self._next = itertools.count()
+        self.client = httpx.AsyncClient(
+            timeout=httpx.Timeout(timeout, connect=2.0),
+            limits=httpx.Limits(max_connections=256, max_keepalive_connections=64),
+        )
+
+    async def send(self, request: Request, extra_headers: Optional[Dict[str, str]] = None) -> httpx.Response:
+        """Forward a request, plus any unsigned extra_headers, and return the upstream response unread"""
+        if not self.base_urls:
+            raise httpx.ConnectError("No MinIO endpoints configured")
+
+        start = next(self._next) % len(self.base_urls)
+        base_urls = self.base_urls[start:] + self.base_urls[:start]
+        if request.method in ("PUT", "POST"):
+            # Uploads stream straight through; a consumed body cannot be replayed on another node
+            base_urls, content = base_urls[:1], request.stream()
+        else:
+            content = None
+        last_error: Optional[Exception] = None
+
+        for base_url in base_urls:
+            upstream = self.client.build_request(
+                request.method,
+                f"{base_url}{request.url.path}",
+                params=request.url.query,
+                headers=_forward_headers(request.headers) + list((extra_headers or {}).items()),
+                content=content,
+            )
+            try:
+                return await self.client.send(upstream, stream=True)
+            except (httpx.ConnectError, httpx.ConnectTimeout) as e:
+                last_error = e
+
+        raise last_error
+
+    async def close(self):
+        await self.client.aclose()
+
+
+def _object_headers(aistor: "AIStor", file_path: str) -> Dict[str, str]:
+    metadata = aistor.metadata_cache[file_path]
+    content_type, _ = mimetypes.guess_type(file_path)
+    return {
+        "Content-Type": content_type or "application/octet-stream",
+        "Content-Length": str(metadata.size),
+        "ETag": metadata.etag or f'"{metadata.hash}"',
+        "Last-Modified": formatdate(metadata.last_modified or metadata.last_access, usegmt=True),
+        "Accept-Ranges": "bytes",
+        "X-AIStor-Cache": "HIT",
+    }
+
+
+def _block_headers(file_path: str, info, length: int, cache_status: str) -> Dict[str, str]:
+    content_type, _ = mimetypes.guess_type(file_path)
+    return {
+        "Content-Type": content_type or "application/octet-stream",
+        "Content-Length": str(length),
+        "ETag": info.etag,
+        "Last-Modified": formatdate(info.last_modified or time.time(), usegmt=True),
+        "Accept-Ranges": "bytes",
+        "X-AIStor-Cache": cache_status,
+    }
+
+
+class ViewResponse(Response):
+    """Response that sends a memoryview of the cache as is instead of copying it into bytes"""
+
+    def render(self, content) -> bytes:
+        if isinstance(content, memoryview):
+            return content
+        return super().render(content)
+
+
+async def _counted(chunks: AsyncIterator[bytes], counter) -> AsyncIterator[bytes]:
+    async for chunk in chunks:
+        counter.inc(len(chunk))
+        yield chunk
+
+
+def _proxied_response(upstream: httpx.Response, content=b"", cache_status: str = "MISS",
+                      stream: bool = False, on_close=None, served=None) -> Response:
+    headers = {k: v for k, v in upstream.headers.items() if k.lower() not in HOP_BY_HOP_HEADERS}
+    headers["X-AIStor-Cache"] = cache_status
+    if stream:
+        body = upstream.aiter_raw()
+        return StreamingResponse(
+            _counted(body, served) if served is not None else body,
+            status_code=upstream.status_code,
+            headers=headers,
+            background=BackgroundTask(on_close or upstream.aclose),
+        )
+    return Response(content=content, status_code=upstream.status_code, headers=headers)
+
+
+def create_admin_app(aistor: "AIStor", token: str = "") -> FastAPI:
+    """Build the admin API (/_cache/*) for a listener of its own, requiring token as a Bearer token if set"""
+    app = FastAPI(title="AIStor Gateway Admin")
+
+    @app.middleware("http")
+    async def require_token(request: Request, call_next):
+        if token and not hmac.compare_digest(request.headers.get("authorization", ""), f"Bearer {token}"):
+            return JSONResponse({"error": "Missing or wrong admin token"}, status_code=401)
+        return await call_next(request)
+
+    @app.get("/_cache/prefix")
+    async def cached_prefix(prefix: str = "", delimiter: str = "/"):
+        """What is cached under a bucket/key prefix: totals, keys and sub-prefixes"""
+        try:
+            listing = aistor.list_cached(prefix, delimiter)
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+        return dict(aistor.prefix_stats(prefix), keys=listing["keys"], prefixes=listing["prefixes"])
+
+    @app.delete("/_cache/prefix")
+    async def invalidate_prefix(prefix: str = ""):
+        if not prefix:
+            return JSONResponse({"error": "A prefix is required"}, status_code=400)
+        dropped = await asyncio.to_thread(aistor.invalidate_prefix, prefix)
+        return {"prefix": prefix, "invalidated": dropped}
+
+    @app.post("/_cache/pins")
+    async def create_pin(request: Request):
+        """Pin {"prefixes": [...], "keys": [...], "priority": 0, "ttl": seconds, "warm": true}"""
+        try:
+            spec = await request.json()
+            if not isinstance(spec, dict):
+                raise ValueError("Expected a JSON object")
+            # Types are checked by pin: a string here would otherwise be taken character by character
+            status = await asyncio.to_thread(
+                aistor.pin, spec.get("prefixes", []), spec.get("keys", []), spec.get("priority", 0),
+                spec.get("ttl"), bool(spec.get("warm", True))
+            )
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+        return JSONResponse(status, status_code=201)
+
+    @app.get("/_cache/pins")
+    async def list_pins():
+        return {"pins": aistor.list_pins()}
+
+    @app.get("/_cache/pins/{pin_id}")
+    async def pin_status(pin_id: str):
+        status = aistor.pin_status(pin_id)
+        if status is None:
+            return JSONResponse({"error": f"No pin {pin_id}"}, status_code=404)
+        return status
+
+    @app.post("/_cache/pins/{pin_id}/renew")
+    async def renew_pin(pin_id: str, ttl: Optional[float] = None):
+        try:
+            status = aistor.renew_pin(pin_id, ttl)
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+        if status is None:
+            return JSONResponse({"error": f"No pin {pin_id}"}, status_code=404)
+        return status
+
+    @app.delete("/_cache/pins/{pin_id}")
+    async def unpin(pin_id: str):
+        if not await asyncio.to_thread(aistor.unpin, pin_id):
+            return JSONResponse({"error": f"No pin {pin_id}"}, status_code=404)
+        return {"pin_id": pin_id, "released": True}
+
+    @app.put("/_cache/schedule")
+    async def load_schedule(request: Request, ttl: Optional[float] = None):
+        """Upload an access sequence: 'bucket/key' lines in the order the job will read them"""
+        body = await request.body()
+        keys = [line.strip() for line in body.decode(errors="replace").splitlines() if line.strip()]
+        try:
+            status = await asyncio.to_thread(aistor.load_schedule, keys, ttl)
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+        return JSONResponse(status, status_code=201)
+
+    @app.get("/_cache/schedule")
+    async def schedule_status():
+        status = aistor.schedule_status()
+        if status is None:
+            return JSONResponse({"error": "No access schedule loaded"}, status_code=404)
+        return status
+
+    @app.post("/_cache/schedule/renew")
+    async def renew_schedule(ttl: Optional[float] = None):
+        try:
+            status = aistor.renew_schedule(ttl)
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+        if status is None:
+            return JSONResponse({"error": "No access schedule loaded"}, status_code=404)
+        return status
+
+    @app.delete("/_cache/schedule")
+    async def unload_schedule():
+        if not await asyncio.to_thread(aistor.unload_schedule):
+            return JSONResponse({"error": "No access schedule loaded"}, status_code=404)
+        return {"unloaded": True}
+
+    return app
+
+
+def create_app(aistor: "AIStor") -> FastAPI:
+    """Build the gateway application around an AIStor instance"""
+    proxy = MinIOProxy(aistor.minio_endpoints, secure=aistor.minio_secure)
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        yield
+        await proxy.close()
+
+    app = FastAPI(title="AIStor Gateway", lifespan=lifespan)
+    verifier = SigV4Verifier({aistor.minio_access_key: aistor.minio_secret_key})
+    # GET misses currently being fetched, resolved once the cache fill decision is made
+    inflight: Dict[str, asyncio.Future] = {}
+
+    @app.get("/health")
+    async def health():
+        stats = aistor.get_cache_stats()
+        return {
+            "status": "ok",
+            "cached_files": stats["total_cached_files"],
+            "cache_utilization": stats["cache_utilization"],
+        }
+
+    @app.get("/metrics")
+    async def metrics():
+        return PlainTextResponse(aistor.metrics.render(), media_type="text/plain; version=0.0.4")
+
+    async def forward(request: Request) -> Response:
+        try:
+            upstream = await proxy.send(request)
+        except httpx.HTTPError as e:
+            return JSONResponse({"error": f"MinIO unavailable: {e}"}, status_code=502)
+        return _proxied_response(upstream, stream=True, served=aistor.metrics.served_from_minio)
+
+    def signed_by_gateway(request: Request) -> bool:
+        """Whether a request carries a valid signature by the gateway's own MinIO credentials"""
+        path = request.scope.get("raw_path") or request.url.path.encode()
+        return verifier.verify(request.method, path.decode(), request.url.query, request.headers.items())
+
+    async def authorize(request: Request, etag: str) -> Optional[Response]:
+        """None if the caller may be served the cached copy with this ETag, else the response to send instead
+        
+        Callers without the gateway's credentials are MinIO's to check: their
+        request goes upstream under its own signature, conditional on the ETag,
+        and a 304 means they may read it. MinIO's answer is sent otherwise.
+        """
+        if signed_by_gateway(request):
+            return None
+        conditional = bool(etag) and not CONDITIONAL_HEADERS & set(request.headers.keys())
+        try:
+            upstream = await proxy.send(request, {"If-None-Match": etag} if conditional else None)
+        except httpx.HTTPError as e:
+            return JSONResponse({"error": f"MinIO unavailable: {e}"}, status_code=502)
+        aistor.metrics.backend_requests.inc()
+        if conditional and upstream.status_code == 304:
+            await upstream.aclose()
+            return None
+        return _proxied_response(upstream, stream=True, served=aistor.metrics.served_from_minio)
+
+    @app.get("/{bucket}")
+    async def list_objects(bucket: str, request: Request) -> Response:
+        params = request.query_params
+        if params.get("list-type") != "2" or not set(params) <= LIST_PARAMS:
+            return await forward(request)
+        prefix = f"{bucket}/{params.get('prefix', '')}"
+        query = "&".join(sorted(f"{k}={v}" for k, v in params.multi_items()))
+        body = aistor.cached_listing(prefix, query)
+        # Listings have no ETag to make MinIO's check conditional on: other callers are misses
+        if body is not None and signed_by_gateway(request):
+            aistor.metrics.list_hits.inc()
+            return Response(content=body, media_type="application/xml", headers={"X-AIStor-Cache": "HIT"})
+
+        aistor.metrics.list_misses.inc()
+        generation = aistor.prefixes.listing_generation
+        try:
+            upstream = await proxy.send(request)
+        except httpx.HTTPError as e:
+            return JSONResponse({"error": f"MinIO unavailable: {e}"}, status_code=502)
+        if upstream.status_code != 200 or "content-encoding" in upstream.headers:
+            return _proxied_response(upstream, stream=True, served=aistor.metrics.served_from_minio)
+        try:
+            data = await upstream.aread()
+        finally:
+            await upstream.aclose()
+        aistor.cache_listing(prefix, query, data, generation)
+        return _proxied_response(upstream, content=data)
+
+    @app.api_route("/{bucket}/{key:path}", methods=["GET", "HEAD"])
+    async def read_object(bucket: str, key: str, request: Request) -> Response:
+        file_path = f"{bucket}/{key}"
+        if not key and request.method == "GET":
+            return await list_objects(bucket, request)
+        if not key or NON_CACHEABLE_PARAMS & set(request.query_params):
+            return await forward(request)
+        if "range" in request.headers:
+            return await read_range(file_path, request)
+
+        if request.method == "HEAD" and aistor.is_fresh(file_path):
+            headers = _object_headers(aistor, file_path)
+            denied = await authorize(request, headers["ETag"])
+            return denied if denied is not None else Response(headers=headers)
+        if request.method == "GET":
+            pending = inflight.get(file_path)
+            if pending is not None:
+                # Shielded: a client hanging up must not cancel the leader's flight
+                await asyncio.shield(pending)
+            # Disk reads, and a MinIO round trip when revalidating first: keep them off the event loop
+            data = await asyncio.to_thread(aistor.get_cached_view, file_path, False)
+            if data is not None:
+                headers = _object_headers(aistor, file_path)
+                denied = await authorize(request, headers["ETag"])
+                if denied is not None:
+                    return denied
+                if pending is not None:
+                    aistor.metrics.coalesced_requests.inc()
+                return ViewResponse(content=data, headers=headers)
+            info = aistor.block_objects.get(file_path)
+            if info is not None:
+                # Known large object: assembled from its blocks, fetching only the missing ones
+                denied = await authorize(request, info.etag)
+                if denied is not None:
+                    return denied
+                response = await read_blocks(file_path, 0, None, ranged=False)
+                if response is not None:
+                    return response
+
+        if request.method != "GET" or file_path in inflight:
+            return await fetch_miss(file_path, request)
+        flight = inflight[file_path] = asyncio.get_running_loop().create_future()
+        try:
+            return await fetch_miss(file_path, request)
+        finally:
+            # Runs once the cache is filled, or as soon as the body is known to be streamed
+            del inflight[file_path]
+            flight.set_result(None)
+
+    async def fetch_miss(file_path: str, request: Request) -> Response:
+        start = time.perf_counter()
+        try:
+            upstream = await proxy.send(request)
+        except httpx.HTTPError as e:
+            return JSONResponse({"error": f"MinIO unavailable: {e}"}, status_code=502)
+        aistor.metrics.backend_requests.inc()
+
+        async def finish():
+            await upstream.aclose()
+            aistor.metrics.miss_latency.observe(time.perf_counter() - start)
+
+        if request.method == "HEAD":
+            await finish()
+            return _proxied_response(upstream)
+
+        size = int(upstream.headers.get("content-length", -1))
+        if (upstream.status_code == 200 and "content-encoding" not in upstream.headers
+                and aistor.block_cache_enabled and aistor.small_file_threshold < size <= aistor.block_max_object_size):
+            # Large object: read it as blocks instead, so later reads of any part of it are hits
+            await finish()
+            response = await read_blocks(file_path, 0, None, ranged=False)
+            return response if response is not None else await forward(request)
+        if (upstream.status_code == 200 and "content-encoding" not in upstream.headers
+                and 0 <= size and aistor.should_cache(file_path, size)):
+            # Small enough to hold: read it whole, keep a copy, answer from memory
+            try:
+                data = await upstream.aread()
+            finally:
+                await finish()
+            # Compressing, writing and evicting can take a while: not on the event loop
+            await asyncio.to_thread(aistor.cache_file, file_path, data, upstream.headers.get("etag", ""),
+                                    parse_http_date(upstream.headers.get("last-modified")))
+            aistor.metrics.served_from_minio.inc(len(data))
+            return _proxied_response(upstream, content=data)
+
+        # Large or uncacheable: stream chunk by chunk, never buffering the body
+        return _proxied_response(upstream, stream=True, on_close=finish,
+                                 served=aistor.metrics.served_from_minio)
+
+    async def read_range(file_path: str, request: Request) -> Response:
+        byte_range = parse_range(request.headers["range"])
+        if request.method != "GET" or byte_range is None or not aistor.block_cache_enabled:
+            return await forward(request)
+        start, end = byte_range
+        
+        if aistor.is_fresh(file_path):
+            # Cached whole: slice the cached copy
+            data = await asyncio.to_thread(aistor.get_cached_view, file_path, False)
+            if data is not None and start < len(data):
+                end = len(data) - 1 if end is None else min(end, len(data) - 1)
+                headers = _object_headers(aistor, file_path)
+                denied = await authorize(request, headers["ETag"])
+                if denied is not None:
+                    return denied
+                headers.update({
+                    "Content-Length": str(end - start + 1),
+                    "Content-Range": f"bytes {start}-{end}/{len(data)}",
+                })
+                return ViewResponse(content=data[start:end + 1], status_code=206, headers=headers)
+        
+        info = aistor.block_objects.get(file_path)
+        if info is not None:
+            denied = await authorize(request, info.etag)
+            if denied is not None:
+                return denied
+        elif not signed_by_gateway(request):
+            # Nothing to make MinIO's check conditional on: its answer is the response
+            return await forward(request)
+        response = await read_blocks(file_path, start, end, ranged=True)
+        # Unknown objects and unsatisfiable ranges get MinIO's own answer
+        return response if response is not None else await forward(request)
+    
+    async def read_blocks(file_path: str, start: int, end: Optional[int], ranged: bool) -> Optional[Response]:
+        """Serve part or all of a large object from cached blocks; None if that is not possible
+        
+        get_range hands back a bounded run of blocks per call, so a long span
+        is streamed one run after another instead of assembled in memory.
+        """
+        misses = aistor.metrics.block_misses.value
+        try:
+            # Missing blocks mean blocking MinIO reads: keep them off the event loop
+            result = await asyncio.to_thread(aistor.get_range, file_path, start, end)
+        except Exception as e:
+            print(f"❌ Block read failed for {file_path}: {e}")
+            return None
+        if result is None:
+            return None
+        data, info = result
+        last = info.size - 1 if end is None else min(end, info.size - 1)
+        # Approximate under concurrency; the counters are exact
+        cache_status = "HIT" if aistor.metrics.block_misses.value == misses else "MISS"
+        headers = _block_headers(file_path, info, last - start + 1, cache_status)
+        status_code = 200
+        if ranged:
+            headers["Content-Range"] = f"bytes {start}-{last}/{info.size}"
+            status_code = 206
+        if start + len(data) > last:
+            return Response(content=data, status_code=status_code, headers=headers)
+        return StreamingResponse(stream_blocks(file_path, info, data, start + len(data), last),
+                                 status_code=status_code, headers=headers)
+    
+    async def stream_blocks(file_path: str, info, data: bytes, offset: int, last: int) -> AsyncIterator[bytes]:
+        """The rest of a block read after its first run, fetched run by run as the client takes it"""
+        yield data
+        while offset <= last:
+            result = await asyncio.to_thread(aistor.get_range, file_path, offset, last)
+            if result is None or result[1].etag != info.etag:
+                # The length sent already belongs to the old version: cut the response short
+                raise RuntimeError(f"{file_path} changed in MinIO while being sent")
+            data = result[0]
+            offset += len(data)
+            yield data
+    
+    @app.api_route("/{path:path}", methods=["GET", "HEAD", "PUT", "POST", "DELETE"])
+    async def passthrough(path: str, request: Request) -> Response:
+        bucket, _, key = path.partition("/")
+        multi_delete = request.method == "POST" and not key and "delete" in request.query_params
+        if multi_delete:
+            # The deleted keys are only named in the body (at most 1000 of them): read it first,
+            # the forwarded request is then sent from the buffered copy
+            deleted = parse_delete_keys(await request.body())
+        response = await forward(request)
+
+        # Writes and deletes through the gateway must not leave stale copies behind
+        if request.method in ("PUT", "POST", "DELETE") and response.status_code < 300:
+            if key:
+                await asyncio.to_thread(aistor.invalidate, f"{bucket}/{key}")
+            elif multi_delete and deleted is not None:
+                await asyncio.to_thread(invalidate_keys, bucket, deleted)
+            elif multi_delete:
+                # Keys unknown: anything cached in the bucket may be gone
+                await asyncio.to_thread(aistor.invalidate_prefix, f"{bucket}/")
+            else:
+                # Other bucket-level changes leave objects as they are, but any listing may be stale
+                aistor.prefixes.drop_listings(f"{bucket}/", subtree=True)
+        return response
+
+    def invalidate_keys(bucket: str, keys: List[str]) -> None:
+        """Drop the cached copies and blocks of the keys a multi-object delete named"""
+        # Listings of the bucket may be stale even where none of the keys were cached
+        aistor.prefixes.drop_listings(f"{bucket}/", subtree=True)
+        for key in keys:
+            aistor.invalidate(f"{bucket}/{key}")
+
+    return app
+
+
+def serve(aistor: "AIStor", host: str = "0.0.0.0", port: int = 8080,
+          admin_host: str = "127.0.0.1", admin_port: int = 8081, admin_token: str = ""):
+    """Run the gateway, and the admin API on its own listener (admin_port 0 for none), until interrupted"""
+    servers = [uvicorn.Server(uvicorn.Config(create_app(aistor), host=host, port=port, log_level="warning"))]
+    print(f"🌐 AIStor gateway listening on {host}:{port}")
+    if admin_port:
+        servers.append(uvicorn.Server(uvicorn.Config(
+            create_admin_app(aistor, admin_token), host=admin_host, port=admin_port, log_level="warning"
+        )))
+        print(f"🌐 AIStor admin API listening on {admin_host}:{admin_port}"
+              f"{' (token required)' if admin_token else ''}")
+
+    async def run():
+        tasks = [asyncio.create_task(server.serve()) for server in servers]
+        # Only one of them gets the signal handlers: when it stops, so does the other
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for server in servers:
+            server.should_exit = True
+        await asyncio.gather(*tasks)
+
+    asyncio.run(run())
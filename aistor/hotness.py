@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Heavy-hitter tracking for AIStor
+Reports the most requested files, and the hottest tasks and demos of the
+UMI layout (<bucket>/demonstrations/<task>/demo_XXXX/...), without sorting
+or scanning the cache: each is a Space-Saving summary of bounded size.
+
+Only a random sample of requests is recorded, each standing for
+`sampling` requests, which keeps the cost per request to a random draw
+while keys popular enough to make a top list are still counted closely.
+"""
+
+import random
+from typing import Dict, Optional, Tuple
+
+from sketches import SpaceSaving
+
+
+def dataset_prefixes(file_path: str) -> Tuple[str, Optional[str]]:
+    """(task prefix, demo prefix) of a key; keys outside a demo count towards their directory only"""
+    demo = file_path.find("/demo_")
+    if demo < 0:
+        directory = file_path.rpartition("/")[0]
+        return (directory + "/" if directory else ""), None
+    end = file_path.find("/", demo + 6)
+    if end < 0:
+        return file_path[:demo + 1], None
+    return file_path[:demo + 1], file_path[:end + 1]
+
+
+class HeavyHitters:
+    """Most requested files, tasks and demos"""
+
+    def __init__(self, capacity: int = 64, sample_size: int = 0, sampling: int = 16):
+        self.files = SpaceSaving(capacity, sample_size)
+        self.tasks = SpaceSaving(capacity, sample_size)
+        self.demos = SpaceSaving(capacity, sample_size)
+        self.sampling = max(1, sampling)
+        self._rate = 1 / self.sampling
+        self._random = random.Random()
+
+    def record(self, file_path: str) -> None:
+        """Count a request for a file (hit or miss), sampled"""
+        if self.sampling > 1 and self._random.random() >= self._rate:
+            return
+        self.add(file_path, self.sampling)
+
+    def add(self, file_path: str, count: int) -> None:
+        """Count count requests for a file, e.g. access counts restored after a restart"""
+        self.files.add(file_path, count)
+        task, demo = dataset_prefixes(file_path)
+        self.tasks.add(task, count)
+        if demo is not None:
+            self.demos.add(demo, count)
+
+    def stats(self, n: int = 5) -> Dict:
+        return {
+            "tasks": self.tasks.top(n),
+            "demos": self.demos.top(n),
+        }
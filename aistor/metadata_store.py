@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+AIStor metadata store
+Cache metadata persisted in SQLite (WAL mode) instead of a JSON snapshot.
+
+Changes are queued in memory and written by a background flusher in one
+transaction per interval, so persistence cost follows the number of
+entries that changed rather than the size of the cache. Access-count and
+last-access bumps only rewrite those two columns; at most one flush
+interval of changes is lost on a crash.
+
+Entries do not carry their blob's location: locate(hash), normally the
+blob store's location(), supplies it when a row is written.
+
+On a clean shutdown the whole table is also written to a compact binary
+index (cache_index.bin) that loads several times faster than a SELECT.
+Startup consumes and deletes it, so after a crash the next start falls
+back to SQLite, which is always authoritative.
+"""
+
+import json
+import os
+import sqlite3
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    file_path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    hash TEXT NOT NULL,
+    access_count INTEGER NOT NULL,
+    last_access REAL NOT NULL,
+    cache_location TEXT,
+    stored_size INTEGER NOT NULL DEFAULT 0,
+    codec TEXT NOT NULL DEFAULT '',
+    etag TEXT NOT NULL DEFAULT '',
+    last_modified REAL NOT NULL DEFAULT 0,
+    expires_at REAL NOT NULL DEFAULT 0
+) WITHOUT ROWID
+"""
+
+# Columns added after the first release, with their definitions for upgrading old databases
+ADDED_COLUMNS = {
+    "stored_size": "INTEGER NOT NULL DEFAULT 0",
+    "codec": "TEXT NOT NULL DEFAULT ''",
+    "etag": "TEXT NOT NULL DEFAULT ''",
+    "last_modified": "REAL NOT NULL DEFAULT 0",
+    "expires_at": "REAL NOT NULL DEFAULT 0",
+}
+
+UPSERT = "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+TOUCH = "UPDATE files SET access_count = ?, last_access = ? WHERE file_path = ?"
+DELETE = "DELETE FROM files WHERE file_path = ?"
+
+# Index snapshot: header, then NUL-separated key/hash/location/codec/etag strings, then fixed-size records
+INDEX_HEADER = struct.Struct("<4sQQ")
+INDEX_MAGIC = b"AIX3"
+INDEX_RECORD = struct.Struct("<QQdQdd")
+INDEX_STRINGS = 5
+
+# Row order matches the FileMetadata fields, with the blob location after last_access
+Row = Tuple[str, int, str, int, float, Optional[str], int, str, str, float, float]
+
+
+class MetadataStore:
+    """SQLite-backed FileMetadata table with batched, change-proportional writes"""
+
+    def __init__(self, path: Path, locate: Optional[Callable[[str], Optional[str]]] = None):
+        self.path = path
+        self.locate = locate or (lambda file_hash: None)
+        self.index_path = path.with_name("cache_index.bin")
+        self.db = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        # WAL + NORMAL: commits survive a process crash and only an OS crash can lose the tail
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute(SCHEMA)
+        columns = {row[1] for row in self.db.execute("PRAGMA table_info(files)")}
+        for name, definition in ADDED_COLUMNS.items():
+            if name not in columns:
+                self.db.execute(f"ALTER TABLE files ADD COLUMN {name} {definition}")
+
+        # Pending changes: full rows (None = delete) and access-only bumps
+        self._dirty: Dict[str, Optional[object]] = {}
+        self._touched: Dict[str, object] = {}
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._flusher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+        self.flushes = 0
+        self.rows_written = 0
+        self.last_flush_ms = 0.0
+        self.loaded_from = ""
+
+    def put(self, metadata) -> None:
+        """Queue a full row write (new entry, rewrite or relocation)"""
+        with self._lock:
+            self._dirty[metadata.file_path] = metadata
+
+    def touch(self, metadata) -> None:
+        """Queue an access-count / last-access update"""
+        with self._lock:
+            self._touched[metadata.file_path] = metadata
+
+    def delete(self, file_path: str) -> None:
+        with self._lock:
+            self._dirty[file_path] = None
+
+    def flush(self) -> int:
+        """Write all pending changes in a single transaction; returns rows written"""
+        with self._lock:
+            dirty, self._dirty = self._dirty, {}
+            touched, self._touched = self._touched, {}
+        if not dirty and not touched:
+            return 0
+
+        # Read the live objects now so each row is written with its latest values
+        upserts = [self._row(m) for m in dirty.values() if m is not None]
+        deletes = [(path,) for path, m in dirty.items() if m is None]
+        touches = [
+            (m.access_count, m.last_access, path)
+            for path, m in touched.items() if path not in dirty
+        ]
+
+        start = time.perf_counter()
+        with self._db_lock:
+            with self.db:
+                self.db.execute("BEGIN")
+                self.db.executemany(DELETE, deletes)
+                self.db.executemany(UPSERT, upserts)
+                self.db.executemany(TOUCH, touches)
+
+        written = len(upserts) + len(deletes) + len(touches)
+        self.flushes += 1
+        self.rows_written += written
+        self.last_flush_ms = (time.perf_counter() - start) * 1000
+        return written
+
+    def load(self) -> List[Row]:
+        """All persisted rows, least recently accessed first"""
+        rows = self.read_index()
+        if rows is not None:
+            self.loaded_from = "index"
+            return rows
+        with self._db_lock:
+            self.loaded_from = "sqlite"
+            return self.db.execute("SELECT * FROM files ORDER BY last_access").fetchall()
+
+    def _row(self, metadata) -> Row:
+        return (metadata.file_path, metadata.size, metadata.hash, metadata.access_count,
+                metadata.last_access, self.locate(metadata.hash), metadata.stored_size, metadata.codec,
+                metadata.etag, metadata.last_modified, metadata.expires_at)
+
+    def write_index(self, entries: Iterable) -> int:
+        """Snapshot entries (least recently accessed first) to a compact index file"""
+        ordered = sorted(entries, key=lambda m: m.last_access)
+        strings = "\0".join(
+            f"{m.file_path}\0{m.hash}\0{self.locate(m.hash) or ''}\0{m.codec}\0{m.etag}" for m in ordered
+        ).encode()
+        records = b"".join(
+            INDEX_RECORD.pack(m.size, m.access_count, m.last_access, m.stored_size, m.last_modified, m.expires_at)
+            for m in ordered
+        )
+
+        tmp = self.index_path.with_suffix(".tmp")
+        with open(tmp, 'wb') as f:
+            f.write(INDEX_HEADER.pack(INDEX_MAGIC, len(ordered), len(strings)))
+            f.write(strings)
+            f.write(records)
+            f.flush()
+            os.fsync(f.fileno())
+        tmp.rename(self.index_path)
+        return len(ordered)
+
+    def read_index(self) -> Optional[List[Row]]:
+        """Rows from the index snapshot, or None if there is no usable one; the file is consumed"""
+        try:
+            blob = self.index_path.read_bytes()
+        except FileNotFoundError:
+            return None
+        # Whatever happens next, a crash must not let this snapshot outlive later changes
+        self.index_path.unlink()
+
+        if len(blob) < INDEX_HEADER.size:
+            return None
+        magic, count, strings_len = INDEX_HEADER.unpack_from(blob)
+        records_at = INDEX_HEADER.size + strings_len
+        if magic != INDEX_MAGIC or len(blob) != records_at + count * INDEX_RECORD.size:
+            return None
+        if not count:
+            return []
+
+        strings = blob[INDEX_HEADER.size:records_at].decode().split("\0")
+        if len(strings) != count * INDEX_STRINGS:
+            return None
+        records = INDEX_RECORD.iter_unpack(memoryview(blob)[records_at:])
+        columns = [strings[i::INDEX_STRINGS] for i in range(INDEX_STRINGS)]
+        return [
+            (key, size, file_hash, access_count, last_access, location or None, stored_size, codec,
+             etag, last_modified, expires_at)
+            for key, file_hash, location, codec, etag,
+                (size, access_count, last_access, stored_size, last_modified, expires_at)
+            in zip(*columns, records)
+        ]
+
+    def count(self) -> int:
+        with self._db_lock:
+            return self.db.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+
+    def migrate_json(self, json_path: Path) -> int:
+        """Import a legacy cache_metadata.json snapshot once, then set it aside"""
+        if not json_path.exists() or self.count():
+            return 0
+        with open(json_path) as f:
+            data = json.load(f)
+        rows = [
+            (path, v["size"], v["hash"], v["access_count"], v["last_access"], v.get("cache_location"), 0, "", "", 0.0, 0.0)
+            for path, v in data.items()
+        ]
+        with self._db_lock:
+            with self.db:
+                self.db.execute("BEGIN")
+                self.db.executemany(UPSERT, rows)
+        json_path.rename(json_path.with_suffix(".json.migrated"))
+        return len(rows)
+
+    def start_flusher(self, interval: float = 1.0) -> None:
+        """Run flush() periodically in a daemon thread"""
+        def loop():
+            while not self._stop.wait(interval):
+                try:
+                    self.flush()
+                except Exception as e:
+                    print(f"❌ Error flushing cache metadata: {e}")
+
+        self._flusher = threading.Thread(target=loop, name="aistor-metadata-flusher", daemon=True)
+        self._flusher.start()
+
+    def stats(self) -> Dict:
+        return {
+            "pending_changes": len(self._dirty) + len(self._touched),
+            "flushes": self.flushes,
+            "rows_written": self.rows_written,
+            "last_flush_ms": round(self.last_flush_ms, 3),
+            "loaded_from": self.loaded_from,
+        }
+
+    def close(self, entries: Optional[Iterable] = None) -> None:
+        """Flush pending changes; with entries, also leave an index snapshot for the next start"""
+        self._stop.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        self.flush()
+        if entries is not None:
+            self.write_index(entries)
+        with self._db_lock:
+            self.db.close()
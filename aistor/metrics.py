@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+AIStor Prometheus metrics
+Minimal, dependency-free counters, gauges and histograms rendered in the
+Prometheus text exposition format for the gateway's /metrics endpoint.
+
+Hot-path updates are lock-light: every thread writes to its own cell and
+a scrape sums the cells, so a lock is only taken the first time a thread
+touches a metric (and briefly while scraping).
+"""
+
+import bisect
+import threading
+from typing import TYPE_CHECKING, Callable, Dict, List, Sequence, Tuple
+
+if TYPE_CHECKING:
+    from optimizer import AIStor
+
+# Latency buckets in seconds, from page-cache hits up to slow MinIO reads
+LATENCY_BUCKETS = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+)
+
+KEY_CLASSES = ("pose", "gripper", "metadata", "video", "other")
+
+
+def key_class(file_path: str) -> str:
+    """Classify a cache key by the UMI dataset layout (poses/, gripper/, video/, metadata.json)"""
+    directory, _, name = file_path.rpartition("/")
+    if name == "metadata.json":
+        return "metadata"
+    directory = directory.rpartition("/")[2]
+    if directory == "poses":
+        return "pose"
+    if directory in ("gripper", "video"):
+        return directory
+    return "other"
+
+
+class _ThreadCells:
+    """Per-thread value slots: writers touch only their own slot, readers sum them all"""
+
+    def __init__(self, width: int):
+        self.width = width
+        self._local = threading.local()
+        self._cells: List[List[float]] = []
+        self._lock = threading.Lock()
+
+    def cell(self) -> List[float]:
+        try:
+            return self._local.cell
+        except AttributeError:
+            cell = [0] * self.width
+            with self._lock:
+                self._cells.append(cell)
+            self._local.cell = cell
+            return cell
+
+    def totals(self) -> List[float]:
+        with self._lock:
+            cells = list(self._cells)
+        return [sum(cell[i] for cell in cells) for i in range(self.width)]
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{n}="{v}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """Monotonic counter, optionally split by labels"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self._children: Dict[Tuple[str, ...], "Counter"] = {}
+        self._lock = threading.Lock()
+        self._cells = _ThreadCells(1)
+
+    def labels(self, *values: str) -> "Counter":
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, Counter(self.name, self.help))
+        return child
+
+    def inc(self, amount: float = 1) -> None:
+        self._cells.cell()[0] += amount
+
+    @property
+    def value(self) -> float:
+        return self._cells.totals()[0]
+
+    def samples(self) -> List[str]:
+        if not self.label_names:
+            return [f"{self.name} {self.value}"]
+        return [
+            f"{self.name}{_format_labels(self.label_names, values)} {child.value}"
+            for values, child in sorted(self._children.items())
+        ]
+
+
+class Histogram:
+    """Fixed-bucket histogram, optionally split by labels"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._children: Dict[Tuple[str, ...], "Histogram"] = {}
+        self._lock = threading.Lock()
+        # One slot per bucket, one for +Inf, one for the running sum
+        self._cells = _ThreadCells(len(self.buckets) + 2)
+
+    def labels(self, *values: str) -> "Histogram":
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(
+                    values, Histogram(self.name, self.help, buckets=self.buckets)
+                )
+        return child
+
+    def observe(self, value: float) -> None:
+        cell = self._cells.cell()
+        cell[bisect.bisect_left(self.buckets, value)] += 1
+        cell[-1] += value
+
+    def summary(self) -> Dict:
+        totals = self._cells.totals()
+        count = sum(totals[:-1])
+        return {
+            "count": int(count),
+            "avg_ms": round(totals[-1] / count * 1000, 3) if count else 0.0,
+        }
+
+    def _own_samples(self, label_names: Sequence[str], label_values: Sequence[str]) -> List[str]:
+        totals = self._cells.totals()
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets + (float("inf"),), totals[:-1]):
+            cumulative += bucket_count
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            labels = _format_labels(label_names, label_values, f'le="{le}"')
+            lines.append(f"{self.name}_bucket{labels} {int(cumulative)}")
+        labels = _format_labels(label_names, label_values)
+        lines.append(f"{self.name}_sum{labels} {totals[-1]}")
+        lines.append(f"{self.name}_count{labels} {int(cumulative)}")
+        return lines
+
+    def samples(self) -> List[str]:
+        if not self.label_names:
+            return self._own_samples((), ())
+        lines = []
+        for values, child in sorted(self._children.items()):
+            lines.extend(child._own_samples(self.label_names, values))
+        return lines
+
+
+class Gauge:
+    """Point-in-time value computed by a callback at scrape time"""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, read: Callable[[], float]):
+        self.name = name
+        self.help = help_text
+        self.read = read
+
+    def samples(self) -> List[str]:
+        return [f"{self.name} {self.read()}"]
+
+
+class CacheMetrics:
+    """All series exported by an AIStor instance"""
+
+    def __init__(self, cache: "AIStor"):
+        self.hits = Counter("aistor_cache_hits_total", "Cache hits by key prefix", ["prefix"])
+        self.misses = Counter("aistor_cache_misses_total", "Cache misses by key prefix", ["prefix"])
+        self.evictions = Counter("aistor_cache_evictions_total", "Entries evicted to stay within budget")
+        self.evicted_bytes = Counter("aistor_cache_evicted_bytes_total", "Bytes evicted to stay within budget")
+        self.tier_hits = Counter("aistor_cache_tier_hits_total", "Cache hits by storage tier", ["tier"])
+        self.bytes_served = Counter("aistor_bytes_served_total", "Bytes returned to clients", ["source"])
+        self.backend_requests = Counter("aistor_backend_requests_total", "Object fetches sent to MinIO on misses")
+        self.coalesced_requests = Counter(
+            "aistor_coalesced_requests_total",
+            "Misses answered by another request's in-flight fetch instead of a MinIO request of their own"
+        )
+        self.prefetch_requests = Counter("aistor_prefetch_requests_total", "Objects fetched ahead of demand")
+        self.prefetch_hits = Counter("aistor_prefetch_hits_total", "Prefetched objects later read by a client")
+        self.prefetch_wasted_bytes = Counter(
+            "aistor_prefetch_wasted_bytes_total", "Prefetched bytes evicted or discarded without being read"
+        )
+        self.warmup_requests = Counter(
+            "aistor_warmup_requests_total", "Objects and block runs fetched from MinIO to warm up pins"
+        )
+        self.admission_rejections = Counter(
+            "aistor_admission_rejections_total", "Misses not cached because the admission filter judged them unpopular"
+        )
+        self.stale_hits = Counter(
+            "aistor_stale_hits_total", "Hits on expired entries served while revalidating in the background"
+        )
+        self.revalidations = Counter(
+            "aistor_revalidations_total", "Expired entries checked against MinIO, by outcome", ["outcome"]
+        )
+        self.block_requests = Counter(
+            "aistor_block_requests_total", "Blocks of large objects needed by range reads, by result", ["result"]
+        )
+        self.block_fetched_bytes = Counter(
+            "aistor_block_fetched_bytes_total", "Bytes of large objects read from MinIO as blocks"
+        )
+        self.list_requests = Counter(
+            "aistor_list_requests_total", "Object listings answered from the cache or by MinIO, by result", ["result"]
+        )
+        self.eviction_lag = Histogram(
+            "aistor_eviction_lag_seconds", "Time from crossing the high watermark until evicted down to the low one"
+        )
+        self.eviction_stall = Histogram(
+            "aistor_eviction_stall_seconds", "Time writers spent evicting inline past the hard limit"
+        )
+        self.latency = Histogram(
+            "aistor_cache_operation_seconds", "Latency of cache hits, misses and writes", ["operation"]
+        )
+
+        # Pre-resolved children keep label lookups off the hot path
+        self.hits_by_class = {c: self.hits.labels(c) for c in KEY_CLASSES}
+        self.misses_by_class = {c: self.misses.labels(c) for c in KEY_CLASSES}
+        self.memory_hits = self.tier_hits.labels("memory")
+        self.disk_hits = self.tier_hits.labels("disk")
+        self.served_from_cache = self.bytes_served.labels("cache")
+        self.served_from_minio = self.bytes_served.labels("minio")
+        self.revalidations_by_outcome = {
+            outcome: self.revalidations.labels(outcome)
+            for outcome in ("not_modified", "changed", "deleted", "failed")
+        }
+        self.block_hits = self.block_requests.labels("hit")
+        self.block_misses = self.block_requests.labels("miss")
+        self.list_hits = self.list_requests.labels("hit")
+        self.list_misses = self.list_requests.labels("miss")
+        self.hit_latency = self.latency.labels("hit")
+        self.miss_latency = self.latency.labels("miss")
+        self.write_latency = self.latency.labels("write")
+
+        self.registry = [
+            self.hits, self.misses, self.tier_hits, self.evictions, self.evicted_bytes, self.bytes_served,
+            self.backend_requests, self.coalesced_requests,
+            self.prefetch_requests, self.prefetch_hits, self.prefetch_wasted_bytes, self.warmup_requests,
+            self.admission_rejections, self.stale_hits, self.revalidations,
+            self.block_requests, self.block_fetched_bytes, self.list_requests,
+            self.eviction_lag, self.eviction_stall, self.latency,
+            Gauge("aistor_cache_size_bytes", "Bytes currently held in the cache",
+                  lambda: cache.current_cache_size),
+            Gauge("aistor_cache_capacity_bytes", "Configured cache budget (CACHE_SIZE)",
+                  lambda: cache.cache_size_limit),
+            Gauge("aistor_cache_fill_ratio", "Fraction of the cache budget in use",
+                  lambda: cache.current_cache_size / cache.cache_size_limit if cache.cache_size_limit else 0),
+            Gauge("aistor_eviction_backlog_bytes", "Bytes above the high watermark the eviction worker has yet to free",
+                  lambda: max(0, cache.current_cache_size - cache.cache_size_limit * cache.high_watermark)),
+            Gauge("aistor_cache_entries", "Number of cached objects",
+                  lambda: len(cache.metadata_cache)),
+            Gauge("aistor_cache_logical_bytes", "Bytes cached as seen by clients, before deduplication",
+                  lambda: cache.logical_cache_size),
+            Gauge("aistor_cache_blobs", "Distinct content blobs stored",
+                  lambda: len(cache.blob_paths)),
+            Gauge("aistor_cache_dedup_saved_bytes", "Bytes not stored thanks to content deduplication",
+                  lambda: cache.logical_cache_size - cache.uncompressed_cache_size),
+            Gauge("aistor_cache_uncompressed_bytes", "Bytes the stored blobs hold once decompressed",
+                  lambda: cache.uncompressed_cache_size),
+            Gauge("aistor_cache_capacity_multiplier", "Client-visible bytes cached per byte of disk used",
+                  lambda: cache.logical_cache_size / cache.current_cache_size if cache.current_cache_size else 1),
+            Gauge("aistor_pinned_bytes", "Bytes of entries pinned against eviction",
+                  lambda: cache.pinned_bytes),
+            Gauge("aistor_memory_tier_bytes", "Bytes held in the RAM tier",
+                  lambda: cache.memory_tier.used_bytes),
+            Gauge("aistor_memory_tier_capacity_bytes", "RAM tier budget (MEMORY_CACHE_SIZE)",
+                  lambda: cache.memory_tier.capacity),
+        ]
+
+    def record_hit(self, file_path: str, size: int) -> None:
+        self.hits_by_class[key_class(file_path)].inc()
+        self.served_from_cache.inc(size)
+
+    def record_miss(self, file_path: str) -> None:
+        self.misses_by_class[key_class(file_path)].inc()
+
+    def record_eviction(self, size: int) -> None:
+        self.evictions.inc()
+        self.evicted_bytes.inc(size)
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)"""
+        lines = []
+        for metric in self.registry:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
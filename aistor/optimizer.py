@@ -6,46 +6,259 @@ while maintaining efficient access to large files (video streams).
 """
 
 import os
+import math
 import time
-import json
+import socket
 import hashlib
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Optional
-from dataclasses import dataclass, asdict
+from typing import Dict, List, Optional, Set, Tuple
+from dataclasses import dataclass
 
-@dataclass
+from policies import create_policy
+from belady import AccessSchedule, BeladyPolicy
+from prefixes import PrefixIndex
+from backend import MinIOBackend, SingleFlight, split_path
+from gateway import serve
+from metrics import CacheMetrics
+from metadata_store import MetadataStore
+from admission import AdmissionFilter
+from compression import Compressor
+from hotness import HeavyHitters
+from prefetch import Prefetcher
+from pinning import PinRegistry, Warmer
+from tracing import OP_HIT, OP_MISS, OP_PUT, TraceRecorder
+from storage import MemoryTier, create_store
+
+# Path locks: operations on different paths almost never share a stripe
+LOCK_STRIPES = 64
+# Buffered policy hits applied in one batch once this many are queued
+HIT_BUFFER_DRAIN = 64
+# Large objects whose size and ETag are remembered for block reads
+MAX_BLOCK_OBJECTS = 65536
+# The eviction worker also checks the watermarks this often without being woken
+EVICTION_POLL_INTERVAL = 1.0
+# Most blocks one get_range call reads, and so holds in memory at once
+RANGE_MAX_BLOCKS = 16
+
+@dataclass(slots=True)
 class FileMetadata:
-    """Metadata for cached files"""
+    """Metadata for cached files
+    
+    One per cached path, so kept small: slotted, and without the blob's
+    location, which the store already knows (store.location(hash)).
+    """
     file_path: str
     size: int
     hash: str
     access_count: int
     last_access: float
-    cache_location: Optional[str] = None
+    stored_size: int = 0  # Bytes on disk when compressed, 0 when stored as is
+    codec: str = ""
+    etag: str = ""  # Source object's ETag and Last-Modified, when read from MinIO
+    last_modified: float = 0.0
+    expires_at: float = 0.0  # Revalidate against MinIO after this time, 0 = never
+    
+    @property
+    def disk_size(self) -> int:
+        return self.stored_size or self.size
+    
+    def expired(self, now: float) -> bool:
+        return bool(self.expires_at) and now >= self.expires_at
+
+@dataclass(slots=True)
+class BlockObject:
+    """A large object cached as fixed-size blocks: the version its cached blocks belong to"""
+    size: int
+    etag: str
+    last_modified: float
+    expires_at: float = 0.0
+    
+    def expired(self, now: float) -> bool:
+        return bool(self.expires_at) and now >= self.expires_at
+
+def _runs(indexes: List[int]) -> List[Tuple[int, int]]:
+    """Group sorted block indexes into (first, last) runs of consecutive ones"""
+    runs: List[Tuple[int, int]] = []
+    for index in indexes:
+        if runs and runs[-1][1] == index - 1:
+            runs[-1] = (runs[-1][0], index)
+        else:
+            runs.append((index, index))
+    return runs
 
 class AIStor:
     """Placeholder AIStor implementation for small file optimization"""
     
     def __init__(self):
-        self.cache_dir = Path("/cache")
+        self.cache_dir = Path(os.getenv("CACHE_DIR", "/cache"))
         self.small_files_dir = self.cache_dir / "small-files"
         self.metadata_dir = self.cache_dir / "metadata" 
         self.temp_dir = self.cache_dir / "temp"
         
         # Configuration
-        self.small_file_threshold = int(os.getenv("SMALL_FILE_THRESHOLD", "1048576"))  # 1MB
+        self.small_file_threshold = self._parse_size(os.getenv("SMALL_FILE_THRESHOLD", "1048576"))  # 1MB
         self.cache_size_limit = self._parse_size(os.getenv("CACHE_SIZE", "1GB"))
+        self.cache_policy = os.getenv("CACHE_POLICY", "lru")
+        # Fractions of CACHE_SIZE: a background worker evicts from the high watermark down to the
+        # low one, and writers only evict themselves once the hard limit is crossed
+        self.eviction_worker_enabled = os.getenv("EVICTION_WORKER", "true").lower() == "true"
+        self.high_watermark = float(os.getenv("EVICTION_HIGH_WATERMARK", "0.9"))
+        self.low_watermark = float(os.getenv("EVICTION_LOW_WATERMARK", "0.8"))
+        self.hard_limit = float(os.getenv("EVICTION_HARD_LIMIT", "1.0"))
+        if not 0 < self.low_watermark <= self.high_watermark <= self.hard_limit:
+            raise ValueError(
+                f"Eviction watermarks must satisfy 0 < low ({self.low_watermark}) <= "
+                f"high ({self.high_watermark}) <= hard limit ({self.hard_limit})"
+            )
+        self.cache_layout = os.getenv("CACHE_LAYOUT", "segments")
+        self.segment_size = self._parse_size(os.getenv("SEGMENT_SIZE", "64MB"))
+        self.compact_interval = float(os.getenv("COMPACT_INTERVAL", "30"))
+        self.memory_cache_size = self._parse_size(os.getenv("MEMORY_CACHE_SIZE", "256MB"))
+        self.memory_promote_after = int(os.getenv("MEMORY_PROMOTE_AFTER", "2"))
+        self.metadata_flush_interval = float(os.getenv("METADATA_FLUSH_INTERVAL", "1"))
+        self.prefetch_enabled = os.getenv("PREFETCH", "true").lower() == "true"
+        self.admission_enabled = os.getenv("CACHE_ADMISSION", "true").lower() == "true"
+        self.admission_min_frequency = int(os.getenv("ADMISSION_MIN_FREQUENCY", "2"))
+        # Entries are revalidated against MinIO CACHE_TTL seconds after they were fetched (0 = never)
+        self.cache_ttl = float(os.getenv("CACHE_TTL", "300"))
+        self.stale_while_revalidate = os.getenv("STALE_WHILE_REVALIDATE", "true").lower() == "true"
+        # Objects above SMALL_FILE_THRESHOLD are cached as BLOCK_SIZE byte ranges, fetched on demand
+        self.block_size = self._parse_size(os.getenv("BLOCK_SIZE", "1MB"))
+        self.block_max_object_size = self._parse_size(os.getenv("BLOCK_CACHE_MAX_OBJECT", "256MB"))
+        # Seconds the gateway answers a repeated LIST from the cache, 0 = always ask MinIO
+        self.list_cache_ttl = float(os.getenv("LIST_CACHE_TTL", "30"))
+        # Binary access trace for offline sizing with cachesim.py; empty disables it
+        self.trace_file = os.getenv("TRACE_FILE", "")
+        self.trace_sampling = float(os.getenv("TRACE_SAMPLING", "1.0"))
+        # Pinned entries are exempt from eviction, up to PIN_MAX_FRACTION of CACHE_SIZE;
+        # pins without an explicit lease hold for PIN_TTL seconds
+        self.pin_max_fraction = float(os.getenv("PIN_MAX_FRACTION", "0.5"))
+        self.pin_ttl = float(os.getenv("PIN_TTL", "3600"))
+        # An uploaded access sequence holds for SCHEDULE_TTL seconds unless renewed, and a read
+        # matches it when within SCHEDULE_WINDOW positions of the furthest one matched so far
+        self.schedule_ttl = float(os.getenv("SCHEDULE_TTL", "3600"))
+        self.schedule_window = int(os.getenv("SCHEDULE_WINDOW", "256"))
+        # Text entries are stored compressed (zstd, lz4 or zlib) when it saves enough
+        self.compressor = Compressor(
+            os.getenv("CACHE_COMPRESSION", "auto"),
+            min_size=self._parse_size(os.getenv("COMPRESSION_MIN_SIZE", "512"))
+        )
+        
+        # MinIO cluster for read-through on misses (cache paths are 'bucket/key')
+        self.minio_endpoints = [e.strip() for e in os.getenv("MINIO_ENDPOINTS", "").split(",") if e.strip()]
+        self.read_through = (
+            os.getenv("READ_THROUGH", "true").lower() == "true" and bool(self.minio_endpoints)
+        )
+        self.minio_secure = os.getenv("MINIO_SECURE", "false").lower() == "true"
+        # Also what the gateway checks signatures of cache hits against
+        self.minio_access_key = os.getenv("MINIO_ACCESS_KEY", "minioadmin")
+        self.minio_secret_key = os.getenv("MINIO_SECRET_KEY", "minioadmin123")
+        self.backend = MinIOBackend(
+            self.minio_endpoints,
+            access_key=self.minio_access_key,
+            secret_key=self.minio_secret_key,
+            secure=self.minio_secure
+        ) if self.read_through else None
+        # Concurrent misses for one key wait on a single backend fetch
+        self.inflight = SingleFlight()
+        # Stale entries: one conditional GET per key at a time, in the background with stale-while-revalidate
+        self.revalidations = SingleFlight()
+        self._revalidator = ThreadPoolExecutor(
+            max_workers=int(os.getenv("REVALIDATE_WORKERS", "4")), thread_name_prefix="aistor-revalidate"
+        ) if self.backend is not None and self.cache_ttl > 0 else None
+        self._revalidating: Set[str] = set()
+        self._revalidating_lock = threading.Lock()
+        self.block_cache_enabled = (
+            os.getenv("BLOCK_CACHE", "true").lower() == "true" and self.backend is not None
+        )
+        # Objects read as blocks, least recently used first; guarded by _block_lock
+        self.block_objects: "OrderedDict[str, BlockObject]" = OrderedDict()
+        self._block_lock = threading.Lock()
+        # One ranged GET per run of missing blocks at a time
+        self.block_fetches = SingleFlight()
         
         # Runtime state
         self.metadata_cache: Dict[str, FileMetadata] = {}
-        self.current_cache_size = 0
+        self.current_cache_size = 0  # Bytes on disk, each distinct blob counted once
+        self.uncompressed_cache_size = 0  # The same blobs before compression
+        self.logical_cache_size = 0  # Bytes as seen by clients, every path counted
+        
+        # Content-addressed blobs: content hash -> paths referencing it (the reference count)
+        self.blob_paths: Dict[str, Tuple[str, ...]] = {}
+        # Compressed blobs only: content hash -> (codec, bytes on disk)
+        self.blob_encoding: Dict[str, Tuple[str, int]] = {}
+        
+        # Locking, always acquired in this order: path stripe, then the accounting or policy lock.
+        # Eviction runs with no stripe held and takes each victim's stripe in turn, so it waits
+        # for in-flight reads of that path instead of deleting a blob under them.
+        self._stripes = [threading.Lock() for _ in range(LOCK_STRIPES)]
+        self._accounting_lock = threading.Lock()  # blob_paths, sizes, store writes
+        self._policy_lock = threading.Lock()      # policy and policy.stats
+        self._evict_lock = threading.Lock()       # one victim removed at a time
+        self._eviction_wakeup = threading.Event()
+        self._eviction_stop = threading.Event()
+        self._eviction_thread: Optional[threading.Thread] = None
+        self._over_high_since: Optional[float] = None  # When usage last crossed the high watermark
+        # Hits reach the policy through this buffer so readers never queue on _policy_lock
+        self._hit_buffer: deque = deque()
+        
+        # Eviction policy tracks resident keys so eviction never scans metadata_cache; while a
+        # job's access sequence is loaded it is wrapped in a BeladyPolicy
+        self.policy = create_policy(self.cache_policy, self.cache_size_limit)
+        # Misses only displace cached entries once they prove popular; guarded by _policy_lock
+        self.admission = AdmissionFilter(
+            max(1024, min(self.cache_size_limit // 4096, 1 << 20)), self.admission_min_frequency
+        ) if self.admission_enabled else None
+        # Most requested files, tasks and demos in bounded memory, halved every 1M requests;
+        # guarded by _policy_lock
+        self.heavy_hitters = HeavyHitters(
+            int(os.getenv("HEAVY_HITTERS", "64")), sample_size=1_000_000,
+            sampling=int(os.getenv("HEAVY_HITTERS_SAMPLING", "16"))
+        )
+        # Cached keys by prefix, for bulk invalidation, prefix stats and listing
+        self.prefixes = PrefixIndex()
+        # Pinned entries are kept out of the policy: path -> (priority, size), and the paths of
+        # each priority in pinning order; guarded by _policy_lock
+        self.pins = PinRegistry()
+        self.pinned: Dict[str, Tuple[int, int]] = {}
+        self.pinned_by_priority: Dict[int, Dict[str, None]] = {}
+        self.pinned_bytes = 0
+        self.pin_overflow = 0  # Entries left evictable because the pin budget was full
+        self.pin_displaced = 0  # Entries unpinned to make room for a higher-priority pin
+        self.tracer = TraceRecorder(self.trace_file, self.trace_sampling) if self.trace_file else None
+        self.metrics = CacheMetrics(self)
+        
+        # Blob storage: packed segments by default, one file per object with CACHE_LAYOUT=files
+        self.store = create_store(
+            self.cache_layout, self.cache_dir, self.segment_size, on_relocate=self._on_relocate
+        )
+        # RAM tier above it for entries read at least memory_promote_after times
+        self.memory_tier = MemoryTier(self.memory_cache_size)
+        
+        # Sequential pose/gripper/video reads within a demo are fetched ahead from MinIO
+        self.prefetcher = Prefetcher(
+            self,
+            max_depth=int(os.getenv("PREFETCH_MAX_DEPTH", "8")),
+            lookahead=float(os.getenv("PREFETCH_LOOKAHEAD", "1.0")),
+            workers=int(os.getenv("PREFETCH_WORKERS", "4")),
+            max_object_size=self._parse_size(os.getenv("PREFETCH_MAX_SIZE", "16MB"))
+        ) if self.prefetch_enabled and self.backend is not None else None
+        # Pinned objects fetched from MinIO ahead of a training run
+        self.warmer = Warmer(
+            self, workers=int(os.getenv("WARMUP_WORKERS", "8"))
+        ) if self.backend is not None else None
         
         self._initialize_cache()
     
-    def _parse_size(self, size_str: str) -> int:
+    @staticmethod
+    def _parse_size(size_str: str) -> int:
         """Parse size string like '1GB' to bytes"""
         size_str = size_str.upper()
-        multipliers = {"B": 1, "KB": 1024, "MB": 1024**2, "GB": 1024**3}
+        # Longest suffixes first so '1GB' is not read as '1G' + 'B'
+        multipliers = {"KB": 1024, "MB": 1024**2, "GB": 1024**3, "B": 1}
         
         for suffix, multiplier in multipliers.items():
             if size_str.endswith(suffix):
@@ -57,19 +270,127 @@ class AIStor:
         for dir_path in [self.small_files_dir, self.metadata_dir, self.temp_dir]:
             dir_path.mkdir(parents=True, exist_ok=True)
         
-        # Load existing metadata
-        metadata_file = self.metadata_dir / "cache_metadata.json"
-        if metadata_file.exists():
-            with open(metadata_file) as f:
-                data = json.load(f)
-                self.metadata_cache = {
-                    k: FileMetadata(**v) for k, v in data.items()
-                }
+        # Load existing metadata (a pre-SQLite JSON snapshot is imported once)
+        start = time.perf_counter()
+        self.metadata_store = MetadataStore(self.metadata_dir / "cache_metadata.db", locate=self.store.location)
+        self.metadata_store.migrate_json(self.metadata_dir / "cache_metadata.json")
+        
+        # Rows come back oldest first, so the policy sees them in recency order
+        entries = []
+        locations: Dict[str, Optional[str]] = {}
+        blobs: Dict[str, FileMetadata] = {}
+        # Values repeated across rows (a blob's hash, the ETag and Last-Modified of an
+        # object's blocks, codec names) are kept once instead of once per row
+        shared: Dict = {}
+        for (file_path, size, file_hash, access_count, last_access, location, stored_size, codec,
+             etag, last_modified, expires_at) in self.metadata_store.load():
+            file_hash = shared.setdefault(file_hash, file_hash)
+            metadata = FileMetadata(
+                file_path, size, file_hash, access_count, last_access, stored_size,
+                shared.setdefault(codec, codec), shared.setdefault(etag, etag),
+                shared.setdefault(last_modified, last_modified), expires_at
+            )
+            entries.append(metadata)
+            locations.setdefault(file_hash, location)
+            blobs.setdefault(file_hash, metadata)
+        del shared
+        rejected = self.store.restore_many((h, locations[h], m.disk_size) for h, m in blobs.items())
+        
+        physical_bytes = uncompressed_bytes = logical_bytes = 0
+        expires_at = time.time() + self.cache_ttl
+        for metadata in entries:
+            if metadata.hash in rejected:
+                # Written under a different CACHE_LAYOUT or its blob is gone
+                self.metadata_store.delete(metadata.file_path)
+                continue
+            paths = self.blob_paths.get(metadata.hash)
+            if paths is None:
+                self.blob_paths[metadata.hash] = (metadata.file_path,)
+                if metadata.codec:
+                    self.blob_encoding[metadata.hash] = (metadata.codec, metadata.stored_size)
+                physical_bytes += metadata.disk_size
+                uncompressed_bytes += metadata.size
+            else:
+                # Pre-dedup caches kept a copy per path; point them all at the first one
+                self.blob_paths[metadata.hash] = paths + (metadata.file_path,)
+                blob = blobs[metadata.hash]
+                metadata.stored_size, metadata.codec = blob.stored_size, blob.codec
+            if self.cache_ttl > 0 and not metadata.expires_at:
+                # Cached before a TTL was configured: give it one from now
+                metadata.expires_at = expires_at
+            self.metadata_cache[metadata.file_path] = metadata
+            self.prefixes.add(metadata.file_path, metadata.size)
+            self.policy.on_insert(metadata.file_path, metadata.size)
+            self.heavy_hitters.add(metadata.file_path, metadata.access_count)
+            logical_bytes += metadata.size
+        self.current_cache_size = physical_bytes
+        self.uncompressed_cache_size = uncompressed_bytes
+        self.logical_cache_size = logical_bytes
+        self._enforce_cache_limits()
+        
+        self.startup_stats = {
+            "restored_entries": len(self.metadata_cache),
+            "loaded_from": self.metadata_store.loaded_from,
+            "load_seconds": round(time.perf_counter() - start, 3),
+            "reconciled": False,
+        }
+        self.metadata_store.start_flusher(self.metadata_flush_interval)
+        if self.eviction_worker_enabled:
+            self._eviction_thread = threading.Thread(target=self._eviction_loop, name="aistor-evictor", daemon=True)
+            self._eviction_thread.start()
+        
+        # Hits are served straight away; checking the cache directory happens in the background
+        self.reconciled = threading.Event()
+        threading.Thread(target=self._reconcile, name="aistor-reconcile", daemon=True).start()
+        if hasattr(self.store, "start_compactor"):
+            self.store.start_compactor(self.compact_interval)
         
         print(f"🤖 AIStor initialized:")
         print(f"   Cache directory: {self.cache_dir}")
         print(f"   Small file threshold: {self.small_file_threshold / 1024 / 1024:.1f}MB")
         print(f"   Cache size limit: {self.cache_size_limit / 1024 / 1024 / 1024:.1f}GB")
+        print(f"   Eviction policy: {self.policy.name}")
+        print(f"   Eviction: {f'background from {self.high_watermark:.0%} down to {self.low_watermark:.0%}, writers wait past {self.hard_limit:.0%}' if self.eviction_worker_enabled else f'inline down to {self.low_watermark:.0%}'}")
+        print(f"   Admission: {f'frequency filter (min {self.admission_min_frequency} requests)' if self.admission else 'disabled'}")
+        print(f"   Cache layout: {self.store.layout}")
+        print(f"   Compression: {'disabled' if self.compressor.mode == 'none' else f'{self.compressor.text_codec.name} for text, {self.compressor.binary_codec.name} for pickles'}")
+        print(f"   Memory tier: {self.memory_cache_size / 1024 / 1024:.0f}MB")
+        print(f"   Metadata store: {self.metadata_store.path} (flush every {self.metadata_flush_interval:g}s)")
+        print(f"   Read-through: {', '.join(self.minio_endpoints) if self.read_through else 'disabled'}")
+        freshness = f"TTL {self.cache_ttl:g}s" if self.cache_ttl > 0 else "entries never expire"
+        if self.cache_ttl > 0 and self.stale_while_revalidate:
+            freshness += ", stale-while-revalidate"
+        print(f"   Freshness: {freshness}")
+        print(f"   Block cache: {f'{self.block_size / 1024 / 1024:g}MB blocks for objects up to {self.block_max_object_size / 1024 / 1024:.0f}MB' if self.block_cache_enabled else 'disabled'}")
+        print(f"   Prefetch: {f'up to {self.prefetcher.max_depth} batches ahead' if self.prefetcher else 'disabled'}")
+        print(f"   Pinning: up to {self.pin_max_fraction:.0%} of the cache, "
+              f"{f'warm-up with {len(self.warmer.threads)} workers' if self.warmer else 'no warm-up without MinIO'}")
+        print(f"   Restored: {len(self.metadata_cache)} files, {self.current_cache_size / 1024 / 1024:.1f}MB "
+              f"in {self.startup_stats['load_seconds']:.2f}s (from {self.metadata_store.loaded_from})")
+    
+    def _reconcile(self):
+        """Drop entries whose blob is gone and delete files no entry points at"""
+        start = time.perf_counter()
+        try:
+            missing, orphans, freed = self.store.reconcile()
+            for file_hash in missing:
+                for file_path in self.blob_paths.get(file_hash, ()):
+                    self._drop_entry(file_path)
+        except Exception as e:
+            print(f"❌ Error reconciling cache directory: {e}")
+            return
+        finally:
+            self.reconciled.set()
+        
+        self.startup_stats.update({
+            "reconciled": True,
+            "reconcile_seconds": round(time.perf_counter() - start, 3),
+            "missing_entries": len(missing),
+            "orphaned_files": orphans,
+            "orphaned_mb": round(freed / 1024 / 1024, 2),
+        })
+        print(f"🔎 Reconciled cache: {len(missing)} missing entries dropped, "
+              f"{orphans} orphaned files removed ({freed / 1024 / 1024:.1f}MB)")
     
     def should_cache(self, file_path: str, file_size: int) -> bool:
         """Determine if file should be cached based on size and type"""
@@ -80,89 +401,992 @@ class AIStor:
         robotics_extensions = {'.json', '.yaml', '.yml', '.csv', '.txt', '.pkl'}
         path = Path(file_path)
         
-        return path.suffix.lower() in robotics_extensions
+        if path.suffix.lower() not in robotics_extensions:
+            return False
+        return self._admit(file_path, file_size)
+    
+    def _admit(self, file_path: str, file_size: int) -> bool:
+        """Whether a missed file may take space another entry would have to give up"""
+        if self.admission is None or file_path in self.metadata_cache:
+            return True
+        # Free space below the eviction low watermark costs no cached entry
+        if self.current_cache_size + file_size <= self.cache_size_limit * self.low_watermark:
+            return True
+        with self._policy_lock:
+            self._drain_hits()
+            admitted = self.admission.admit(file_path, self.policy.peek())
+        if not admitted:
+            self.metrics.admission_rejections.inc()
+            print(f"🚪 Not admitted: {file_path} (not requested often enough yet)")
+        return admitted
+    
+    def _stripe(self, file_path: str) -> threading.Lock:
+        """Lock guarding one path's metadata and blob reference"""
+        return self._stripes[hash(file_path) % LOCK_STRIPES]
     
-    def cache_file(self, file_path: str, file_data: bytes) -> str:
+    def _drain_hits(self):
+        """Apply buffered hits to the policy; caller holds _policy_lock"""
+        buffer = self._hit_buffer
+        while buffer:
+            file_path, size = buffer.popleft()
+            self.policy.stats.record_hit(size)
+            self.heavy_hitters.record(file_path)
+            if self.admission is not None:
+                self.admission.record(file_path)
+            # The entry may have been evicted or dropped since it was read
+            if file_path in self.policy:
+                self.policy.on_hit(file_path, size)
+    
+    def cache_file(self, file_path: str, file_data: bytes, etag: str = "", last_modified: float = 0.0) -> str:
         """Cache a small file and return cache location"""
-        file_hash = hashlib.sha256(file_data).hexdigest()[:16]
-        cache_path = self.small_files_dir / f"{file_hash}_{Path(file_path).name}"
-        
-        # Write to cache
-        with open(cache_path, 'wb') as f:
-            f.write(file_data)
-        
-        # Update metadata
-        metadata = FileMetadata(
-            file_path=file_path,
-            size=len(file_data),
-            hash=file_hash,
-            access_count=1,
-            last_access=time.time(),
-            cache_location=str(cache_path)
-        )
+        if file_path not in self.metadata_cache:
+            # Cache-aside fill after a miss: the miss cost these bytes
+            with self._policy_lock:
+                self.policy.stats.record_fill(len(file_data))
+        return self._store(file_path, file_data, etag, last_modified)
+    
+    def _store(self, file_path: str, file_data: bytes, etag: str = "", last_modified: float = 0.0) -> str:
+        """Write a file into the cache, account for it and enforce limits"""
+        start = time.perf_counter()
+        # 128 bits of SHA-256 name the blob; identical content under any path shares it
+        file_hash = hashlib.sha256(file_data).hexdigest()[:32]
+        # Compress outside the locks; content that is already stored needs no new payload
+        encoded = None if file_hash in self.blob_paths else self.compressor.encode(file_path, file_data)
         
-        self.metadata_cache[file_path] = metadata
-        self.current_cache_size += len(file_data)
+        with self._stripe(file_path):
+            previous = self.metadata_cache.get(file_path)
+            with self._accounting_lock:
+                paths = self.blob_paths.get(file_hash)
+                if paths is None:
+                    codec, payload = encoded or self.compressor.encode(file_path, file_data)
+                    stored_size = len(payload) if codec else 0
+                    cache_location = self.store.put(file_hash, payload, file_hash)
+                    self.blob_paths[file_hash] = (file_path,)
+                    if codec:
+                        self.blob_encoding[file_hash] = (codec, stored_size)
+                    self.current_cache_size += len(payload)
+                    self.uncompressed_cache_size += len(file_data)
+                else:
+                    # The stored blob keeps the encoding it was written with
+                    codec, stored_size = self.blob_encoding.get(file_hash, ("", 0))
+                    cache_location = self.store.location(file_hash)
+                    # Entries of one blob share one copy of its hash
+                    first = self.metadata_cache.get(paths[0])
+                    if first is not None:
+                        file_hash = first.hash
+                    if file_path not in paths:
+                        self.blob_paths[file_hash] = paths + (file_path,)
+                
+                # Replacing an existing entry must not double-count its size
+                if previous is not None:
+                    self.logical_cache_size -= previous.size
+                    if previous.hash != file_hash:
+                        self._release_blob(previous)
+                self.logical_cache_size += len(file_data)
+            
+            # Update metadata
+            now = time.time()
+            metadata = FileMetadata(
+                file_path=file_path,
+                size=len(file_data),
+                hash=file_hash,
+                access_count=1,
+                last_access=now,
+                stored_size=stored_size,
+                codec=codec,
+                etag=etag,
+                last_modified=last_modified,
+                expires_at=now + self.cache_ttl if self.cache_ttl > 0 else 0.0
+            )
+            
+            self.metadata_cache[file_path] = metadata
+            self.prefixes.add(file_path, metadata.size)
+            self.metadata_store.put(metadata)
+            with self._policy_lock:
+                pin = self.pins.covering(file_path) if self.pins else None
+                if pin is not None and self._pin_locked(file_path, len(file_data), pin.priority):
+                    self.policy.on_remove(file_path)
+                elif file_path in self.policy:
+                    self.policy.on_hit(file_path, len(file_data))
+                else:
+                    self._unpin_locked(file_path)
+                    self.policy.on_insert(file_path, len(file_data))
         
-        # Check cache size limits
+        # Check cache size limits (outside the stripe: eviction takes victims' stripes)
         self._enforce_cache_limits()
+        self.metrics.write_latency.observe(time.perf_counter() - start)
+        if self.tracer is not None:
+            self.tracer.record(file_path, len(file_data), OP_PUT)
         
-        print(f"📁 Cached: {file_path} -> {cache_path}")
-        return str(cache_path)
+        print(f"📁 Cached: {file_path} -> {cache_location}")
+        return cache_location
     
-    def get_cached_file(self, file_path: str) -> Optional[bytes]:
-        """Retrieve file from cache if available"""
-        if file_path not in self.metadata_cache:
+    def get_cached_file(self, file_path: str, read_through: Optional[bool] = None) -> Optional[bytes]:
+        """Retrieve file from cache, reading through to MinIO on a miss when enabled"""
+        return self._get(file_path, read_through, view=False)
+    
+    def get_cached_view(self, file_path: str, read_through: Optional[bool] = None) -> Optional[memoryview]:
+        """Like get_cached_file, but a hit returns a read-only view of the cached bytes instead of a copy
+        
+        Uncompressed entries are mapped from the blob store (and entries in the RAM
+        tier shared) without copying. The view stays valid and unchanged while
+        the entry is evicted, overwritten or compacted away.
+        """
+        data = self._get(file_path, read_through, view=True)
+        return data if data is None or isinstance(data, memoryview) else memoryview(data)
+    
+    def _get(self, file_path: str, read_through: Optional[bool], view: bool):
+        if read_through is None:
+            read_through = self.read_through
+        if self.prefetcher is not None:
+            self.prefetcher.on_access(file_path)
+        start = time.perf_counter()
+        data = self._read_cached(file_path, view)
+        if data is not None:
+            metadata = self.metadata_cache.get(file_path)
+            if metadata is not None and self._revalidator is not None and metadata.expired(time.time()):
+                data = self._refresh(file_path, data)
+                if data is None:
+                    print(f"🔍 Deleted from MinIO: {file_path}")
+                    return None
+            elapsed = time.perf_counter() - start
+            self.metrics.hit_latency.observe(elapsed)
+            print(f"⚡ Cache hit: {file_path} ({elapsed * 1000:.2f}ms)")
+            return data
+        
+        with self._policy_lock:
+            self.policy.stats.record_miss()
+            self.heavy_hitters.record(file_path)
+            if self.admission is not None:
+                self.admission.record(file_path)
+        self.metrics.record_miss(file_path)
+        if self.tracer is not None:
+            # Size unknown yet: the simulator takes it from the put that fills the entry
+            self.tracer.record(file_path, 0, OP_MISS)
+        if not read_through or self.backend is None:
+            return None
+        
+        try:
+            data, shared = self.inflight.do(file_path, lambda: self._read_through(file_path))
+        except Exception as e:
+            print(f"❌ Read-through failed for {file_path}: {e}")
+            return None
+        
+        elapsed = time.perf_counter() - start
+        self.metrics.miss_latency.observe(elapsed)
+        if shared:
+            self.metrics.coalesced_requests.inc()
+            print(f"🤝 Cache miss: {file_path} shared an in-flight fetch ({elapsed * 1000:.2f}ms)")
+        elif data is None:
+            print(f"🔍 Not found in MinIO: {file_path} ({elapsed * 1000:.2f}ms)")
+        else:
+            print(f"🌐 Cache miss: {file_path} read through from MinIO ({elapsed * 1000:.2f}ms)")
+        return data
+    
+    def _read_through(self, file_path: str) -> Optional[bytes]:
+        """Fetch a missing file from MinIO and fill the cache; run once per key at a time"""
+        # A fetch that finished just before this flight started may already have filled it
+        data = self._read_cached(file_path)
+        if data is not None:
+            return data
+        
+        self.metrics.backend_requests.inc()
+        source = self.backend.fetch_object(file_path)
+        if source is None:
+            return None
+        data = source.data
+        with self._policy_lock:
+            self.policy.stats.record_fill(len(data))
+        self.metrics.served_from_minio.inc(len(data))
+        if self.should_cache(file_path, len(data)):
+            self._store(file_path, data, source.etag, source.last_modified)
+        return data
+    
+    def is_fresh(self, file_path: str) -> bool:
+        """Whether a file is cached and within its TTL"""
+        metadata = self.metadata_cache.get(file_path)
+        return metadata is not None and not metadata.expired(time.time())
+    
+    def _refresh(self, file_path: str, data: bytes) -> Optional[bytes]:
+        """Data to answer a hit on an expired entry with: stale now, or revalidated first"""
+        if self.stale_while_revalidate:
+            self.metrics.stale_hits.inc()
+            with self._revalidating_lock:
+                if file_path in self._revalidating:
+                    return data
+                self._revalidating.add(file_path)
+            self._revalidator.submit(self._revalidate_in_background, file_path)
+            return data
+        
+        (outcome, fresh), _ = self.revalidations.do(file_path, lambda: self._revalidate(file_path))
+        # Stale beats nothing when MinIO cannot be reached
+        return fresh if outcome in ("changed", "deleted") else data
+    
+    def _revalidate_in_background(self, file_path: str):
+        try:
+            self.revalidations.do(file_path, lambda: self._revalidate(file_path))
+        finally:
+            with self._revalidating_lock:
+                self._revalidating.discard(file_path)
+    
+    def _revalidate(self, file_path: str) -> Tuple[str, Optional[bytes]]:
+        """Check an expired entry against MinIO; returns (outcome, new data if it changed)"""
+        metadata = self.metadata_cache.get(file_path)
+        if metadata is None or not metadata.expired(time.time()):
+            # Evicted, or refreshed by another caller in the meantime
+            return "skipped", None
+        
+        try:
+            # Only a conditional GET transfers no body; entries without an ETag are refetched
+            source = self.backend.fetch_object(file_path, if_none_match=metadata.etag)
+        except Exception as e:
+            self.metrics.revalidations_by_outcome["failed"].inc()
+            print(f"❌ Revalidation failed for {file_path}: {e}")
+            return "failed", None
+        
+        if source is None:
+            self.invalidate(file_path)
+            outcome, data = "deleted", None
+        elif source.not_modified or hashlib.sha256(source.data).hexdigest()[:32] == metadata.hash:
+            with self._stripe(file_path):
+                current = self.metadata_cache.get(file_path)
+                if current is not None:
+                    current.expires_at = time.time() + self.cache_ttl
+                    current.etag = source.etag or current.etag
+                    current.last_modified = source.last_modified or current.last_modified
+                    self.metadata_store.put(current)
+            outcome, data = "not_modified", None
+        else:
+            self.metrics.served_from_minio.inc(len(source.data))
+            self._store(file_path, source.data, source.etag, source.last_modified)
+            outcome, data = "changed", source.data
+            print(f"🔄 Refreshed: {file_path} changed in MinIO")
+        self.metrics.revalidations_by_outcome[outcome].inc()
+        return outcome, data
+    
+    def prefetch_file(self, file_path: str, max_size: int) -> Tuple[str, int]:
+        """Fetch a predicted file into the cache ahead of demand
+        
+        Returns (status, bytes fetched), status being 'cached', 'too_large',
+        'missing' (no such object) or 'skipped' (cached or being fetched already).
+        """
+        def fetch():
+            self.metrics.backend_requests.inc()
+            self.metrics.prefetch_requests.inc()
+            source = self.backend.fetch_object(file_path)
+            if source is None:
+                return None
+            # Prefetches may hold objects above SMALL_FILE_THRESHOLD, e.g. video chunks
+            if len(source.data) <= min(max_size, self.cache_size_limit // 4):
+                self._store(file_path, source.data, source.etag, source.last_modified)
+            return source.data
+        
+        if file_path in self.metadata_cache:
+            return "skipped", 0
+        data, shared = self.inflight.do(file_path, fetch)
+        if shared:
+            return "skipped", 0
+        if data is None:
+            return "missing", 0
+        return ("cached" if file_path in self.metadata_cache else "too_large"), len(data)
+    
+    def _block_key(self, file_path: str, index: int) -> str:
+        """Cache key of one block; the block size is part of it so layouts never mix"""
+        return f"{file_path}#{self.block_size}:{index}"
+    
+    def get_range(self, file_path: str, start: int, end: Optional[int] = None,
+                  admit: bool = True) -> Optional[Tuple[bytes, BlockObject]]:
+        """Bytes start..end (inclusive, None for the rest) of a large object, served from cached blocks
+        
+        Only the blocks not cached yet are read from MinIO, one ranged GET per
+        run of consecutive missing blocks, and go through admission unless
+        admit is False. At most RANGE_MAX_BLOCKS blocks are read per call: data
+        shorter than asked for means the caller continues where it ends.
+        Returns (data, object version), or None if the object does not exist,
+        starts before start or is not block-cached (SMALL_FILE_THRESHOLD and
+        smaller, or above BLOCK_CACHE_MAX_OBJECT), for the caller to forward.
+        """
+        if not self.block_cache_enabled:
             return None
+        for _ in range(2):
+            # A second pass only when the object changed in MinIO halfway through
+            info, probe = self._block_object(file_path, start, admit)
+            if info is None or not self._block_cached_size(info.size):
+                return None
+            last_byte = info.size - 1 if end is None else min(end, info.size - 1)
+            if start > last_byte:
+                return None
+            first = start // self.block_size
+            last = min(last_byte // self.block_size, first + RANGE_MAX_BLOCKS - 1)
+            last_byte = min(last_byte, (last + 1) * self.block_size - 1)
+            blocks = self._read_blocks(file_path, first, last, info, probe, admit)
+            if blocks is not None:
+                offset = start - first * self.block_size
+                return b"".join(blocks)[offset:offset + last_byte - start + 1], info
+        return None
+    
+    def _block_cached_size(self, size: int) -> bool:
+        """Whether objects of a size are cached as blocks: too large to cache whole, small enough to hold"""
+        return self.small_file_threshold < size <= self.block_max_object_size
+    
+    def _block_object(self, file_path: str, start: int,
+                      admit: bool) -> Tuple[Optional[BlockObject], Dict[int, bytes]]:
+        """Size and ETag of the object version to serve blocks of, checked against MinIO once per TTL
         
-        metadata = self.metadata_cache[file_path]
-        cache_path = Path(metadata.cache_location)
+        Also returns the blocks fetched while checking, keyed by index.
+        """
+        with self._block_lock:
+            info = self.block_objects.get(file_path)
+            if info is not None:
+                self.block_objects.move_to_end(file_path)
+        if info is not None and not info.expired(time.time()):
+            return info, {}
+        (info, probe), shared = self.block_fetches.do(
+            file_path, lambda: self._load_block_object(file_path, start, info, admit)
+        )
+        return info, {} if shared else probe
+    
+    def _load_block_object(self, file_path: str, start: int, known: Optional[BlockObject],
+                           admit: bool) -> Tuple[Optional[BlockObject], Dict[int, bytes]]:
+        # The block being asked for doubles as the probe: a 304 when unchanged, otherwise it is cached
+        index = start // self.block_size
+        if known is not None:
+            index = min(index, max(0, known.size - 1) // self.block_size)
+        self.metrics.backend_requests.inc()
+        source = self.backend.fetch_range(
+            file_path, index * self.block_size, self.block_size, if_none_match=known.etag if known else ""
+        )
+        expires_at = time.time() + self.cache_ttl if self.cache_ttl > 0 else 0.0
+        if source is not None and source.not_modified:
+            known.expires_at = expires_at
+            self.metrics.revalidations_by_outcome["not_modified"].inc()
+            return known, {}
+        if known is not None:
+            self.metrics.revalidations_by_outcome["changed" if source is not None else "deleted"].inc()
+            self._forget_block_object(file_path)
+        if source is None:
+            return None, {}
         
-        if not cache_path.exists():
-            # Cache file missing, remove from metadata
-            del self.metadata_cache[file_path]
+        # Remembered even when not block-cached, so the next read is forwarded without a probe
+        info = BlockObject(source.size, source.etag, source.last_modified, expires_at)
+        with self._block_lock:
+            self.block_objects[file_path] = info
+            if len(self.block_objects) > MAX_BLOCK_OBJECTS:
+                # Its blocks stay cached and are reused if the same version is read again
+                self.block_objects.popitem(last=False)
+        if not self._block_cached_size(info.size):
+            return info, {}
+        self.metrics.block_misses.inc()
+        self.metrics.block_fetched_bytes.inc(len(source.data))
+        self._store_block(file_path, index, source.data, source, admit)
+        return info, {index: source.data}
+    
+    def _read_blocks(self, file_path: str, first: int, last: int, info: BlockObject,
+                     blocks: Dict[int, bytes], admit: bool) -> Optional[List[bytes]]:
+        """Blocks first..last of one object version, fetching missing ones; None if the version changed"""
+        blocks = {i: data for i, data in blocks.items() if first <= i <= last}
+        for index in range(first, last + 1):
+            if index in blocks:
+                continue
+            key = self._block_key(file_path, index)
+            metadata = self.metadata_cache.get(key)
+            if metadata is None or metadata.etag != info.etag:
+                continue
+            # Views: the join below is then the only copy
+            data = self._read_cached(key, view=True)
+            if data is not None:
+                self.metrics.block_hits.inc()
+                blocks[index] = data
+        
+        missing = [i for i in range(first, last + 1) if i not in blocks]
+        if self.tracer is not None:
+            for index in missing:
+                self.tracer.record(self._block_key(file_path, index), 0, OP_MISS)
+        for run_first, run_last in _runs(missing):
+            fetched, _ = self.block_fetches.do(
+                f"{file_path}#{run_first}-{run_last}",
+                lambda: self._fetch_blocks(file_path, run_first, run_last, info, admit)
+            )
+            if fetched is None:
+                return None
+            blocks.update(fetched)
+        return [blocks[i] for i in range(first, last + 1)]
+    
+    def _fetch_blocks(self, file_path: str, first: int, last: int, info: BlockObject,
+                      admit: bool) -> Optional[Dict[int, bytes]]:
+        """Read a run of consecutive blocks with one ranged GET and cache those admitted"""
+        self.metrics.backend_requests.inc()
+        source = self.backend.fetch_range(
+            file_path, first * self.block_size, (last - first + 1) * self.block_size
+        )
+        if source is None or source.etag != info.etag:
+            # Deleted or rewritten since info was taken: the caller starts over with the new version
+            self._forget_block_object(file_path)
             return None
         
-        # Update access statistics
-        metadata.access_count += 1
-        metadata.last_access = time.time()
+        self.metrics.block_misses.inc(last - first + 1)
+        self.metrics.block_fetched_bytes.inc(len(source.data))
+        blocks = {}
+        for index in range(first, last + 1):
+            offset = (index - first) * self.block_size
+            blocks[index] = source.data[offset:offset + self.block_size]
+            self._store_block(file_path, index, blocks[index], source, admit)
+        return blocks
+    
+    def _store_block(self, file_path: str, index: int, data: bytes, source, admit: bool) -> None:
+        """Cache a block fetched on a miss, if admission lets it displace what is cached"""
+        key = self._block_key(file_path, index)
+        if admit and self.admission is not None:
+            with self._policy_lock:
+                self.admission.record(key)
+            if not self._admit(key, len(data)):
+                return
+        self._store(key, data, source.etag, source.last_modified)
+    
+    def _forget_block_object(self, file_path: str) -> bool:
+        """Drop what is known about a block-cached object along with its cached blocks"""
+        with self._block_lock:
+            info = self.block_objects.pop(file_path, None)
+        if info is None:
+            return False
+        for index in range(-(-info.size // self.block_size)):
+            self._drop_entry(self._block_key(file_path, index))
+        return True
+    
+    def sendfile(self, file_path: str, sock: socket.socket) -> Optional[int]:
+        """Send a cached file to a connected socket with sendfile(2), never copying it through userland
+        
+        Entries held in RAM, stored compressed or due for revalidation are sent
+        from memory instead. Returns the bytes sent, or None if the file is not
+        cached (there is no read-through).
+        """
+        if self.prefetcher is not None:
+            self.prefetcher.on_access(file_path)
+        source = None
+        with self._stripe(file_path):
+            metadata = self.metadata_cache.get(file_path)
+            if metadata is None:
+                return None
+            stale = self._revalidator is not None and metadata.expired(time.time())
+            if not (metadata.codec or metadata.hash in self.memory_tier.entries or stale):
+                # A descriptor of its own: eviction and compaction can proceed during the send
+                source = self.store.open_range(metadata.hash)
+                if source is None:
+                    self._drop_entry_locked(file_path)
+                    return None
+                self.metrics.disk_hits.inc()
+                metadata.access_count += 1
+                metadata.last_access = time.time()
+                self.metadata_store.touch(metadata)
+        
+        if source is None:
+            data = self._get(file_path, False, view=True)
+            if data is None:
+                return None
+            sock.sendall(data)
+            return len(data)
         
-        with open(cache_path, 'rb') as f:
-            data = f.read()
+        self._record_hit(file_path, metadata.size)
+        fd, offset, length = source
+        with os.fdopen(fd, "rb") as f:
+            return sock.sendfile(f, offset, length)
+    
+    def _read_cached(self, file_path: str, view: bool = False):
+        """Look a file up in the local cache only; with view, a disk hit is mapped rather than copied"""
+        if file_path not in self.metadata_cache:
+            return None
         
-        print(f"⚡ Cache hit: {file_path}")
+        # Holding the path's stripe keeps eviction from releasing the blob mid-read
+        with self._stripe(file_path):
+            metadata = self.metadata_cache.get(file_path)
+            if metadata is None:
+                return None
+            
+            # RAM tier first: a hit there is a dictionary lookup, no syscalls
+            data = self.memory_tier.get(metadata.hash)
+            if data is not None:
+                self.metrics.memory_hits.inc()
+            elif view and not metadata.codec:
+                data = self.store.view(metadata.hash)
+                if data is None:
+                    self._drop_entry_locked(file_path)
+                    return None
+                self.metrics.disk_hits.inc()
+                # Mapped entries already live in the page cache; only small copied ones are promoted
+                if isinstance(data.obj, bytes) and metadata.access_count + 1 >= self.memory_promote_after:
+                    self.memory_tier.promote(metadata.hash, data.obj)
+            else:
+                data = self.store.read(metadata.hash)
+                if data is not None and metadata.codec:
+                    try:
+                        data = self.compressor.decode(metadata.codec, data)
+                    except Exception as e:
+                        print(f"❌ Cannot decompress {file_path} ({metadata.codec}): {e}")
+                        data = None
+                if data is None:
+                    # Cache file missing or unreadable, remove from metadata
+                    self._drop_entry_locked(file_path)
+                    return None
+                self.metrics.disk_hits.inc()
+                if metadata.access_count + 1 >= self.memory_promote_after:
+                    self.memory_tier.promote(metadata.hash, data)
+            
+            # Update access statistics
+            metadata.access_count += 1
+            metadata.last_access = time.time()
+            self.metadata_store.touch(metadata)
+        
+        self._record_hit(file_path, metadata.size)
         return data
     
-    def _enforce_cache_limits(self):
-        """Remove old cached files if cache is too large"""
-        if self.current_cache_size <= self.cache_size_limit:
+    def _record_hit(self, file_path: str, size: int):
+        """Queue a hit for the policy and count it"""
+        self._hit_buffer.append((file_path, size))
+        if len(self._hit_buffer) >= HIT_BUFFER_DRAIN and self._policy_lock.acquire(blocking=False):
+            try:
+                self._drain_hits()
+            finally:
+                self._policy_lock.release()
+        self.metrics.record_hit(file_path, size)
+        if self.tracer is not None:
+            self.tracer.record(file_path, size, OP_HIT)
+    
+    def _on_relocate(self, file_hash: str, cache_location: str):
+        """Keep persisted locations current when the compactor moves a blob"""
+        for file_path in self.blob_paths.get(file_hash, ()):
+            metadata = self.metadata_cache.get(file_path)
+            if metadata is not None:
+                # Rewritten with the store's new location at the next flush
+                self.metadata_store.put(metadata)
+    
+    def _release_blob(self, metadata: FileMetadata):
+        """Drop one path's reference to its blob, deleting the blob with the last reference
+
+        Caller holds _accounting_lock.
+        """
+        paths = tuple(p for p in self.blob_paths.get(metadata.hash, ()) if p != metadata.file_path)
+        if paths:
+            self.blob_paths[metadata.hash] = paths
             return
+        if self.blob_paths.pop(metadata.hash, None) is not None:
+            self.blob_encoding.pop(metadata.hash, None)
+            self.memory_tier.discard(metadata.hash)
+            self.store.delete(metadata.hash)
+            self.current_cache_size -= metadata.disk_size
+            self.uncompressed_cache_size -= metadata.size
+    
+    def _drop_entry(self, file_path: str) -> Optional[FileMetadata]:
+        """Remove an entry from every index and tier, returning its metadata if it was cached"""
+        with self._stripe(file_path):
+            return self._drop_entry_locked(file_path)
+    
+    def _drop_entry_locked(self, file_path: str) -> Optional[FileMetadata]:
+        metadata = self.metadata_cache.pop(file_path, None)
+        if metadata is None:
+            return None
+        self.prefixes.remove(file_path)
+        if self.prefetcher is not None:
+            self.prefetcher.on_evict(file_path)
         
-        # Sort by access time (LRU)
-        sorted_files = sorted(
-            self.metadata_cache.items(),
-            key=lambda x: x[1].last_access
-        )
+        with self._policy_lock:
+            self.policy.on_remove(file_path)
+            self._unpin_locked(file_path)
+        self.metadata_store.delete(file_path)
+        with self._accounting_lock:
+            self.logical_cache_size -= metadata.size
+            self._release_blob(metadata)
+        return metadata
+    
+    def invalidate(self, file_path: str) -> bool:
+        """Drop a cached file, e.g. after it was overwritten or deleted upstream"""
+        # Listings that include it are stale too, cached or not
+        self.prefixes.drop_listings(file_path)
+        if self._drop_entry(file_path) is None and not self._forget_block_object(file_path):
+            return False
+        print(f"♻️  Invalidated: {file_path}")
+        return True
+    
+    def invalidate_prefix(self, prefix: str) -> int:
+        """Drop every cached file under a prefix, e.g. a re-recorded demo; returns how many"""
+        self.prefixes.drop_listings(prefix, subtree=True)
+        keys = self.prefixes.keys(prefix)
+        dropped = sum(1 for file_path in keys if self._drop_entry(file_path) is not None)
+        # Blocks went with the keys above; forget the objects they belonged to as well
+        for file_path in {key.rpartition("#")[0] for key in keys if "#" in key} & self.block_objects.keys():
+            self._forget_block_object(file_path)
+        print(f"♻️  Invalidated {dropped} files under {prefix}")
+        return dropped
+    
+    def prefix_stats(self, prefix: str) -> Dict:
+        """What is cached under a prefix, without scanning the rest of the cache"""
+        entries, size = self.prefixes.stats(prefix)
+        return {
+            "prefix": prefix,
+            "cached_files": entries,
+            "size_mb": round(size / 1024 / 1024, 2),
+            "share_of_cache": round(size / self.logical_cache_size, 4) if self.logical_cache_size else 0.0,
+        }
+    
+    def list_cached(self, prefix: str, delimiter: str = "") -> Dict:
+        """Cached keys (with sizes) and, with delimiter '/', sub-prefixes directly under a prefix"""
+        keys, prefixes = self.prefixes.list(prefix, delimiter)
+        return {
+            "prefix": prefix,
+            "keys": [{"key": key, "size": size} for key, size in keys],
+            "prefixes": prefixes,
+        }
+    
+    def cached_listing(self, prefix: str, query: str) -> Optional[bytes]:
+        """A recent LIST response of MinIO for this prefix and query string, if one is cached"""
+        if self.list_cache_ttl <= 0:
+            return None
+        return self.prefixes.get_listing(prefix, query, time.time())
+    
+    def cache_listing(self, prefix: str, query: str, body: bytes, generation: int) -> bool:
+        """Keep a LIST response of MinIO for LIST_CACHE_TTL seconds, or until a key under prefix changes
+        
+        generation is prefixes.listing_generation as read before the LIST was sent.
+        """
+        if self.list_cache_ttl <= 0:
+            return False
+        return self.prefixes.put_listing(prefix, query, body, time.time() + self.list_cache_ttl, generation)
+    
+    def pin(self, prefixes: List[str] = (), keys: List[str] = (), priority: int = 0,
+            ttl: Optional[float] = None, warm: bool = True) -> Dict:
+        """Hold everything under prefixes and the manifest keys in the cache for ttl seconds
+        
+        Covered entries already cached are pinned at once and new ones as they
+        are cached; with warm, the rest are fetched from MinIO in the background.
+        Returns the pin and its warm-up progress, see pin_status.
+        """
+        for name, values in (("prefixes", prefixes), ("keys", keys)):
+            if not isinstance(values, (list, tuple)) or not all(isinstance(v, str) and v for v in values):
+                raise ValueError(f"A pin's {name} must be a list of non-empty 'bucket/key' strings")
+        if isinstance(priority, bool) or not isinstance(priority, int):
+            raise ValueError(f"A pin's priority must be an integer, got {priority!r}")
+        ttl = self.pin_ttl if ttl is None else ttl
+        # A NaN or infinite lease would never run out and hold its entries for good
+        if isinstance(ttl, bool) or not isinstance(ttl, (int, float)) or not (math.isfinite(ttl) and ttl > 0):
+            raise ValueError(f"A pin's lease must be a positive number of seconds, got {ttl!r}")
+        if not prefixes and not keys:
+            raise ValueError("A pin needs at least one prefix or key")
+        for path in (*prefixes, *keys):
+            split_path(path)
+        pin = self.pins.add(list(prefixes), list(keys), priority, ttl)
+        pinned = self._apply_pins(self._pin_paths(pin))
+        if warm and self.warmer is not None:
+            self.warmer.start(pin, list(keys))
+        print(f"📌 Pinned {pin.pin_id}: {', '.join(pin.prefixes) or f'{len(pin.keys)} keys'} "
+              f"(priority {priority}, {pinned} cached entries held for {ttl:g}s)")
+        return self.pin_status(pin.pin_id)
+    
+    def renew_pin(self, pin_id: str, ttl: Optional[float] = None) -> Optional[Dict]:
+        """Extend a pin's lease to ttl seconds from now; None if it is gone"""
+        ttl = self.pin_ttl if ttl is None else ttl
+        if not (math.isfinite(ttl) and ttl > 0):
+            raise ValueError(f"A pin's lease must be a positive number of seconds, got {ttl}")
+        if self.pins.renew(pin_id, ttl) is None:
+            return None
+        return self.pin_status(pin_id)
+    
+    def unpin(self, pin_id: str) -> bool:
+        """Release a pin: its entries become evictable again unless another pin holds them"""
+        pin = self.pins.remove(pin_id)
+        if pin is None:
+            return False
+        self._release_pins([pin])
+        print(f"📌 Unpinned {pin_id}")
+        return True
+    
+    def pin_status(self, pin_id: str) -> Optional[Dict]:
+        """A pin with its warm-up progress; None if it was released or its lease ran out"""
+        pin = self.pins.get(pin_id)
+        if pin is None:
+            return None
+        job = self.warmer.jobs.get(pin_id) if self.warmer is not None else None
+        return dict(pin.as_dict(time.time()), warmup=job.as_dict() if job else None)
+    
+    def list_pins(self) -> List[Dict]:
+        self._expire_pins()
+        return [status for status in map(self.pin_status, list(self.pins.pins)) if status is not None]
+    
+    def _pin_paths(self, pin) -> List[str]:
+        """Cached keys a pin covers, blocks of its manifest objects included"""
+        paths = []
+        for prefix in pin.prefixes:
+            paths.extend(self.prefixes.keys(prefix))
+        for key in pin.keys:
+            paths.append(key)
+            paths.extend(self.prefixes.keys(f"{key}#"))
+        return paths
+    
+    def _apply_pins(self, paths: List[str]) -> int:
+        """Pin or release cached entries after pins changed; returns how many are pinned"""
+        pinned = 0
+        with self._policy_lock:
+            for file_path in paths:
+                metadata = self.metadata_cache.get(file_path)
+                # Neither tracked nor pinned: being evicted or stored right now, and
+                # _store pins it itself once it is in
+                if metadata is None or not (file_path in self.pinned or file_path in self.policy):
+                    continue
+                pin = self.pins.covering(file_path) if self.pins else None
+                if pin is not None and self._pin_locked(file_path, metadata.size, pin.priority):
+                    self.policy.on_remove(file_path)
+                    pinned += 1
+                elif file_path not in self.policy:
+                    self._unpin_locked(file_path)
+                    self.policy.on_insert(file_path, metadata.size)
+        return pinned
+    
+    def _release_pins(self, pins) -> None:
+        for pin in pins:
+            if self.warmer is not None:
+                self.warmer.cancel(pin.pin_id)
+            self._apply_pins(self._pin_paths(pin))
+        self._enforce_cache_limits()
+    
+    def _expire_pins(self):
+        expired = self.pins.pop_expired(time.time())
+        if expired:
+            print(f"📌 Lease ran out for {len(expired)} pins: {', '.join(pin.pin_id for pin in expired)}")
+            self._release_pins(expired)
+    
+    def _pin_locked(self, file_path: str, size: int, priority: int) -> bool:
+        """Hold an entry out of the policy; False if the pin budget is full of equal or higher priority
         
-        for file_path, metadata in sorted_files:
-            if self.current_cache_size <= self.cache_size_limit * 0.8:
+        Lower-priority pinned entries are released to the policy to make room.
+        Caller holds _policy_lock and takes the entry out of the policy on success.
+        """
+        self._unpin_locked(file_path)
+        budget = self.cache_size_limit * self.pin_max_fraction
+        for lower in sorted(self.pinned_by_priority):
+            if self.pinned_bytes + size <= budget or lower >= priority:
                 break
+            for victim in list(self.pinned_by_priority[lower]):
+                victim_size = self._unpin_locked(victim)
+                self.policy.on_insert(victim, victim_size)
+                self.pin_displaced += 1
+                if self.pinned_bytes + size <= budget:
+                    break
+        if self.pinned_bytes + size > budget:
+            self.pin_overflow += 1
+            return False
+        self.pinned[file_path] = (priority, size)
+        self.pinned_by_priority.setdefault(priority, {})[file_path] = None
+        self.pinned_bytes += size
+        return True
+    
+    def _unpin_locked(self, file_path: str) -> int:
+        """Forget an entry's pin, returning its size (0 if it was not pinned); caller holds _policy_lock"""
+        held = self.pinned.pop(file_path, None)
+        if held is None:
+            return 0
+        priority, size = held
+        paths = self.pinned_by_priority[priority]
+        del paths[file_path]
+        if not paths:
+            del self.pinned_by_priority[priority]
+        self.pinned_bytes -= size
+        return size
+    
+    def warm_file(self, file_path: str, size: Optional[int] = None) -> Tuple[str, int]:
+        """Fetch one object of a warm-up into the cache: whole if small, as blocks if large
+        
+        Warm-ups are explicit, so admission and the file-type check are skipped.
+        Returns (outcome, bytes fetched), outcome being 'cached', 'skipped'
+        (cached or being fetched already), 'missing' or 'too_large'.
+        """
+        if file_path in self.metadata_cache:
+            return "skipped", 0
+        if size is None:
+            self.metrics.backend_requests.inc()
+            size = self.backend.object_size(file_path)
+            if size is None:
+                return "missing", 0
+        
+        if size <= self.small_file_threshold:
+            def fetch():
+                self.metrics.backend_requests.inc()
+                self.metrics.warmup_requests.inc()
+                source = self.backend.fetch_object(file_path)
+                if source is not None:
+                    self.metrics.served_from_minio.inc(len(source.data))
+                    self._store(file_path, source.data, source.etag, source.last_modified)
+                    return source.data
+                return None
             
-            # Remove file
-            cache_path = Path(metadata.cache_location)
-            if cache_path.exists():
-                cache_path.unlink()
-                self.current_cache_size -= metadata.size
+            # The flight is shared with reads and prefetches of the key: its result is the bytes
+            data, shared = self.inflight.do(file_path, fetch)
+            if shared:
+                return "skipped", 0
+            if data is None:
+                return "missing", 0
+            return "cached", len(data)
+        
+        if not self.block_cache_enabled or size > self.block_max_object_size:
+            return "too_large", 0
+        # A bounded run of blocks at a time, rather than the whole object in memory at once
+        fetched = 0
+        step = self.block_size * RANGE_MAX_BLOCKS
+        for start in range(0, size, step):
+            self.metrics.warmup_requests.inc()
+            result = self.get_range(file_path, start, start + step - 1, admit=False)
+            if result is None:
+                return "missing", fetched
+            fetched += len(result[0])
+        return "cached", fetched
+    
+    def load_schedule(self, keys: List[str], ttl: Optional[float] = None) -> Dict:
+        """Evict by the upcoming reads of a job (Belady) until they are done or ttl seconds pass
+        
+        keys is the job's access sequence in read order, e.g. its next epochs'
+        permutations; it replaces any sequence loaded before.
+        """
+        ttl = self.schedule_ttl if ttl is None else ttl
+        # A NaN or infinite lease would never run out and keep the schedule loaded for good
+        if not (math.isfinite(ttl) and ttl > 0):
+            raise ValueError(f"A schedule's lease must be a positive number of seconds, got {ttl}")
+        # Indexed outside the lock: a few epochs of a large dataset are millions of keys
+        schedule = AccessSchedule(keys, self.schedule_window, ttl)
+        if not schedule.length:
+            raise ValueError("An access schedule needs at least one key")
+        with self._policy_lock:
+            self._drain_hits()
+            fallback = self.policy.detach() if isinstance(self.policy, BeladyPolicy) else self.policy
+            self.policy = BeladyPolicy(fallback, schedule)
+        print(f"🔮 Loaded access schedule: {schedule.length} reads of {len(schedule.positions)} keys "
+              f"for {ttl:g}s, {fallback.name} for the rest")
+        return self.schedule_status()
+    
+    def renew_schedule(self, ttl: Optional[float] = None) -> Optional[Dict]:
+        """Extend the loaded schedule's lease to ttl seconds from now; None if none is loaded"""
+        ttl = self.schedule_ttl if ttl is None else ttl
+        if not (math.isfinite(ttl) and ttl > 0):
+            raise ValueError(f"A schedule's lease must be a positive number of seconds, got {ttl}")
+        policy = self.policy
+        if not isinstance(policy, BeladyPolicy):
+            return None
+        policy.schedule.expires_at = time.time() + ttl
+        return self.schedule_status()
+    
+    def unload_schedule(self) -> bool:
+        """Go back to the configured policy alone"""
+        with self._policy_lock:
+            if not isinstance(self.policy, BeladyPolicy):
+                return False
+            self._drain_hits()
+            schedule = self.policy.schedule
+            self.policy = self.policy.detach()
+        print(f"🔮 Unloaded access schedule after {schedule.cursor + 1} of {schedule.length} reads")
+        return True
+    
+    def schedule_status(self) -> Optional[Dict]:
+        policy = self.policy
+        if not isinstance(policy, BeladyPolicy):
+            return None
+        return dict(
+            policy.schedule.stats(),
+            fallback=policy.fallback.name,
+            scheduled_entries=len(policy.next_use),
+            scheduled_evictions=policy.scheduled_evictions,
+            fallback_evictions=policy.fallback_evictions
+        )
+    
+    def _expire_schedule(self):
+        policy = self.policy
+        if isinstance(policy, BeladyPolicy) and (policy.schedule.finished or policy.schedule.expired(time.time())):
+            self.unload_schedule()
+    
+    def _enforce_cache_limits(self):
+        """Keep the cache within budget after a write"""
+        if self._eviction_thread is None:
+            # No worker (disabled, or not started yet): the writer drains the cache itself
+            if self.current_cache_size > self.cache_size_limit:
+                self._evict_until(self.cache_size_limit * self.low_watermark)
+            return
+        
+        if self.current_cache_size > self.cache_size_limit * self.high_watermark:
+            if self._over_high_since is None:
+                self._over_high_since = time.perf_counter()
+            self._eviction_wakeup.set()
+        if self.current_cache_size > self.cache_size_limit * self.hard_limit:
+            # Writes outpace the worker: make just enough room, waiting on no one else's backlog
+            start = time.perf_counter()
+            self._evict_until(self.cache_size_limit * self.hard_limit)
+            self.metrics.eviction_stall.observe(time.perf_counter() - start)
+    
+    def _eviction_loop(self):
+        """Background eviction worker: once past the high watermark, evict down to the low one"""
+        while not self._eviction_stop.is_set():
+            self._eviction_wakeup.wait(EVICTION_POLL_INTERVAL)
+            self._eviction_wakeup.clear()
+            self._expire_pins()
+            self._expire_schedule()
+            if self.current_cache_size <= self.cache_size_limit * self.high_watermark:
+                continue
+            try:
+                self._evict_until(self.cache_size_limit * self.low_watermark, yield_between=True)
+            except Exception as e:
+                print(f"❌ Error in eviction worker: {e}")
+                continue
+            since, self._over_high_since = self._over_high_since, None
+            if since is not None:
+                self.metrics.eviction_lag.observe(time.perf_counter() - since)
+    
+    def _evict_until(self, target: float, yield_between: bool = False):
+        """Evict policy victims until the cache holds at most target bytes"""
+        # Entries of pins whose lease ran out are evictable again from here on
+        self._expire_pins()
+        self._expire_schedule()
+        # Victims are asked for one at a time; evicting a path whose blob is still shared
+        # frees nothing, so keep going. _evict_lock is taken per victim, so a stalled writer
+        # and the worker take turns instead of one waiting out the other's whole drain.
+        while self.current_cache_size > target:
+            with self._evict_lock:
+                if self.current_cache_size <= target:
+                    return
+                with self._policy_lock:
+                    self._drain_hits()
+                    file_path = self.policy.evict()
+                if file_path is None:
+                    return
+                
+                with self._stripe(file_path):
+                    # Re-cached (or pinned) by another thread since the policy picked it: keep it
+                    if file_path in self.policy or file_path in self.pinned:
+                        continue
+                    metadata = self.metadata_cache.pop(file_path, None)
+                    if metadata is None:
+                        continue
+                    self.prefixes.remove(file_path)
+                    self.metadata_store.delete(file_path)
+                    if self.prefetcher is not None:
+                        self.prefetcher.on_evict(file_path)
+                    
+                    # Remove file
+                    with self._accounting_lock:
+                        self.logical_cache_size -= metadata.size
+                        self._release_blob(metadata)
+            self.metrics.record_eviction(metadata.size)
             
-            del self.metadata_cache[file_path]
             print(f"🗑️  Evicted from cache: {file_path}")
+            if yield_between:
+                # Python locks are not fair: without a pause the worker would take the locks
+                # (and the GIL) straight back, and writers would wait out the whole drain
+                time.sleep(0)
     
     def get_cache_stats(self) -> Dict:
         """Get cache statistics"""
+        with self._policy_lock:
+            self._drain_hits()
+            most_accessed = self.heavy_hitters.files.top(5)
+            hot_prefixes = self.heavy_hitters.stats()
         total_files = len(self.metadata_cache)
         avg_file_size = (
-            self.current_cache_size / total_files if total_files > 0 else 0
+            self.logical_cache_size / total_files if total_files > 0 else 0
         )
+        block_reads = self.metrics.block_hits.value + self.metrics.block_misses.value
         
         return {
             "total_cached_files": total_files,
@@ -170,14 +1394,93 @@ class AIStor:
             "cache_limit_mb": round(self.cache_size_limit / 1024 / 1024, 2),
             "cache_utilization": round(self.current_cache_size / self.cache_size_limit * 100, 1),
             "avg_file_size_kb": round(avg_file_size / 1024, 2),
-            "most_accessed_files": [
-                (path, meta.access_count) 
-                for path, meta in sorted(
-                    self.metadata_cache.items(),
-                    key=lambda x: x[1].access_count,
-                    reverse=True
-                )[:5]
-            ]
+            "dedup": {
+                "unique_blobs": len(self.blob_paths),
+                "logical_size_mb": round(self.logical_cache_size / 1024 / 1024, 2),
+                "dedup_ratio": round(self.logical_cache_size / self.uncompressed_cache_size, 3)
+                if self.uncompressed_cache_size else 1.0,
+                "bytes_saved_mb": round((self.logical_cache_size - self.uncompressed_cache_size) / 1024 / 1024, 2)
+            },
+            "compression": dict(
+                self.compressor.stats(),
+                compressed_blobs=len(self.blob_encoding),
+                uncompressed_size_mb=round(self.uncompressed_cache_size / 1024 / 1024, 2),
+                compression_ratio=round(self.uncompressed_cache_size / self.current_cache_size, 3)
+                if self.current_cache_size else 1.0,
+                # Client-visible bytes held per byte of CACHE_SIZE, dedup and compression together
+                effective_capacity_multiplier=round(self.logical_cache_size / self.current_cache_size, 3)
+                if self.current_cache_size else 1.0
+            ),
+            "storage": self.store.stats(),
+            "metadata_store": self.metadata_store.stats(),
+            "startup": self.startup_stats,
+            "memory_tier": self.memory_tier.stats(),
+            "read_through": {
+                "backend_requests": int(self.metrics.backend_requests.value),
+                "coalesced_requests": int(self.metrics.coalesced_requests.value),
+                "in_flight": len(self.inflight)
+            },
+            "freshness": {
+                "ttl_seconds": self.cache_ttl,
+                "stale_while_revalidate": self.stale_while_revalidate,
+                "stale_hits": int(self.metrics.stale_hits.value),
+                "revalidations": {
+                    outcome: int(counter.value)
+                    for outcome, counter in self.metrics.revalidations_by_outcome.items()
+                },
+                "revalidating": len(self._revalidating)
+            },
+            "blocks": {
+                "enabled": self.block_cache_enabled,
+                "block_size_mb": round(self.block_size / 1024 / 1024, 2),
+                "objects": len(self.block_objects),
+                "hits": int(self.metrics.block_hits.value),
+                "misses": int(self.metrics.block_misses.value),
+                "hit_ratio": round(self.metrics.block_hits.value / block_reads, 4) if block_reads else 0.0,
+                "fetched_mb": round(self.metrics.block_fetched_bytes.value / 1024 / 1024, 2)
+            },
+            "listings": {
+                "ttl_seconds": self.list_cache_ttl,
+                "cached": self.prefixes.listing_count,
+                "hits": int(self.metrics.list_hits.value),
+                "misses": int(self.metrics.list_misses.value)
+            },
+            "prefetch": self.prefetcher.stats() if self.prefetcher else None,
+            "pins": dict(
+                pins=len(self.pins),
+                pinned_entries=len(self.pinned),
+                pinned_mb=round(self.pinned_bytes / 1024 / 1024, 2),
+                budget_mb=round(self.cache_size_limit * self.pin_max_fraction / 1024 / 1024, 2),
+                overflow=self.pin_overflow,
+                displaced=self.pin_displaced,
+                expired_leases=self.pins.expired,
+                warmup=self.warmer.stats() if self.warmer else None
+            ),
+            "tier_hits": {
+                "memory": int(self.metrics.memory_hits.value),
+                "disk": int(self.metrics.disk_hits.value)
+            },
+            "admission": self.admission.stats() if self.admission else None,
+            "eviction_policy": self.policy.name,
+            "schedule": self.schedule_status(),
+            "hit_ratio": round(self.policy.stats.hit_ratio, 4),
+            "byte_hit_ratio": round(self.policy.stats.byte_hit_ratio, 4),
+            "evictions": self.policy.stats.evictions,
+            "eviction": {
+                "worker": self._eviction_thread is not None,
+                "high_watermark": self.high_watermark,
+                "low_watermark": self.low_watermark,
+                "hard_limit": self.hard_limit,
+                "lag": self.metrics.eviction_lag.summary(),
+                "writer_stalls": self.metrics.eviction_stall.summary()
+            },
+            "trace": self.tracer.stats() if self.tracer else None,
+            "hit_latency": self.metrics.hit_latency.summary(),
+            "miss_latency": self.metrics.miss_latency.summary(),
+            "write_latency": self.metrics.write_latency.summary(),
+            # Approximate (Space-Saving): exact for keys well above the rest, at any cache size
+            "most_accessed_files": most_accessed,
+            "hot_prefixes": hot_prefixes
         }
     
     def monitor_loop(self):
@@ -187,15 +1490,10 @@ class AIStor:
         while True:
             try:
                 stats = self.get_cache_stats()
+                hottest = stats['hot_prefixes']['demos'][:1] or stats['hot_prefixes']['tasks'][:1]
                 print(f"📊 Cache Stats: {stats['total_cached_files']} files, "
-                      f"{stats['cache_utilization']}% utilized")
-                
-                # Save metadata periodically
-                metadata_file = self.metadata_dir / "cache_metadata.json"
-                with open(metadata_file, 'w') as f:
-                    json.dump({
-                        k: asdict(v) for k, v in self.metadata_cache.items()
-                    }, f, indent=2)
+                      f"{stats['cache_utilization']}% utilized"
+                      + (f", hottest: {hottest[0][0]} ({hottest[0][1]} requests)" if hottest else ""))
                 
                 time.sleep(60)  # Monitor every minute
                 
@@ -205,7 +1503,34 @@ class AIStor:
             except Exception as e:
                 print(f"❌ Error in monitoring loop: {e}")
                 time.sleep(10)
+    
+    def close(self):
+        """Flush pending metadata, leave an index snapshot for a fast restart, release the store"""
+        if self._eviction_thread is not None:
+            self._eviction_stop.set()
+            self._eviction_wakeup.set()
+            self._eviction_thread.join()
+        if self.prefetcher is not None:
+            self.prefetcher.close()
+        if self.warmer is not None:
+            self.warmer.close()
+        if self._revalidator is not None:
+            self._revalidator.shutdown(wait=False, cancel_futures=True)
+        self.metadata_store.close(entries=list(self.metadata_cache.values()))
+        self.store.close()
+        if self.tracer is not None:
+            self.tracer.close()
 
 if __name__ == "__main__":
     aistor = AIStor()
-    aistor.monitor_loop()
\ No newline at end of file
+    threading.Thread(target=aistor.monitor_loop, daemon=True).start()
+    try:
+        serve(
+            aistor,
+            port=int(os.getenv("GATEWAY_PORT", "8080")),
+            admin_host=os.getenv("ADMIN_HOST", "127.0.0.1"),
+            admin_port=int(os.getenv("ADMIN_PORT", "8081")),
+            admin_token=os.getenv("ADMIN_TOKEN", ""),
+        )
+    finally:
+        aistor.close()
\ No newline at end of file
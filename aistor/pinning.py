@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Pinning and warm-up for AIStor
+A training job knows which demos it will read before its first epoch. It
+pins them, by prefix or as an explicit manifest of keys, with a priority
+and a lease: cached entries a pin covers are held outside the eviction
+policy, so eviction never picks them, until the lease runs out or the
+job unpins. Jobs renew the lease while they train.
+
+Pinning also starts a warm-up: a pool of workers fetches the pinned
+objects from MinIO in the background (whole, or as blocks for large
+ones), higher-priority pins first and manifest keys in manifest order,
+so the first epoch already runs at cache speed.
+
+Pins live in memory only; a job pins again after an AIStor restart.
+"""
+
+import itertools
+import queue
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Dict, FrozenSet, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from optimizer import AIStor
+
+# Warm-up task outcomes, see AIStor.warm_file
+WARMUP_OUTCOMES = ("cached", "skipped", "missing", "too_large", "failed")
+
+
+@dataclass
+class Pin:
+    """Keys held in the cache for a job: everything under prefixes, plus an explicit manifest"""
+    pin_id: str
+    prefixes: Tuple[str, ...]
+    keys: FrozenSet[str]
+    priority: int
+    expires_at: float
+    created: float = field(default_factory=time.time)
+
+    def covers(self, file_path: str) -> bool:
+        if file_path in self.keys or any(file_path.startswith(p) for p in self.prefixes):
+            return True
+        # Blocks of a large object are cached as 'bucket/key#size:index'
+        return "#" in file_path and file_path.rpartition("#")[0] in self.keys
+
+    def as_dict(self, now: float) -> Dict:
+        return {
+            "pin_id": self.pin_id,
+            "prefixes": list(self.prefixes),
+            "keys": len(self.keys),
+            "priority": self.priority,
+            "expires_in": round(max(0.0, self.expires_at - now), 1),
+        }
+
+
+class PinRegistry:
+    """Active pins; the one with the highest priority decides for a key several pins cover"""
+
+    def __init__(self):
+        self.pins: Dict[str, Pin] = {}
+        self._lock = threading.Lock()
+        self.next_expiry = float("inf")
+        self.expired = 0
+
+    def __len__(self) -> int:
+        return len(self.pins)
+
+    def add(self, prefixes: List[str], keys: List[str], priority: int, ttl: float) -> Pin:
+        pin = Pin(uuid.uuid4().hex[:12], tuple(prefixes), frozenset(keys), priority, time.time() + ttl)
+        with self._lock:
+            self.pins[pin.pin_id] = pin
+            self.next_expiry = min(self.next_expiry, pin.expires_at)
+        return pin
+
+    def get(self, pin_id: str) -> Optional[Pin]:
+        return self.pins.get(pin_id)
+
+    def renew(self, pin_id: str, ttl: float) -> Optional[Pin]:
+        """Extend a pin's lease to ttl seconds from now"""
+        with self._lock:
+            pin = self.pins.get(pin_id)
+            if pin is not None:
+                pin.expires_at = time.time() + ttl
+            return pin
+
+    def remove(self, pin_id: str) -> Optional[Pin]:
+        with self._lock:
+            return self.pins.pop(pin_id, None)
+
+    def pop_expired(self, now: float) -> List[Pin]:
+        """Remove and return the pins whose lease has run out; cheap until the next one does"""
+        if now < self.next_expiry:
+            return []
+        with self._lock:
+            expired = [pin for pin in self.pins.values() if pin.expires_at <= now]
+            for pin in expired:
+                del self.pins[pin.pin_id]
+            self.next_expiry = min((pin.expires_at for pin in self.pins.values()), default=float("inf"))
+            self.expired += len(expired)
+        return expired
+
+    def covering(self, file_path: str) -> Optional[Pin]:
+        """The highest-priority pin covering a key, if any"""
+        best = None
+        for pin in list(self.pins.values()):
+            if (best is None or pin.priority > best.priority) and pin.covers(file_path):
+                best = pin
+        return best
+
+
+@dataclass
+class WarmupJob:
+    """Progress of fetching one pin's objects into the cache"""
+    pin_id: str
+    priority: int
+    state: str = "listing"  # listing, running, done, failed or cancelled
+    total: int = 0
+    outcomes: Dict[str, int] = field(default_factory=lambda: dict.fromkeys(WARMUP_OUTCOMES, 0))
+    bytes: int = 0
+    error: str = ""
+    started: float = field(default_factory=time.time)
+    finished: float = 0.0
+
+    @property
+    def completed(self) -> int:
+        return sum(self.outcomes.values())
+
+    def as_dict(self) -> Dict:
+        elapsed = (self.finished or time.time()) - self.started
+        return {
+            "state": self.state,
+            "total": self.total,
+            "completed": self.completed,
+            "progress": round(self.completed / self.total, 4) if self.total else float(self.state == "done"),
+            **self.outcomes,
+            "fetched_mb": round(self.bytes / 1024 / 1024, 2),
+            "elapsed_s": round(elapsed, 2),
+            "mb_per_s": round(self.bytes / 1024 / 1024 / elapsed, 2) if elapsed > 0 else 0.0,
+            "error": self.error or None,
+        }
+
+
+class Warmer:
+    """Fetches pinned objects into the cache with a pool of workers, highest priority first"""
+
+    def __init__(self, cache: "AIStor", workers: int = 8):
+        self.cache = cache
+        self.jobs: Dict[str, WarmupJob] = {}
+        # (-priority, sequence, pin, key or None to list the pin, size if known)
+        self.tasks: queue.PriorityQueue = queue.PriorityQueue()
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        self.threads = [
+            threading.Thread(target=self._work, name=f"aistor-warmup-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def start(self, pin: Pin, keys: List[str]) -> WarmupJob:
+        """Queue a warm-up of a pin; keys are its manifest, in the order to fetch them"""
+        job = self.jobs[pin.pin_id] = WarmupJob(pin.pin_id, pin.priority)
+        # Listing prefixes takes MinIO round trips: a worker does it, not the caller
+        self.tasks.put((-pin.priority, next(self._sequence), pin, None, keys))
+        return job
+
+    def cancel(self, pin_id: str) -> None:
+        """Stop a pin's warm-up; its queued keys are skipped when they come up"""
+        job = self.jobs.pop(pin_id, None)
+        if job is not None and job.state in ("listing", "running"):
+            job.state = "cancelled"
+            job.finished = time.time()
+
+    def _work(self) -> None:
+        while True:
+            _, _, pin, key, extra = self.tasks.get()
+            if pin is None:
+                return
+            job = self.jobs.get(pin.pin_id)
+            if job is None or job.state == "cancelled":
+                continue
+            if key is None:
+                self._expand(pin, job, extra)
+            else:
+                self._warm(job, key, extra)
+
+    def _expand(self, pin: Pin, job: WarmupJob, manifest: List[str]) -> None:
+        """Queue every object of a pin: its manifest as given, then what MinIO lists under its prefixes"""
+        targets: List[Tuple[str, Optional[int]]] = [(key, None) for key in manifest]
+        try:
+            for prefix in pin.prefixes:
+                targets.extend(self.cache.backend.list_objects(prefix))
+        except Exception as e:
+            job.state, job.error, job.finished = "failed", str(e), time.time()
+            print(f"❌ Warm-up of pin {pin.pin_id} could not list objects: {e}")
+            return
+        job.total = len(targets)
+        job.state = "running" if targets else "done"
+        if not targets:
+            job.finished = time.time()
+        for key, size in targets:
+            self.tasks.put((-pin.priority, next(self._sequence), pin, key, size))
+        print(f"🔥 Warming up pin {pin.pin_id}: {len(targets)} objects, priority {pin.priority}")
+
+    def _warm(self, job: WarmupJob, file_path: str, size: Optional[int]) -> None:
+        try:
+            outcome, fetched = self.cache.warm_file(file_path, size)
+        except Exception as e:
+            outcome, fetched = "failed", 0
+            print(f"❌ Warm-up failed for {file_path}: {e}")
+        with self._lock:
+            job.outcomes[outcome] += 1
+            job.bytes += fetched
+            if job.completed >= job.total and job.state == "running":
+                job.state = "done"
+                job.finished = time.time()
+                print(f"🔥 Warm-up of pin {job.pin_id} done: {job.outcomes['cached']} fetched, "
+                      f"{job.outcomes['skipped']} already cached in {job.finished - job.started:.2f}s")
+
+    def stats(self) -> Dict:
+        return {
+            "workers": len(self.threads),
+            "active": sum(1 for job in list(self.jobs.values()) if job.state in ("listing", "running")),
+            "queued": self.tasks.qsize(),
+        }
+
+    def close(self) -> None:
+        for job in list(self.jobs.values()):
+            job.state = "cancelled"
+        for _ in self.threads:
+            self.tasks.put((float("inf"), next(self._sequence), None, None, None))
@@ -0,0 +1,512 @@
+#!/usr/bin/env python3
+"""
+Eviction policies for AIStor
+Each policy tracks the resident keys and their sizes and decides which key
+to evict next. AIStor picks one through the CACHE_POLICY environment variable.
+"""
+
+import heapq
+import itertools
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple
+
+from sketches import CountMinSketch
+
+
+@dataclass
+class PolicyStats:
+    """Request counters for comparing policies on the same traffic"""
+    hits: int = 0
+    misses: int = 0
+    bytes_hit: int = 0
+    bytes_missed: int = 0
+    evictions: int = 0
+
+    def record_hit(self, size: int) -> None:
+        self.hits += 1
+        self.bytes_hit += size
+
+    def record_miss(self, size: int = 0) -> None:
+        self.misses += 1
+        self.bytes_missed += size
+
+    def record_fill(self, size: int) -> None:
+        """Charge the bytes of a miss once its size is known (cache-aside fill)"""
+        self.bytes_missed += size
+
+    @property
+    def hit_ratio(self) -> float:
+        requests = self.hits + self.misses
+        return self.hits / requests if requests else 0.0
+
+    @property
+    def byte_hit_ratio(self) -> float:
+        requested = self.bytes_hit + self.bytes_missed
+        return self.bytes_hit / requested if requested else 0.0
+
+    def as_dict(self) -> Dict:
+        stats = asdict(self)
+        stats["hit_ratio"] = round(self.hit_ratio, 4)
+        stats["byte_hit_ratio"] = round(self.byte_hit_ratio, 4)
+        return stats
+
+
+class EvictionPolicy:
+    """Base class for byte-budgeted eviction policies
+
+    The cache calls on_insert for a new key, on_hit for a resident key
+    (the size may change when an entry is rewritten), on_remove when a key
+    leaves for any reason other than eviction, and evict while it is over
+    budget. evict forgets the key it returns.
+    """
+
+    name = "base"
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.sizes: Dict[str, int] = {}
+        self.used_bytes = 0
+        self.stats = PolicyStats()
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.sizes
+
+    def __len__(self) -> int:
+        return len(self.sizes)
+
+    def _track(self, key: str, size: int) -> None:
+        self.used_bytes += size - self.sizes.get(key, 0)
+        self.sizes[key] = size
+
+    def _untrack(self, key: str) -> int:
+        size = self.sizes.pop(key)
+        self.used_bytes -= size
+        return size
+
+    def on_insert(self, key: str, size: int) -> None:
+        raise NotImplementedError
+
+    def on_hit(self, key: str, size: int) -> None:
+        raise NotImplementedError
+
+    def on_remove(self, key: str) -> None:
+        raise NotImplementedError
+
+    def evict(self) -> Optional[str]:
+        raise NotImplementedError
+
+    def peek(self) -> Optional[str]:
+        """The key evict would return next, without evicting it (None if unknown)"""
+        return None
+
+
+class LRUPolicy(EvictionPolicy):
+    """Least recently used: an ordered recency index, O(1) per operation"""
+
+    name = "lru"
+
+    def __init__(self, capacity: int):
+        super().__init__(capacity)
+        self.recency: "OrderedDict[str, None]" = OrderedDict()
+
+    def on_insert(self, key: str, size: int) -> None:
+        self._track(key, size)
+        self.recency[key] = None
+        self.recency.move_to_end(key)
+
+    def on_hit(self, key: str, size: int) -> None:
+        self._track(key, size)
+        self.recency.move_to_end(key)
+
+    def on_remove(self, key: str) -> None:
+        if key in self.sizes:
+            self._untrack(key)
+            del self.recency[key]
+
+    def peek(self) -> Optional[str]:
+        return next(iter(self.recency), None)
+
+    def evict(self) -> Optional[str]:
+        if not self.recency:
+            return None
+        key, _ = self.recency.popitem(last=False)
+        self._untrack(key)
+        self.stats.evictions += 1
+        return key
+
+
+class LFUPolicy(EvictionPolicy):
+    """Least frequently used with LRU tie-breaking, O(1) per operation"""
+
+    name = "lfu"
+
+    def __init__(self, capacity: int):
+        super().__init__(capacity)
+        self.freq: Dict[str, int] = {}
+        self.buckets: Dict[int, "OrderedDict[str, None]"] = {}
+        self.min_freq = 0
+
+    def _bump(self, key: str) -> None:
+        freq = self.freq[key]
+        bucket = self.buckets[freq]
+        del bucket[key]
+        if not bucket:
+            del self.buckets[freq]
+            if self.min_freq == freq:
+                self.min_freq = freq + 1
+        self.freq[key] = freq + 1
+        self.buckets.setdefault(freq + 1, OrderedDict())[key] = None
+
+    def on_insert(self, key: str, size: int) -> None:
+        self._track(key, size)
+        self.freq[key] = 1
+        self.buckets.setdefault(1, OrderedDict())[key] = None
+        self.min_freq = 1
+
+    def on_hit(self, key: str, size: int) -> None:
+        self._track(key, size)
+        self._bump(key)
+
+    def on_remove(self, key: str) -> None:
+        if key not in self.sizes:
+            return
+        self._untrack(key)
+        freq = self.freq.pop(key)
+        bucket = self.buckets[freq]
+        del bucket[key]
+        if not bucket:
+            del self.buckets[freq]
+
+    def peek(self) -> Optional[str]:
+        if not self.buckets:
+            return None
+        return next(iter(self.buckets.get(self.min_freq) or self.buckets[min(self.buckets)]))
+
+    def evict(self) -> Optional[str]:
+        if not self.sizes:
+            return None
+        if self.min_freq not in self.buckets:
+            # Only reachable after on_remove emptied the lowest bucket
+            self.min_freq = min(self.buckets)
+        bucket = self.buckets[self.min_freq]
+        key, _ = bucket.popitem(last=False)
+        if not bucket:
+            del self.buckets[self.min_freq]
+        del self.freq[key]
+        self._untrack(key)
+        self.stats.evictions += 1
+        return key
+
+
+class ARCPolicy(EvictionPolicy):
+    """Adaptive Replacement Cache, with list sizes and target measured in bytes
+
+    T1 holds keys seen once recently, T2 keys seen at least twice. The
+    ghost lists B1/B2 remember recently evicted keys and steer the T1
+    target ``p`` towards whichever list would have produced the hit.
+    """
+
+    name = "arc"
+
+    def __init__(self, capacity: int):
+        super().__init__(capacity)
+        self.t1: "OrderedDict[str, int]" = OrderedDict()
+        self.t2: "OrderedDict[str, int]" = OrderedDict()
+        self.b1: "OrderedDict[str, int]" = OrderedDict()
+        self.b2: "OrderedDict[str, int]" = OrderedDict()
+        self.t1_bytes = self.t2_bytes = self.b1_bytes = self.b2_bytes = 0
+        self.p = 0.0
+
+    def on_insert(self, key: str, size: int) -> None:
+        self._track(key, size)
+        if key in self.b1:
+            self.p = min(self.capacity, self.p + max(1.0, self.b2_bytes / max(self.b1_bytes, 1)) * size)
+            self.b1_bytes -= self.b1.pop(key)
+            self.t2[key] = size
+            self.t2_bytes += size
+        elif key in self.b2:
+            self.p = max(0.0, self.p - max(1.0, self.b1_bytes / max(self.b2_bytes, 1)) * size)
+            self.b2_bytes -= self.b2.pop(key)
+            self.t2[key] = size
+            self.t2_bytes += size
+        else:
+            self.t1[key] = size
+            self.t1_bytes += size
+
+        # Keep the ghost history bounded to one extra cache worth of keys
+        while self.b1 and self.t1_bytes + self.b1_bytes > self.capacity:
+            _, ghost_size = self.b1.popitem(last=False)
+            self.b1_bytes -= ghost_size
+        while self.b2 and self.t1_bytes + self.t2_bytes + self.b1_bytes + self.b2_bytes > 2 * self.capacity:
+            _, ghost_size = self.b2.popitem(last=False)
+            self.b2_bytes -= ghost_size
+
+    def on_hit(self, key: str, size: int) -> None:
+        self._track(key, size)
+        if key in self.t1:
+            self.t1_bytes -= self.t1.pop(key)
+        else:
+            self.t2_bytes -= self.t2.pop(key)
+        self.t2[key] = size
+        self.t2_bytes += size
+
+    def on_remove(self, key: str) -> None:
+        if key not in self.sizes:
+            return
+        self._untrack(key)
+        if key in self.t1:
+            self.t1_bytes -= self.t1.pop(key)
+        else:
+            self.t2_bytes -= self.t2.pop(key)
+
+    def peek(self) -> Optional[str]:
+        if self.t1 and (self.t1_bytes > self.p or not self.t2):
+            return next(iter(self.t1))
+        return next(iter(self.t2), None)
+
+    def evict(self) -> Optional[str]:
+        if self.t1 and (self.t1_bytes > self.p or not self.t2):
+            key, size = self.t1.popitem(last=False)
+            self.t1_bytes -= size
+            self.b1[key] = size
+            self.b1_bytes += size
+        elif self.t2:
+            key, size = self.t2.popitem(last=False)
+            self.t2_bytes -= size
+            self.b2[key] = size
+            self.b2_bytes += size
+        else:
+            return None
+        self._untrack(key)
+        self.stats.evictions += 1
+        return key
+
+
+class WTinyLFUPolicy(EvictionPolicy):
+    """Window TinyLFU: a small LRU window in front of a segmented-LRU main cache
+
+    New keys enter the window. When the window overflows, its oldest key
+    only enters the main cache if the frequency sketch says it is more
+    popular than the main cache's next victim, so one-pass scans wash
+    through the window without flushing the frequently read working set.
+    """
+
+    name = "wtinylfu"
+
+    def __init__(self, capacity: int, window_fraction: float = 0.01, protected_fraction: float = 0.8):
+        super().__init__(capacity)
+        self.window_capacity = max(1, int(capacity * window_fraction))
+        self.protected_capacity = int((capacity - self.window_capacity) * protected_fraction)
+        self.window: "OrderedDict[str, None]" = OrderedDict()
+        self.probation: "OrderedDict[str, None]" = OrderedDict()
+        self.protected: "OrderedDict[str, None]" = OrderedDict()
+        self.window_bytes = self.protected_bytes = 0
+        self.sketch = CountMinSketch(width=max(1024, min(capacity // 4096, 1 << 20)))
+
+    def _segment_of(self, key: str) -> "OrderedDict[str, None]":
+        if key in self.window:
+            return self.window
+        if key in self.protected:
+            return self.protected
+        return self.probation
+
+    def on_insert(self, key: str, size: int) -> None:
+        self._track(key, size)
+        self.sketch.add(key)
+        self.window[key] = None
+        self.window_bytes += size
+
+    def on_hit(self, key: str, size: int) -> None:
+        old_size = self.sizes[key]
+        self._track(key, size)
+        self.sketch.add(key)
+        if key in self.window:
+            self.window_bytes += size - old_size
+            self.window.move_to_end(key)
+        elif key in self.protected:
+            self.protected_bytes += size - old_size
+            self.protected.move_to_end(key)
+        else:
+            # Second touch in probation earns a protected slot
+            del self.probation[key]
+            self.protected[key] = None
+            self.protected_bytes += size
+            while self.protected_bytes > self.protected_capacity and len(self.protected) > 1:
+                demoted, _ = self.protected.popitem(last=False)
+                self.protected_bytes -= self.sizes[demoted]
+                self.probation[demoted] = None
+
+    def on_remove(self, key: str) -> None:
+        if key not in self.sizes:
+            return
+        segment = self._segment_of(key)
+        del segment[key]
+        size = self._untrack(key)
+        if segment is self.window:
+            self.window_bytes -= size
+        elif segment is self.protected:
+            self.protected_bytes -= size
+
+    def _main_victim(self) -> Tuple[Optional[str], Optional["OrderedDict[str, None]"]]:
+        for segment in (self.probation, self.protected):
+            if segment:
+                return next(iter(segment)), segment
+        return None, None
+
+    def peek(self) -> Optional[str]:
+        # The main cache's victim, which a window overflow has to beat
+        victim, _ = self._main_victim()
+        return victim if victim is not None else next(iter(self.window), None)
+
+    def evict(self) -> Optional[str]:
+        if not self.sizes:
+            return None
+
+        main_capacity = self.capacity - self.window_capacity
+        while self.window and self.window_bytes > self.window_capacity:
+            candidate = next(iter(self.window))
+            victim, segment = self._main_victim()
+            main_bytes = self.used_bytes - self.window_bytes
+            if victim is None or main_bytes + self.sizes[candidate] <= main_capacity:
+                # Main cache has room: the candidate moves in unopposed
+                del self.window[candidate]
+                self.window_bytes -= self.sizes[candidate]
+                self.probation[candidate] = None
+                continue
+
+            if self.sketch.estimate(candidate) > self.sketch.estimate(victim):
+                del self.window[candidate]
+                self.window_bytes -= self.sizes[candidate]
+                self.probation[candidate] = None
+                key = victim
+            else:
+                segment = self.window
+                key = candidate
+            break
+        else:
+            key, segment = self._main_victim()
+            if key is None:
+                key, segment = next(iter(self.window)), self.window
+
+        del segment[key]
+        size = self._untrack(key)
+        if segment is self.window:
+            self.window_bytes -= size
+        elif segment is self.protected:
+            self.protected_bytes -= size
+        self.stats.evictions += 1
+        return key
+
+
+class GDSFPolicy(EvictionPolicy):
+    """Greedy-Dual-Size-Frequency: evicts the key with the lowest frequency/size priority
+
+    Priorities are ``L + frequency / size``; L rises to each evicted
+    priority, so entries that stop being read age out. Small, frequently
+    read files are kept in preference to large ones.
+    """
+
+    name = "gdsf"
+
+    def __init__(self, capacity: int):
+        super().__init__(capacity)
+        self.inflation = 0.0
+        self.freq: Dict[str, int] = {}
+        self.priority: Dict[str, float] = {}
+        self.heap: List[Tuple[float, int, str]] = []
+        self._counter = itertools.count()
+
+    def _push(self, key: str) -> None:
+        priority = self.inflation + self.freq[key] / max(self.sizes[key], 1)
+        self.priority[key] = priority
+        heapq.heappush(self.heap, (priority, next(self._counter), key))
+
+        # Superseded heap entries are skipped lazily; rebuild before they dominate
+        if len(self.heap) > 2 * len(self.priority) + 1024:
+            self.heap = [(p, next(self._counter), k) for k, p in self.priority.items()]
+            heapq.heapify(self.heap)
+
+    def on_insert(self, key: str, size: int) -> None:
+        self._track(key, size)
+        self.freq[key] = 1
+        self._push(key)
+
+    def on_hit(self, key: str, size: int) -> None:
+        self._track(key, size)
+        self.freq[key] += 1
+        self._push(key)
+
+    def on_remove(self, key: str) -> None:
+        if key in self.sizes:
+            self._untrack(key)
+            del self.freq[key]
+            del self.priority[key]
+
+    def peek(self) -> Optional[str]:
+        # Drop superseded entries from the top so the head is the real minimum
+        while self.heap and self.priority.get(self.heap[0][2]) != self.heap[0][0]:
+            heapq.heappop(self.heap)
+        return self.heap[0][2] if self.heap else None
+
+    def evict(self) -> Optional[str]:
+        while self.heap:
+            priority, _, key = heapq.heappop(self.heap)
+            if self.priority.get(key) != priority:
+                continue
+            self.inflation = priority
+            del self.priority[key]
+            del self.freq[key]
+            self._untrack(key)
+            self.stats.evictions += 1
+            return key
+        return None
+
+
+POLICIES = {
+    policy.name: policy
+    for policy in (LRUPolicy, LFUPolicy, ARCPolicy, WTinyLFUPolicy, GDSFPolicy)
+}
+
+
+def create_policy(name: str, capacity: int) -> EvictionPolicy:
+    """Instantiate an eviction policy by name (lru, lfu, arc, wtinylfu, gdsf)"""
+    try:
+        return POLICIES[name.lower()](capacity)
+    except KeyError:
+        raise ValueError(f"Unknown cache policy '{name}', expected one of: {', '.join(POLICIES)}")
+
+
+def access(policy: EvictionPolicy, key: Hashable, size: int, admission=None,
+           max_object_size: Optional[int] = None) -> bool:
+    """One request against a policy used as a read-through cache; True on a hit
+
+    With an AdmissionFilter, a miss that does not fit without evicting is
+    only cached if the filter admits it against the policy's next victim.
+    Objects above max_object_size are never cached.
+    """
+    if admission is not None:
+        admission.record(key)
+    if key in policy:
+        policy.stats.record_hit(size)
+        policy.on_hit(key, size)
+        return True
+
+    policy.stats.record_miss(size)
+    if size > policy.capacity or (max_object_size is not None and size > max_object_size):
+        return False
+    if (admission is not None and policy.used_bytes + size > policy.capacity
+            and not admission.admit(key, policy.peek())):
+        return False
+    policy.on_insert(key, size)
+    while policy.used_bytes > policy.capacity:
+        if policy.evict() is None:
+            break
+    return False
+
+
+def replay(policy: EvictionPolicy, trace: Iterable[Tuple[Hashable, int]], admission=None) -> PolicyStats:
+    """Run a (key, size) request trace through a policy as a read-through cache"""
+    for key, size in trace:
+        access(policy, key, size, admission)
+    return policy.stats
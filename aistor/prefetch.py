@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Sequence-aware prefetching for AIStor
+UMI demonstrations are written as numbered runs under each demo_XXXX/
+prefix, e.g. poses/poses_000060_000119.json (one second of sensor data)
+and video/chunk_000300_000600.npz (300 frames). Once a client reads
+a run in order, the next batches are fetched into the cache before they
+are asked for.
+
+Prefetch depth follows the measured consumption rate: enough batches to
+cover the lookahead window (at least twice the backend fetch latency),
+bounded by PREFETCH_MAX_DEPTH. Every prefetched object is tracked until
+it is read (useful) or evicted unread (wasted).
+"""
+
+import math
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from optimizer import AIStor
+
+# '<...>/demo_0007/<sub>/<stem>_<start>_<end>.<ext>'
+SEQUENCE_KEY = re.compile(
+    r"^(?P<prefix>.*/demo_\d+/(?:[^/]+/)*)(?P<stem>[A-Za-z]+)_(?P<start>\d+)_(?P<end>\d+)(?P<ext>\.\w+)$"
+)
+
+# Consecutive equal strides needed before a run counts as sequential
+TRIGGER_RUN = 2
+MAX_STREAMS = 4096
+
+
+def parse_sequence_key(file_path: str) -> Optional[Tuple[str, int, int, int]]:
+    """(stream id, start, end, digit width) for a numbered batch key, else None"""
+    match = SEQUENCE_KEY.match(file_path)
+    if match is None:
+        return None
+    stream = f"{match['prefix']}{match['stem']}_{{}}_{{}}{match['ext']}"
+    return stream, int(match['start']), int(match['end']), len(match['start'])
+
+
+class _Stream:
+    """Access history of one numbered run within a demo"""
+
+    def __init__(self, start: int, now: float):
+        self.last_start = start
+        self.last_time = now
+        self.stride = 0
+        self.run = 0
+        self.interval = 0.0        # EWMA seconds between sequential reads
+        self.prefetched_to = start  # Highest start already scheduled
+        self.limit: Optional[int] = None  # First start known not to exist
+
+
+class Prefetcher:
+    """Detects sequential reads per demo prefix and fetches ahead in the background"""
+
+    def __init__(self, cache: "AIStor", max_depth: int = 8, lookahead: float = 1.0,
+                 workers: int = 4, max_object_size: int = 16 * 1024**2):
+        self.cache = cache
+        self.max_depth = max_depth
+        self.lookahead = lookahead
+        self.max_object_size = max_object_size
+        self.streams: "OrderedDict[str, _Stream]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="aistor-prefetch")
+
+        # Prefetched objects not yet read: path -> size (None while the fetch is in flight)
+        self.outstanding: Dict[str, Optional[int]] = {}
+        self.fetch_latency = 0.0
+        self.issued = 0
+        self.useful = 0
+        self.useful_bytes = 0
+        self.wasted = 0
+        self.wasted_bytes = 0
+        self.not_found = 0
+
+    def on_access(self, file_path: str) -> None:
+        """Called for every client read; credits prefetches and schedules new ones"""
+        with self.lock:
+            if file_path in self.outstanding:
+                # Read after (or while) it was prefetched
+                self.useful += 1
+                self.useful_bytes += self.outstanding.pop(file_path) or 0
+                self.cache.metrics.prefetch_hits.inc()
+
+            parsed = parse_sequence_key(file_path)
+            if parsed is None:
+                return
+            targets = self._observe(*parsed)
+
+        for target in targets:
+            self.pool.submit(self._fetch, *target)
+
+    def _observe(self, stream_id: str, start: int, end: int, width: int) -> List[Tuple[str, str, int]]:
+        """Update a stream with one read and return the (path, stream, start) to prefetch"""
+        now = time.monotonic()
+        stream = self.streams.get(stream_id)
+        if stream is None:
+            stream = self.streams[stream_id] = _Stream(start, now)
+            if len(self.streams) > MAX_STREAMS:
+                self.streams.popitem(last=False)
+            return []
+        self.streams.move_to_end(stream_id)
+
+        stride = start - stream.last_start
+        if stride == 0:
+            # Same batch read again, e.g. by another dataloader worker
+            return []
+        if stride < 0:
+            # Jump back (e.g. a new epoch): start over from here
+            stream.run = 0
+            stream.stride = 0
+            stream.prefetched_to = start
+        elif stride == stream.stride:
+            stream.run += 1
+            elapsed = now - stream.last_time
+            stream.interval = elapsed if not stream.interval else 0.7 * stream.interval + 0.3 * elapsed
+        else:
+            stream.stride = stride
+            stream.run = 1
+            stream.prefetched_to = start
+        stream.last_start = start
+        stream.last_time = now
+
+        if stream.run < TRIGGER_RUN:
+            return []
+
+        # Enough batches to stay ahead of the reader for the lookahead window
+        window = max(self.lookahead, 2 * self.fetch_latency)
+        depth = self.max_depth if stream.interval <= 0 else math.ceil(window / stream.interval)
+        depth = max(1, min(self.max_depth, depth))
+
+        targets = []
+        span = end - start
+        for k in range(1, depth + 1):
+            next_start = start + k * stride
+            if next_start <= stream.prefetched_to:
+                continue
+            if stream.limit is not None and next_start >= stream.limit:
+                break
+            path = stream_id.format(f"{next_start:0{width}d}", f"{next_start + span:0{width}d}")
+            if path not in self.cache.metadata_cache:
+                targets.append((path, stream_id, next_start))
+                self.outstanding[path] = None
+            stream.prefetched_to = next_start
+        return targets
+
+    def _fetch(self, file_path: str, stream_id: str, start: int) -> None:
+        began = time.perf_counter()
+        try:
+            status, size = self.cache.prefetch_file(file_path, self.max_object_size)
+        except Exception as e:
+            status, size = "failed", 0
+            print(f"❌ Prefetch failed for {file_path}: {e}")
+        elapsed = time.perf_counter() - began
+
+        with self.lock:
+            if status in ("cached", "too_large"):
+                self.issued += 1
+                self.fetch_latency = elapsed if not self.fetch_latency else 0.8 * self.fetch_latency + 0.2 * elapsed
+            if file_path not in self.outstanding:
+                # Already read while in flight, and credited then
+                self.useful_bytes += size
+                return
+
+            if status == "cached":
+                self.outstanding[file_path] = size
+                return
+            del self.outstanding[file_path]
+            if status == "missing":
+                # Past the end of the demo: stop predicting further along this run
+                self.issued += 1
+                self.not_found += 1
+                self.wasted += 1
+                stream = self.streams.get(stream_id)
+                if stream is not None and (stream.limit is None or start < stream.limit):
+                    stream.limit = start
+            elif status == "too_large":
+                self.wasted += 1
+                self.wasted_bytes += size
+                self.cache.metrics.prefetch_wasted_bytes.inc(size)
+
+    def on_evict(self, file_path: str) -> None:
+        """A cached object left the cache; if it was prefetched and never read, it was wasted"""
+        if file_path not in self.outstanding:
+            return
+        with self.lock:
+            if self.outstanding.get(file_path) is not None:
+                size = self.outstanding.pop(file_path)
+                self.wasted += 1
+                self.wasted_bytes += size
+                self.cache.metrics.prefetch_wasted_bytes.inc(size)
+
+    def stats(self) -> Dict:
+        resolved = self.useful + self.wasted
+        return {
+            "issued": self.issued,
+            "useful": self.useful,
+            "wasted": self.wasted,
+            "not_found": self.not_found,
+            "pending": len(self.outstanding),
+            "accuracy": round(self.useful / resolved, 4) if resolved else 0.0,
+            "useful_mb": round(self.useful_bytes / 1024 / 1024, 2),
+            "wasted_mb": round(self.wasted_bytes / 1024 / 1024, 2),
+            "streams": len(self.streams),
+            "fetch_latency_ms": round(self.fetch_latency * 1000, 2),
+        }
+
+    def close(self) -> None:
+        self.pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Prefix index for AIStor
+A trie over the '/'-separated components of cached keys, each node holding
+the entry count and bytes of its whole subtree. Counting what is cached
+under demonstrations/pick_cube/demo_0003/ walks the prefix's components,
+and collecting those keys (to invalidate or list them) touches only the
+matching subtree, never the rest of the cache.
+
+Prefixes are plain string prefixes as in S3: a prefix that ends inside a
+component (demo_00) matches every child that starts with it.
+
+Nodes also hold the gateway's cached LIST responses for the prefixes
+that end at them. A write or delete of a key drops the listings of every
+node on its path, which covers every prefix the key could be listed under.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Bound on cached LIST responses; the oldest are dropped first
+MAX_LISTINGS = 1024
+MAX_LISTING_SIZE = 1024 * 1024
+
+
+class _Node:
+    __slots__ = ("name", "parent", "children", "keys", "entries", "bytes", "listings")
+
+    def __init__(self, name: str, parent: Optional["_Node"]):
+        self.name = name
+        self.parent = parent
+        self.children: Dict[str, "_Node"] = {}
+        # Cached keys whose last component is directly below this node, with their sizes
+        self.keys: Dict[str, int] = {}
+        self.entries = 0
+        self.bytes = 0
+        # LIST query -> (expires_at, response body)
+        self.listings: Optional[Dict[str, Tuple[float, bytes]]] = None
+
+
+def _split(prefix: str) -> Tuple[List[str], str]:
+    """(whole components, trailing partial component) of a prefix"""
+    components = prefix.split("/")
+    return components[:-1], components[-1]
+
+
+class PrefixIndex:
+    """Cached keys by prefix, with subtree totals"""
+
+    def __init__(self):
+        self.root = _Node("", None)
+        self._lock = threading.Lock()
+        # Cached listings, oldest first: (id(node), query) -> node, which also keeps the node alive
+        self._listing_order: "OrderedDict[Tuple[int, str], _Node]" = OrderedDict()
+        # Bumped by every drop_listings: a LIST sent upstream before a drop may predate the change
+        self.listing_generation = 0
+
+    @property
+    def listing_count(self) -> int:
+        return len(self._listing_order)
+
+    def _find(self, components: List[str], create: bool = False) -> Optional[_Node]:
+        node = self.root
+        for name in components:
+            child = node.children.get(name)
+            if child is None:
+                if not create:
+                    return None
+                child = node.children[name] = _Node(name, node)
+            node = child
+        return node
+
+    def add(self, path: str, size: int) -> None:
+        """Index a cached key, or update the size of one already indexed"""
+        components, _ = _split(path)
+        with self._lock:
+            node = self._find(components, create=True)
+            previous = node.keys.get(path)
+            node.keys[path] = size
+            entries, delta = (0, size - previous) if previous is not None else (1, size)
+            while node is not None:
+                node.entries += entries
+                node.bytes += delta
+                node = node.parent
+
+    def remove(self, path: str) -> bool:
+        components, _ = _split(path)
+        with self._lock:
+            node = self._find(components)
+            if node is None or path not in node.keys:
+                return False
+            size = node.keys.pop(path)
+            leaf = node
+            while node is not None:
+                node.entries -= 1
+                node.bytes -= size
+                node = node.parent
+            self._prune(leaf)
+            return True
+
+    def _prune(self, node: _Node) -> None:
+        while node.parent is not None and not (node.entries or node.children or node.listings):
+            # Already detached when pruned through one of its descendants
+            if node.parent.children.get(node.name) is node:
+                del node.parent.children[node.name]
+            node = node.parent
+
+    def _matches(self, prefix: str) -> Tuple[Optional[_Node], List[_Node], List[str]]:
+        """(node of the whole components, matching child subtrees, matching keys directly below it)"""
+        components, partial = _split(prefix)
+        node = self._find(components)
+        if node is None:
+            return None, [], []
+        if not partial:
+            return node, list(node.children.values()), list(node.keys)
+        children = [child for name, child in node.children.items() if name.startswith(partial)]
+        return node, children, [key for key in node.keys if key.startswith(prefix)]
+
+    def stats(self, prefix: str) -> Tuple[int, int]:
+        """(entries, bytes) cached under prefix"""
+        with self._lock:
+            node, children, keys = self._matches(prefix)
+            if node is None:
+                return 0, 0
+            if not prefix.rpartition("/")[2]:
+                return node.entries, node.bytes
+            return (sum(child.entries for child in children) + len(keys),
+                    sum(child.bytes for child in children) + sum(node.keys[key] for key in keys))
+
+    def keys(self, prefix: str) -> List[str]:
+        """Every cached key under prefix"""
+        with self._lock:
+            node, children, keys = self._matches(prefix)
+            for child in children:
+                for subtree in self._subtree_nodes(child):
+                    keys.extend(subtree.keys)
+            return keys
+
+    def list(self, prefix: str, delimiter: str = "") -> Tuple[List[Tuple[str, int]], List[str]]:
+        """(sorted (key, size) pairs, sorted common prefixes) under prefix, S3 style
+
+        Only '/' is supported as a delimiter, since that is what the trie splits on.
+        """
+        if delimiter not in ("", "/"):
+            raise ValueError(f"Unsupported delimiter '{delimiter}', expected '/' or none")
+        with self._lock:
+            node, children, keys = self._matches(prefix)
+            if node is None:
+                return [], []
+            if delimiter:
+                base = prefix.rpartition("/")[0]
+                base = base + "/" if base else ""
+                return (sorted((key, node.keys[key]) for key in keys),
+                        sorted(base + child.name + "/" for child in children))
+            found = [(key, node.keys[key]) for key in keys]
+            for child in children:
+                for subtree in self._subtree_nodes(child):
+                    found.extend(subtree.keys.items())
+            return sorted(found), []
+
+    def _subtree_nodes(self, node: _Node) -> Iterator[_Node]:
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            yield node
+            stack.extend(node.children.values())
+
+    def get_listing(self, prefix: str, query: str, now: float) -> Optional[bytes]:
+        """A cached LIST response for prefix and query, if there is an unexpired one"""
+        components, _ = _split(prefix)
+        with self._lock:
+            node = self._find(components)
+            if node is None or not node.listings:
+                return None
+            listing = node.listings.get(query)
+            if listing is None or listing[0] <= now:
+                return None
+            return listing[1]
+
+    def put_listing(self, prefix: str, query: str, body: bytes, expires_at: float, generation: int) -> bool:
+        """Cache a LIST response until expires_at; False if it is too large to keep, or
+        listings were dropped since generation was read (before the LIST was sent)"""
+        if len(body) > MAX_LISTING_SIZE:
+            return False
+        components, _ = _split(prefix)
+        with self._lock:
+            if generation != self.listing_generation:
+                return False
+            node = self._find(components, create=True)
+            if node.listings is None:
+                node.listings = {}
+            node.listings[query] = (expires_at, body)
+            self._listing_order[(id(node), query)] = node
+            self._listing_order.move_to_end((id(node), query))
+            while len(self._listing_order) > MAX_LISTINGS:
+                (_, oldest_query), oldest = self._listing_order.popitem(last=False)
+                del oldest.listings[oldest_query]
+                if not oldest.listings:
+                    oldest.listings = None
+                    self._prune(oldest)
+            return True
+
+    def drop_listings(self, path: str, subtree: bool = False) -> int:
+        """Forget the LIST responses a change to path could make wrong; with subtree,
+        also those of every prefix below path (for changes to a whole prefix)"""
+        components, _ = _split(path)
+        dropped = 0
+        with self._lock:
+            self.listing_generation += 1
+            node = self.root
+            nodes = [node]
+            for name in components:
+                node = node.children.get(name)
+                if node is None:
+                    break
+                nodes.append(node)
+            if subtree and node is not None:
+                _, children, _ = self._matches(path)
+                for child in children:
+                    nodes.extend(self._subtree_nodes(child))
+            for node in nodes:
+                if node.listings:
+                    dropped += len(node.listings)
+                    for query in node.listings:
+                        del self._listing_order[(id(node), query)]
+                    node.listings = None
+            for node in reversed(nodes):
+                self._prune(node)
+        return dropped
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Probabilistic sketches for AIStor
+Compact, fixed-memory frequency estimators used by the cache policies
+and the admission filter to judge how popular a key is without tracking
+every key ever seen.
+"""
+
+import heapq
+from operator import itemgetter
+from typing import Dict, Hashable, List, Tuple
+
+# Odd 64-bit multipliers, one per sketch row
+_ROW_SEEDS = (
+    0x9E3779B97F4A7C15,
+    0xC2B2AE3D27D4EB4F,
+    0x165667B19E3779F9,
+    0xD6E8FEB86659FD93,
+)
+_MASK64 = (1 << 64) - 1
+
+
+class CountMinSketch:
+    """Count-Min sketch with saturating counters and periodic aging
+
+    Counters are capped at ``max_count`` and every ``sample_size``
+    increments all counters are halved, so estimates track recent
+    popularity rather than all-time totals (the TinyLFU reset).
+    """
+
+    def __init__(self, width: int = 4096, depth: int = 4, max_count: int = 15, sample_size: int = 0):
+        # Round width up to a power of two so row indexes are a mask, not a modulo
+        self.width = 1 << max(width - 1, 1).bit_length()
+        self.depth = min(depth, len(_ROW_SEEDS))
+        self.max_count = max_count
+        self.sample_size = sample_size or 10 * self.width
+        self.rows: List[List[int]] = [[0] * self.width for _ in range(self.depth)]
+        self.additions = 0
+
+    def _indexes(self, key: Hashable) -> List[int]:
+        h = hash(key) & _MASK64
+        shift = 64 - (self.width.bit_length() - 1)
+        return [((h * seed) & _MASK64) >> shift for seed in _ROW_SEEDS[:self.depth]]
+
+    def add(self, key: Hashable) -> None:
+        """Count one occurrence of key"""
+        indexes = self._indexes(key)
+        current = min(row[i] for row, i in zip(self.rows, indexes))
+        if current < self.max_count:
+            # Conservative update: only raise the counters that hold the minimum
+            for row, i in zip(self.rows, indexes):
+                if row[i] == current:
+                    row[i] = current + 1
+
+        self.additions += 1
+        if self.additions >= self.sample_size:
+            self.reset()
+
+    def estimate(self, key: Hashable) -> int:
+        """Estimated recent frequency of key (never an underestimate before aging)"""
+        return min(row[i] for row, i in zip(self.rows, self._indexes(key)))
+
+    def reset(self) -> None:
+        """Halve every counter so old popularity decays"""
+        for row in self.rows:
+            for i, value in enumerate(row):
+                if value:
+                    row[i] = value >> 1
+        self.additions //= 2
+
+
+class BloomFilter:
+    """Bloom filter over a fixed bit array, cleared as a whole rather than per key
+
+    Sized at about 8 bits per expected key, which keeps false positives
+    around 3% with three hash functions.
+    """
+
+    def __init__(self, expected_keys: int, hashes: int = 3):
+        self.size = 1 << max(8 * expected_keys - 1, 64).bit_length()
+        self.hashes = min(hashes, len(_ROW_SEEDS))
+        self.bits = bytearray(self.size // 8)
+
+    def _indexes(self, key: Hashable) -> List[int]:
+        h = hash(key) & _MASK64
+        shift = 64 - (self.size.bit_length() - 1)
+        return [((h * seed) & _MASK64) >> shift for seed in _ROW_SEEDS[:self.hashes]]
+
+    def __contains__(self, key: Hashable) -> bool:
+        bits = self.bits
+        return all(bits[i >> 3] & (1 << (i & 7)) for i in self._indexes(key))
+
+    def add(self, key: Hashable) -> bool:
+        """Set key's bits; True if they were all set already (key probably seen before)"""
+        bits = self.bits
+        present = True
+        for i in self._indexes(key):
+            mask = 1 << (i & 7)
+            if not bits[i >> 3] & mask:
+                bits[i >> 3] |= mask
+                present = False
+        return present
+
+    def clear(self) -> None:
+        self.bits = bytearray(len(self.bits))
+
+
+class SpaceSaving:
+    """Space-Saving summary: the most frequent keys of a stream in a fixed number of counters
+
+    An untracked key takes over the smallest counter and inherits its count,
+    so counts overestimate by at most that inherited error, and every key
+    seen more than total / capacity times is guaranteed to be tracked.
+    Every ``sample_size`` additions all counts are halved, like the
+    Count-Min sketch, so the summary follows recent popularity.
+    """
+
+    def __init__(self, capacity: int = 64, sample_size: int = 0):
+        self.capacity = capacity
+        self.sample_size = sample_size
+        self.counts: Dict[Hashable, int] = {}
+        self.errors: Dict[Hashable, int] = {}
+        # One (count, key) per tracked key, possibly below its current count; fixed up lazily
+        self._heap: List[Tuple[int, Hashable]] = []
+        self.additions = 0
+
+    def add(self, key: Hashable, count: int = 1) -> None:
+        """Count count occurrences of key"""
+        counts = self.counts
+        if key in counts:
+            counts[key] += count
+        elif len(counts) < self.capacity:
+            counts[key] = count
+            self.errors[key] = 0
+            heapq.heappush(self._heap, (count, key))
+        else:
+            minimum, victim = self._pop_min()
+            del counts[victim], self.errors[victim]
+            counts[key] = minimum + count
+            self.errors[key] = minimum
+            heapq.heappush(self._heap, (minimum + count, key))
+
+        self.additions += count
+        if self.sample_size and self.additions >= self.sample_size:
+            self.reset()
+
+    def _pop_min(self) -> Tuple[int, Hashable]:
+        heap = self._heap
+        while True:
+            count, key = heapq.heappop(heap)
+            current = self.counts[key]
+            if current == count:
+                # Every heap entry is at most its key's count, so an exact one on top is the minimum
+                return count, key
+            heapq.heappush(heap, (current, key))
+
+    def top(self, n: int) -> List[Tuple[Hashable, int]]:
+        """The n keys with the highest estimated counts, highest first"""
+        return heapq.nlargest(n, self.counts.items(), key=itemgetter(1))
+
+    def guaranteed(self, key: Hashable) -> int:
+        """Occurrences of key counted for certain (its estimate minus the inherited error)"""
+        return self.counts.get(key, 0) - self.errors.get(key, 0)
+
+    def reset(self) -> None:
+        """Halve every count so old popularity decays"""
+        for key, count in self.counts.items():
+            self.counts[key] = count >> 1
+            self.errors[key] >>= 1
+        self._heap = [(count, key) for key, count in self.counts.items()]
+        heapq.heapify(self._heap)
+        self.additions //= 2
@@ -0,0 +1,613 @@
+#!/usr/bin/env python3
+"""
+Blob storage layouts for the AIStor cache
+
+- FileStore: one file per cached blob under small-files/ (the original layout)
+- SegmentStore: small objects packed into large append-only segment files,
+  read back through mmap, with a background compactor that reclaims the
+  space left behind by evicted or overwritten entries
+- MemoryTier: a bounded in-RAM copy of the hottest entries in front of either
+
+Both are addressed by blob key (the content hash when used by AIStor) and
+hand back a printable location string, which AIStor's metadata store
+asks for through location() whenever it persists an entry. After a restart,
+restore_many() re-registers persisted entries in bulk and reconcile()
+makes a single os.scandir pass to delete orphaned files and report
+entries whose blob has disappeared. A location may have been persisted
+before its segment record reached the disk, so restored records must have
+an intact header to be kept and are checked against its CRC when first
+read; those that fail are dropped like missing ones.
+
+Besides read(), which returns a copy, both stores hand out read-only
+memoryviews backed by mmap (view()) and file descriptors for sendfile
+(open_range()). Either stays valid after the blob is evicted: files are
+only ever unlinked or replaced by rename, never rewritten in place, and a
+segment still viewed when compacted is unmapped with its last view.
+"""
+
+import os
+import mmap
+import re
+import struct
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+# Record header: magic, key length, data length, CRC32 of the data
+RECORD_HEADER = struct.Struct("<4sHII")
+RECORD_MAGIC = b"AIS1"
+
+SEGMENT_NAME = re.compile(r"^segment-(\d{6})\.dat$")
+
+# Below this a FileStore view is a copy: mapping a few pages costs more than reading them
+MIN_MAPPED_SIZE = 64 * 1024
+
+# (key, cache_location, size) as persisted by the metadata store
+RestoreEntry = Tuple[str, Optional[str], int]
+
+
+class FileStore:
+    """One file per cached blob (original AIStor layout)"""
+
+    layout = "files"
+
+    def __init__(self, root: Path):
+        self.root = root
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.paths: Dict[str, Path] = {}
+
+    def put(self, key: str, data: bytes, file_hash: str) -> str:
+        # Blobs are content-addressed, so the hash alone names the file
+        path = self.root / (file_hash or Path(key).name)
+        # Renamed into place, so a mapping of a previous file at this path never sees it change
+        temp_path = path.with_name(path.name + ".tmp")
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+
+        previous = self.paths.get(key)
+        if previous is not None and previous != path:
+            previous.unlink(missing_ok=True)
+        self.paths[key] = path
+        return str(path)
+
+    def read(self, key: str) -> Optional[bytes]:
+        path = self.paths.get(key)
+        if path is None:
+            return None
+        try:
+            with open(path, 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            if self.paths.get(key) == path:
+                self.paths.pop(key, None)
+            return None
+
+    def _open(self, key: str) -> Optional[int]:
+        path = self.paths.get(key)
+        if path is None:
+            return None
+        try:
+            return os.open(path, os.O_RDONLY)
+        except FileNotFoundError:
+            if self.paths.get(key) == path:
+                self.paths.pop(key, None)
+            return None
+
+    def view(self, key: str) -> Optional[memoryview]:
+        """Read-only view of a blob, mapped from its file; eviction unlinking the file does not affect it"""
+        fd = self._open(key)
+        if fd is None:
+            return None
+        try:
+            size = os.fstat(fd).st_size
+            if size < MIN_MAPPED_SIZE:
+                return memoryview(os.pread(fd, size, 0))
+            return memoryview(mmap.mmap(fd, size, access=mmap.ACCESS_READ))
+        finally:
+            os.close(fd)
+
+    def open_range(self, key: str) -> Optional[Tuple[int, int, int]]:
+        """(descriptor, offset, length) of a blob for sendfile; the caller closes the descriptor"""
+        fd = self._open(key)
+        if fd is None:
+            return None
+        return fd, 0, os.fstat(fd).st_size
+
+    def location(self, key: str) -> Optional[str]:
+        path = self.paths.get(key)
+        return str(path) if path is not None else None
+
+    def delete(self, key: str) -> None:
+        path = self.paths.pop(key, None)
+        if path is not None:
+            path.unlink(missing_ok=True)
+
+    def restore(self, key: str, location: Optional[str], size: int) -> bool:
+        """Re-register an entry loaded from persisted metadata"""
+        return not self.restore_many([(key, location, size)])
+
+    def restore_many(self, entries: Iterable[RestoreEntry]) -> Set[str]:
+        """Re-register persisted entries without touching the disk; returns the keys rejected"""
+        rejected = set()
+        for key, location, size in entries:
+            if not location or location.startswith("segment-"):
+                rejected.add(key)
+            else:
+                self.paths[key] = Path(location)
+        return rejected
+
+    def reconcile(self) -> Tuple[List[str], int, int]:
+        """One scandir pass: delete unreferenced files, return (missing keys, orphans removed, bytes freed)"""
+        started = time.time()
+        restored = dict(self.paths)
+        expected = {path.name for path in restored.values()}
+        seen = set()
+        orphans = freed = 0
+
+        for entry in os.scandir(self.root):
+            if entry.name in expected:
+                seen.add(entry.name)
+                continue
+            stat = entry.stat()
+            # Files newer than the scan may belong to a put that has not registered them yet
+            if stat.st_mtime < started:
+                os.unlink(entry.path)
+                orphans += 1
+                freed += stat.st_size
+
+        # Only entries that existed before the scan and were not rewritten since
+        missing = [
+            key for key, path in restored.items()
+            if path.name not in seen and self.paths.get(key) == path
+        ]
+        return missing, orphans, freed
+
+    def stats(self) -> Dict:
+        return {"layout": self.layout, "files": len(self.paths)}
+
+    def close(self) -> None:
+        pass
+
+
+class _Segment:
+    """One segment file: appended with pwrite, read through a shared mmap"""
+
+    def __init__(self, segment_id: int, path: Path, capacity: int, writable: bool):
+        self.id = segment_id
+        self.path = path
+        flags = os.O_RDWR | os.O_CREAT if writable else os.O_RDONLY
+        self.fd = os.open(path, flags, 0o644)
+        if writable:
+            # Preallocate (sparsely) so a single mapping covers every future append
+            os.ftruncate(self.fd, capacity)
+            self.capacity = capacity
+        else:
+            self.capacity = os.fstat(self.fd).st_size
+        self.map = mmap.mmap(self.fd, self.capacity, access=mmap.ACCESS_READ) if self.capacity else None
+        self.used = 0 if writable else self.capacity
+        self.sealed = not writable
+        self.live_bytes = 0
+        self.keys: Set[str] = set()
+
+    def append(self, key: bytes, data: bytes) -> int:
+        """Write a record and return the offset of its data"""
+        header = RECORD_HEADER.pack(RECORD_MAGIC, len(key), len(data), zlib.crc32(data))
+        os.pwrite(self.fd, header + key + data, self.used)
+        offset = self.used + RECORD_HEADER.size + len(key)
+        self.used = offset + len(data)
+        return offset
+
+    def seal(self) -> None:
+        """Stop appending and trim the sparse preallocation back to the bytes written"""
+        if not self.sealed:
+            self.sealed = True
+            os.ftruncate(self.fd, self.used)
+
+    def close(self) -> bool:
+        """Release the file and its mapping; False if views still hold the mapping"""
+        unmapped = True
+        if self.map is not None:
+            try:
+                self.map.close()
+            except BufferError:
+                # Views from SegmentStore.view() still point into it: the mapping goes with
+                # the last of them, and an unlinked segment file stays readable until then
+                unmapped = False
+        os.close(self.fd)
+        return unmapped
+
+
+class SegmentStore:
+    """Append-only packed segments with an in-memory offset index
+
+    Each key maps to (segment, offset, length). Writes append to the active
+    segment; once it fills up it is sealed and a new one started. Evicted
+    and overwritten records stay behind as dead bytes until the compactor
+    copies a sparse segment's live records forward and deletes the file.
+    """
+
+    layout = "segments"
+
+    def __init__(self, root: Path, segment_size: int = 64 * 1024**2, compact_threshold: float = 0.5,
+                 on_relocate: Optional[Callable[[str, str], None]] = None):
+        self.root = root
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.segment_size = segment_size
+        self.compact_threshold = compact_threshold
+        self.on_relocate = on_relocate
+
+        self.index: Dict[str, Tuple[int, int, int]] = {}
+        self.segments: Dict[int, _Segment] = {}
+        self.lock = threading.RLock()
+        self.reclaimed_bytes = 0
+        self.deferred_unmaps = 0  # Segments compacted away while views of them were held
+        # Restored records whose data has not been checked against its CRC yet
+        self.unverified: Set[str] = set()
+        self.corrupt_records = 0
+
+        existing = [int(m.group(1)) for m in map(SEGMENT_NAME.match, os.listdir(root)) if m]
+        self._next_id = max(existing, default=0) + 1
+        self._first_new_id = self._next_id
+        self.active = self._new_segment(self.segment_size)
+        self._compactor: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def _segment_path(self, segment_id: int) -> Path:
+        return self.root / f"segment-{segment_id:06d}.dat"
+
+    def _new_segment(self, capacity: int) -> _Segment:
+        segment = _Segment(self._next_id, self._segment_path(self._next_id), capacity, writable=True)
+        self.segments[segment.id] = segment
+        self._next_id += 1
+        return segment
+
+    def _location(self, segment_id: int, offset: int, length: int) -> str:
+        return f"segment-{segment_id:06d}.dat:{offset}:{length}"
+
+    def _append(self, key: str, data: bytes) -> Tuple[int, int]:
+        encoded = key.encode()
+        record_size = RECORD_HEADER.size + len(encoded) + len(data)
+        if self.active.used + record_size > self.active.capacity:
+            self.active.seal()
+            self.active = self._new_segment(max(self.segment_size, record_size))
+        return self.active.id, self.active.append(encoded, data)
+
+    def _unlink_record(self, key: str) -> None:
+        entry = self.index.pop(key, None)
+        if entry is None:
+            return
+        segment = self.segments[entry[0]]
+        segment.live_bytes -= entry[2]
+        segment.keys.discard(key)
+        self.unverified.discard(key)
+
+    def put(self, key: str, data: bytes, file_hash: str = "") -> str:
+        with self.lock:
+            self._unlink_record(key)
+            segment_id, offset = self._append(key, data)
+            segment = self.segments[segment_id]
+            segment.live_bytes += len(data)
+            segment.keys.add(key)
+            self.index[key] = (segment_id, offset, len(data))
+            return self._location(segment_id, offset, len(data))
+
+    def _record_crc(self, segment: _Segment, key: str, offset: int, length: int) -> Optional[int]:
+        """CRC from the header of the record of key at offset, or None if the header does not match it"""
+        encoded = key.encode()
+        start = offset - len(encoded) - RECORD_HEADER.size
+        if start < 0 or segment.map is None:
+            return None
+        magic, key_length, data_length, crc = RECORD_HEADER.unpack_from(segment.map, start)
+        if magic != RECORD_MAGIC or key_length != len(encoded) or data_length != length \
+                or segment.map[start + RECORD_HEADER.size:offset] != encoded:
+            return None
+        return crc
+
+    def _verify(self, key: str) -> bool:
+        """Check a restored record against its CRC on first read, dropping it if it fails"""
+        with self.lock:
+            if key not in self.unverified:
+                return key in self.index
+            self.unverified.discard(key)
+            entry = self.index.get(key)
+            if entry is None:
+                return False
+            segment_id, offset, length = entry
+            segment = self.segments[segment_id]
+            crc = self._record_crc(segment, key, offset, length)
+            with memoryview(segment.map)[offset:offset + length] as data:
+                if crc is not None and zlib.crc32(data) == crc:
+                    return True
+            self._unlink_record(key)
+            self.corrupt_records += 1
+        print(f"❌ Dropped corrupt cache record {key} ({self._location(segment_id, offset, length)})")
+        return False
+
+    def read(self, key: str) -> Optional[bytes]:
+        if key in self.unverified and not self._verify(key):
+            return None
+        # Lock-free fast path: dict lookups and the mmap slice are atomic under the GIL
+        entry = self.index.get(key)
+        if entry is None:
+            return None
+        segment_id, offset, length = entry
+        try:
+            return self.segments[segment_id].map[offset:offset + length]
+        except (KeyError, ValueError):
+            # The compactor moved the record and closed its segment in between; retry locked
+            with self.lock:
+                entry = self.index.get(key)
+                if entry is None:
+                    return None
+                segment_id, offset, length = entry
+                return self.segments[segment_id].map[offset:offset + length]
+
+    def view(self, key: str) -> Optional[memoryview]:
+        """Read-only view of a record straight into the segment mapping, no copy
+        
+        Records are never overwritten, so the view keeps showing the same bytes
+        after the key is evicted or moved by the compactor.
+        """
+        if key in self.unverified and not self._verify(key):
+            return None
+        entry = self.index.get(key)
+        if entry is None:
+            return None
+        segment_id, offset, length = entry
+        try:
+            return memoryview(self.segments[segment_id].map)[offset:offset + length]
+        except (KeyError, ValueError):
+            with self.lock:
+                entry = self.index.get(key)
+                if entry is None:
+                    return None
+                segment_id, offset, length = entry
+                return memoryview(self.segments[segment_id].map)[offset:offset + length]
+
+    def open_range(self, key: str) -> Optional[Tuple[int, int, int]]:
+        """(descriptor, offset, length) of a record for sendfile; the caller closes the descriptor"""
+        if key in self.unverified and not self._verify(key):
+            return None
+        with self.lock:
+            entry = self.index.get(key)
+            if entry is None:
+                return None
+            segment_id, offset, length = entry
+            # A duplicate survives the compactor closing (and deleting) the segment
+            return os.dup(self.segments[segment_id].fd), offset, length
+
+    def location(self, key: str) -> Optional[str]:
+        entry = self.index.get(key)
+        return self._location(*entry) if entry is not None else None
+
+    def delete(self, key: str) -> None:
+        with self.lock:
+            self._unlink_record(key)
+
+    def restore(self, key: str, location: Optional[str], size: int) -> bool:
+        """Re-register an entry loaded from persisted metadata"""
+        return not self.restore_many([(key, location, size)])
+
+    def _open_existing(self, name: str) -> Optional[_Segment]:
+        """Segment for a persisted location's file name, opened read-only on first use"""
+        match = SEGMENT_NAME.match(name)
+        if match is None:
+            return None
+        segment_id = int(match.group(1))
+        segment = self.segments.get(segment_id)
+        if segment is None:
+            path = self._segment_path(segment_id)
+            if not path.exists():
+                return None
+            segment = self.segments[segment_id] = _Segment(segment_id, path, 0, writable=False)
+        return segment
+
+    def restore_many(self, entries: Iterable[RestoreEntry]) -> Set[str]:
+        """Re-register persisted entries under one lock hold; returns the keys rejected
+        
+        Only record headers are checked here, which costs a page per record at
+        most; the data is checked against the CRC when first read.
+        """
+        rejected = set()
+        by_name: Dict[str, Optional[_Segment]] = {}
+
+        with self.lock:
+            for key, location, size in entries:
+                try:
+                    name, offset, length = location.rsplit(":", 2)
+                    offset, length = int(offset), int(length)
+                except (AttributeError, ValueError):
+                    rejected.add(key)
+                    continue
+                segment = by_name.get(name, False)
+                if segment is False:
+                    segment = by_name[name] = self._open_existing(name)
+                if segment is None or offset + length > segment.capacity \
+                        or self._record_crc(segment, key, offset, length) is None:
+                    rejected.add(key)
+                    continue
+                segment.live_bytes += length
+                segment.keys.add(key)
+                self.index[key] = (segment.id, offset, length)
+                self.unverified.add(key)
+        return rejected
+
+    def reconcile(self) -> Tuple[List[str], int, int]:
+        """One scandir pass: delete unreferenced segments, return (missing keys, orphans removed, bytes freed)"""
+        on_disk = set()
+        orphans = freed = 0
+
+        for entry in os.scandir(self.root):
+            match = SEGMENT_NAME.match(entry.name)
+            if match is None:
+                continue
+            segment_id = int(match.group(1))
+            on_disk.add(segment_id)
+            with self.lock:
+                # Segments from before this start that no restored entry points at
+                if segment_id < self._first_new_id and segment_id not in self.segments:
+                    freed += entry.stat().st_size
+                    os.unlink(entry.path)
+                    orphans += 1
+
+        with self.lock:
+            missing = [
+                key for segment in self.segments.values()
+                if segment.id < self._first_new_id and segment.id not in on_disk
+                for key in segment.keys
+            ]
+        return missing, orphans, freed
+
+    def compact(self) -> int:
+        """Rewrite live records out of sparse sealed segments; returns bytes reclaimed"""
+        with self.lock:
+            candidates = [
+                s for s in self.segments.values()
+                if s.sealed and s.live_bytes < s.used * self.compact_threshold
+            ]
+
+        reclaimed = 0
+        for segment in candidates:
+            for key in list(segment.keys):
+                # Never copied forward unchecked: the copy would get a fresh CRC of whatever is there
+                if key in self.unverified and not self._verify(key):
+                    continue
+                # Move one record at a time so readers and writers are never held up for long
+                with self.lock:
+                    entry = self.index.get(key)
+                    if entry is None or entry[0] != segment.id:
+                        continue
+                    _, offset, length = entry
+                    data = segment.map[offset:offset + length]
+                    self._unlink_record(key)
+                    new_id, new_offset = self._append(key, data)
+                    self.segments[new_id].live_bytes += length
+                    self.segments[new_id].keys.add(key)
+                    self.index[key] = (new_id, new_offset, length)
+                    if self.on_relocate is not None:
+                        self.on_relocate(key, self._location(new_id, new_offset, length))
+
+            with self.lock:
+                if segment.keys:
+                    continue
+                del self.segments[segment.id]
+                if not segment.close():
+                    self.deferred_unmaps += 1
+                segment.path.unlink(missing_ok=True)
+                reclaimed += segment.used
+                print(f"🧹 Compacted {segment.path.name}: reclaimed {segment.used / 1024 / 1024:.1f}MB")
+
+        self.reclaimed_bytes += reclaimed
+        return reclaimed
+
+    def start_compactor(self, interval: float = 30.0) -> None:
+        """Run compact() periodically in a daemon thread"""
+        def loop():
+            while not self._stop.wait(interval):
+                try:
+                    self.compact()
+                except Exception as e:
+                    print(f"❌ Error in segment compactor: {e}")
+
+        self._compactor = threading.Thread(target=loop, name="aistor-compactor", daemon=True)
+        self._compactor.start()
+
+    def stats(self) -> Dict:
+        with self.lock:
+            used = sum(s.used for s in self.segments.values())
+            live = sum(s.live_bytes for s in self.segments.values())
+            return {
+                "layout": self.layout,
+                "segments": len(self.segments),
+                "segment_bytes": used,
+                "live_bytes": live,
+                "dead_bytes": used - live,
+                "reclaimed_bytes": self.reclaimed_bytes,
+                "deferred_unmaps": self.deferred_unmaps,
+                "unverified_records": len(self.unverified),
+                "corrupt_records": self.corrupt_records,
+            }
+
+    def close(self) -> None:
+        self._stop.set()
+        with self.lock:
+            self.active.seal()
+            for segment in self.segments.values():
+                segment.close()
+                if not segment.used:
+                    segment.path.unlink(missing_ok=True)
+            self.segments.clear()
+            self.index.clear()
+
+
+class MemoryTier:
+    """Bounded LRU of object bytes held in RAM above the on-disk store
+
+    Entries are copies: the disk tier keeps every object, so demoting an
+    entry out of RAM only drops the copy and later reads fall back to disk.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self.used_bytes = 0
+        self.promotions = 0
+        self.demotions = 0
+        self.lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        data = self.entries.get(key)
+        if data is not None:
+            try:
+                self.entries.move_to_end(key)
+            except KeyError:
+                pass  # Demoted by another thread between the two lookups
+        return data
+
+    def promote(self, key: str, data: bytes) -> bool:
+        """Copy an entry into RAM, demoting the coldest ones to make room"""
+        if len(data) > self.capacity:
+            return False
+        with self.lock:
+            self._discard(key)
+            while self.entries and self.used_bytes + len(data) > self.capacity:
+                _, demoted = self.entries.popitem(last=False)
+                self.used_bytes -= len(demoted)
+                self.demotions += 1
+            self.entries[key] = data
+            self.used_bytes += len(data)
+            self.promotions += 1
+        return True
+
+    def _discard(self, key: str) -> None:
+        data = self.entries.pop(key, None)
+        if data is not None:
+            self.used_bytes -= len(data)
+
+    def discard(self, key: str) -> None:
+        """Forget the RAM copy (the entry was rewritten, invalidated or evicted)"""
+        with self.lock:
+            self._discard(key)
+
+    def stats(self) -> Dict:
+        return {
+            "entries": len(self.entries),
+            "used_mb": round(self.used_bytes / 1024 / 1024, 2),
+            "capacity_mb": round(self.capacity / 1024 / 1024, 2),
+            "promotions": self.promotions,
+            "demotions": self.demotions,
+        }
+
+
+def create_store(layout: str, cache_dir: Path, segment_size: int,
+                 on_relocate: Optional[Callable[[str, str], None]] = None):
+    """Build the blob store for a CACHE_LAYOUT value (segments or files)"""
+    if layout == "segments":
+        return SegmentStore(cache_dir / "segments", segment_size=segment_size, on_relocate=on_relocate)
+    if layout == "files":
+        return FileStore(cache_dir / "small-files")
+    raise ValueError(f"Unknown cache layout '{layout}', expected 'segments' or 'files'")
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Access traces for AIStor
+A trace is a compact binary log of cache requests, one fixed-size record
+per get or put: timestamp, 64-bit key hash, size and operation. Keys are
+hashed, so a trace taken from production traffic carries no paths.
+
+Recording can be SHARDS-sampled: a key is traced only when its hash falls
+under the sampling rate, so every request of a sampled key is kept and
+the trace stays a faithful, scaled-down picture of the whole key space.
+cachesim.py replays traces offline into miss-ratio curves.
+"""
+
+import hashlib
+import os
+import struct
+import threading
+import time
+from collections import deque
+from typing import Dict, Iterator, Tuple
+
+MAGIC = b"AIT1"
+HEADER = struct.Struct("<4sd")      # magic, sampling rate
+RECORD = struct.Struct("<dQIB")     # timestamp, key hash, size, op
+
+OP_HIT = 0
+OP_MISS = 1
+OP_PUT = 2
+OP_NAMES = ("hit", "miss", "put")
+
+# Low hash bits that decide SHARDS sampling; nested rates sample nested key sets
+SAMPLING_BITS = 24
+SAMPLING_MODULUS = 1 << SAMPLING_BITS
+
+
+def key_hash(key: str) -> int:
+    """Stable 64-bit hash of a cache key"""
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "little")
+
+
+def sampling_threshold(rate: float) -> int:
+    return int(rate * SAMPLING_MODULUS)
+
+
+def sampled(hashed: int, threshold: int) -> bool:
+    """Whether a hashed key falls inside a SHARDS sample"""
+    return (hashed & (SAMPLING_MODULUS - 1)) < threshold
+
+
+class TraceRecorder:
+    """Appends access records to a trace file, buffered off the request path"""
+
+    def __init__(self, path: str, sampling: float = 1.0, flush_every: int = 4096):
+        if not 0 < sampling <= 1:
+            raise ValueError(f"Trace sampling must be in (0, 1], got {sampling}")
+        self.path = path
+        self.sampling = sampling
+        self.threshold = sampling_threshold(sampling)
+        self.flush_every = flush_every
+        self.buffer: deque = deque()
+        self.recorded = 0
+        self.skipped = 0
+        self._lock = threading.Lock()
+
+        if os.path.exists(path) and os.path.getsize(path) >= HEADER.size:
+            with open(path, "rb") as f:
+                _, existing = HEADER.unpack(f.read(HEADER.size))
+            if existing != sampling:
+                raise ValueError(f"Trace {path} was recorded at sampling {existing}, not {sampling}")
+            self.file = open(path, "ab")
+        else:
+            self.file = open(path, "wb")
+            self.file.write(HEADER.pack(MAGIC, sampling))
+
+    def record(self, key: str, size: int, op: int) -> None:
+        hashed = key_hash(key)
+        if not sampled(hashed, self.threshold):
+            self.skipped += 1
+            return
+        # deque.append is atomic; only flushing takes the lock
+        self.buffer.append(RECORD.pack(time.time(), hashed, min(size, 0xFFFFFFFF), op))
+        if len(self.buffer) >= self.flush_every:
+            self.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            records = []
+            while self.buffer:
+                records.append(self.buffer.popleft())
+            if records:
+                self.file.write(b"".join(records))
+                self.file.flush()
+                self.recorded += len(records)
+
+    def close(self) -> None:
+        self.flush()
+        with self._lock:
+            self.file.close()
+
+    def stats(self) -> Dict:
+        return {
+            "path": self.path,
+            "sampling": self.sampling,
+            "recorded": self.recorded + len(self.buffer),
+            "skipped": self.skipped,
+        }
+
+
+def read_trace(path: str) -> Tuple[float, Iterator[Tuple[float, int, int, int]]]:
+    """(sampling rate, records) of a trace file; records are (timestamp, key hash, size, op)"""
+    with open(path, "rb") as f:
+        magic, sampling = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not an AIStor trace")
+        data = f.read()
+    usable = len(data) - len(data) % RECORD.size  # a crash may leave a torn last record
+    return sampling, RECORD.iter_unpack(memoryview(data)[:usable])